@@ -1,8 +1,11 @@
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
+// Canales WebSocket (servidor ASGI)
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws').replace(/\/api$/, '/ws');
 
 export const API_ENDPOINTS = {
   // Auth endpoints
   LOGIN: `${API_BASE_URL}/auth/login/`,
+  LOGOUT: `${API_BASE_URL}/auth/logout/`,
   REGISTER: `${API_BASE_URL}/auth/register/`,
   PROFILE: `${API_BASE_URL}/auth/profile/`,
   PLANS: `${API_BASE_URL}/auth/plans/`,
@@ -18,6 +21,7 @@ export const API_ENDPOINTS = {
   HISTORY: `${API_BASE_URL}/streaming/history/`,
   CONTINUE_WATCHING: `${API_BASE_URL}/streaming/history/continue_watching/`,
   UPDATE_PROGRESS: `${API_BASE_URL}/streaming/history/update_progress/`,
+  PROGRESS_SOCKET: `${WS_BASE_URL}/streaming/progress/`,
   RECOMMENDATIONS: `${API_BASE_URL}/streaming/recommendations/`,
   TRENDING: `${API_BASE_URL}/streaming/trending/`,
 };
@@ -11,6 +11,10 @@ export const AuthProvider = ({ children }) => {
   const [loading, setLoading] = useState(true);
 
   const logout = useCallback(() => {
+    // Revocar el token en el servidor (invalida también su caché de autenticación)
+    if (axios.defaults.headers.common['Authorization']) {
+      axios.post(API_ENDPOINTS.LOGOUT).catch(() => {});
+    }
     localStorage.removeItem('token');
     setToken(null);
     setCurrentUser(null);
@@ -61,6 +61,10 @@ const ContentDetailPage = () => {
   const { id } = useParams();
   const [content, setContent] = useState(null);
   const [loading, setLoading] = useState(true);
+  // Episodios de la temporada elegida, paginados por el servidor
+  const [season, setSeason] = useState(null);
+  const [episodes, setEpisodes] = useState([]);
+  const [nextEpisodes, setNextEpisodes] = useState(null);
   const { isAuthenticated } = useContext(AuthContext);
   const navigate = useNavigate();
 
@@ -69,6 +73,7 @@ const ContentDetailPage = () => {
       try {
         const response = await axios.get(`${API_ENDPOINTS.CONTENT}${id}/`);
         setContent(response.data);
+        setSeason(response.data.seasons?.[0]?.season_number ?? null);
       } catch (error) {
         console.error('Error fetching content details:', error);
       } finally {
@@ -79,6 +84,34 @@ const ContentDetailPage = () => {
     fetchContent();
   }, [id]);
 
+  useEffect(() => {
+    if (season === null) return;
+
+    const fetchEpisodes = async () => {
+      try {
+        const response = await axios.get(`${API_ENDPOINTS.CONTENT}${id}/episodes/`, {
+          params: { season }
+        });
+        setEpisodes(response.data.results);
+        setNextEpisodes(response.data.next);
+      } catch (error) {
+        console.error('Error fetching episodes:', error);
+      }
+    };
+
+    fetchEpisodes();
+  }, [id, season]);
+
+  const loadMoreEpisodes = async () => {
+    try {
+      const response = await axios.get(nextEpisodes);
+      setEpisodes((current) => [...current, ...response.data.results]);
+      setNextEpisodes(response.data.next);
+    } catch (error) {
+      console.error('Error fetching episodes:', error);
+    }
+  };
+
   const handlePlay = (episodeId = null) => {
     if (!isAuthenticated) {
       navigate('/login');
@@ -158,13 +191,28 @@ const ContentDetailPage = () => {
       </HeroSection>
       
       <Container maxWidth="xl">
-        {content.content_type === 'series' && content.episodes && (
+        {content.content_type === 'series' && content.seasons?.length > 0 && (
           <Box my={4}>
             <Typography variant="h5" gutterBottom>Episodios</Typography>
+            <Box mb={2}>
+              {content.seasons.map((item) => (
+                <Chip
+                  key={item.season_number}
+                  label={`Temporada ${item.season_number} (${item.episodes})`}
+                  onClick={() => setSeason(item.season_number)}
+                  sx={{
+                    mr: 1,
+                    mb: 1,
+                    color: 'white',
+                    backgroundColor: item.season_number === season ? '#e50914' : '#333'
+                  }}
+                />
+              ))}
+            </Box>
             <Divider sx={{ mb: 2, backgroundColor: '#333' }} />
             
             <Grid container spacing={2}>
-              {content.episodes.map((episode) => (
+              {episodes.map((episode) => (
                 <Grid item xs={12} key={episode.id}>
                   <EpisodeItem onClick={() => handlePlay(episode.id)}>
                     <Typography variant="h6">
@@ -177,6 +225,14 @@ const ContentDetailPage = () => {
                 </Grid>
               ))}
             </Grid>
+            
+            {nextEpisodes && (
+              <Box display="flex" justifyContent="center" mt={2}>
+                <Button variant="outlined" onClick={loadMoreEpisodes} sx={{ color: 'white', borderColor: '#555' }}>
+                  Más episodios
+                </Button>
+              </Box>
+            )}
           </Box>
         )}
       </Container>
@@ -59,9 +59,15 @@ const PlayerPage = () => {
   const [played, setPlayed] = useState(0);
   const [duration, setDuration] = useState(0);
   const [controlsVisible, setControlsVisible] = useState(true);
+  const [screenLimit, setScreenLimit] = useState(null);
   const playerRef = useRef(null);
   const navigate = useNavigate();
   const controlsTimeout = useRef(null);
+  // Canal de progreso: el servidor agrupa las posiciones y guarda cada pocos segundos
+  const progressSocket = useRef(null);
+  const position = useRef({ watchedTime: 0, duration: 0 });
+  // Identifica este reproductor en el límite de pantallas simultáneas del plan
+  const sessionId = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
 
   useEffect(() => {
     const fetchContent = async () => {
@@ -69,9 +75,11 @@ const PlayerPage = () => {
         const response = await axios.get(`${API_ENDPOINTS.CONTENT}${contentId}/`);
         setContent(response.data);
         
-        if (episodeId && response.data.episodes) {
-          const ep = response.data.episodes.find(e => e.id === parseInt(episodeId));
-          setEpisode(ep);
+        if (episodeId) {
+          const episodeResponse = await axios.get(
+            `${API_ENDPOINTS.CONTENT}${contentId}/episodes/${episodeId}/`
+          );
+          setEpisode(episodeResponse.data);
         }
       } catch (error) {
         console.error('Error fetching content:', error);
@@ -90,6 +98,29 @@ const PlayerPage = () => {
     };
   }, [contentId, episodeId]);
 
+  useEffect(() => {
+    const token = localStorage.getItem('token');
+    if (!token || !window.WebSocket) return undefined;
+
+    const socket = new WebSocket(
+      `${API_ENDPOINTS.PROGRESS_SOCKET}?token=${token}&session=${sessionId.current}`
+    );
+    socket.onmessage = (message) => {
+      const data = JSON.parse(message.data);
+      if (data.max_screens) stopForScreenLimit(data.max_screens);
+    };
+    progressSocket.current = socket;
+
+    return () => {
+      // Guardar la última posición al salir del reproductor
+      if (position.current.watchedTime > 0) {
+        sendPosition(position.current.watchedTime, 'close');
+      }
+      progressSocket.current = null;
+      socket.close();
+    };
+  }, [contentId, episodeId]);
+
   const resetControlsTimeout = () => {
     if (controlsTimeout.current) {
       clearTimeout(controlsTimeout.current);
@@ -105,6 +136,9 @@ const PlayerPage = () => {
   };
 
   const handlePlayPause = () => {
+    if (playing && position.current.watchedTime > 0) {
+      sendPosition(position.current.watchedTime, 'pause');
+    }
     setPlaying(!playing);
   };
 
@@ -119,15 +153,23 @@ const PlayerPage = () => {
 
   const handleProgress = (state) => {
     setPlayed(state.played);
-    
-    // Actualizar progreso en el servidor cada 10 segundos
+    position.current.watchedTime = state.playedSeconds;
+
+    // Con el canal abierto se envía cada posición (el servidor decide cuándo
+    // guardar); sin él, se actualiza por HTTP cada 10 segundos
+    if (sendPosition(state.playedSeconds)) return;
     if (Math.floor(state.playedSeconds) % 10 === 0) {
       updateProgress(state.playedSeconds);
     }
   };
 
+  const handleEnded = () => {
+    sendPosition(position.current.duration, 'ended');
+  };
+
   const handleDuration = (duration) => {
     setDuration(duration);
+    position.current.duration = duration;
   };
 
   const handleSeek = (event, newValue) => {
@@ -135,15 +177,38 @@ const PlayerPage = () => {
     playerRef.current.seekTo(newValue / 100);
   };
 
+  const sendPosition = (watchedTime, event = 'progress') => {
+    const socket = progressSocket.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return false;
+    socket.send(JSON.stringify({
+      content: episodeId ? null : contentId,
+      episode: episodeId || null,
+      watched_time: watchedTime,
+      total_duration: position.current.duration,
+      event
+    }));
+    return true;
+  };
+
+  const stopForScreenLimit = (maxScreens) => {
+    setScreenLimit(maxScreens);
+    setPlaying(false);
+  };
+
   const updateProgress = async (watchedTime) => {
     try {
       await axios.post(API_ENDPOINTS.UPDATE_PROGRESS, {
         content: episodeId ? null : contentId,
         episode: episodeId || null,
         watched_time: watchedTime,
-        total_duration: duration
+        total_duration: duration,
+        session: sessionId.current
       });
     } catch (error) {
+      if (error.response?.status === 409) {
+        stopForScreenLimit(error.response.data.max_screens);
+        return;
+      }
       console.error('Error updating progress:', error);
     }
   };
@@ -186,6 +251,7 @@ const PlayerPage = () => {
             muted={muted}
             onProgress={handleProgress}
             onDuration={handleDuration}
+            onEnded={handleEnded}
             style={{ backgroundColor: 'black' }}
           />
         )}
@@ -195,6 +261,12 @@ const PlayerPage = () => {
             <IconButton color="inherit" onClick={handleBack}>
               <ArrowBack fontSize="large" />
             </IconButton>
+            {screenLimit && (
+              <Typography variant="h6" sx={{ color: 'white', mt: 2 }}>
+                Tu plan permite {screenLimit} {screenLimit === 1 ? 'pantalla' : 'pantallas'} a la vez.
+                Cierra la reproducción en otro dispositivo para continuar.
+              </Typography>
+            )}
           </Box>
           
           <ControlBar>
@@ -0,0 +1,176 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenCache:
+    """
+    Caché LRU acotada y con caducidad de token -> (usuario, token, cargado_en).
+
+    Vive en memoria de cada proceso: las invalidaciones (logout, cambio de plan o
+    de suscripción) se aplican aquí en el proceso que las recibe y, para el
+    resto de workers, se anotan en la caché compartida (revoke_user y
+    revoke_plan), que CachedTokenAuthentication consulta antes de usar una entrada.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_matching(self, predicate):
+        """
+        Elimina las entradas cuyo usuario cumple predicate(user).
+        """
+        with self._lock:
+            for key in [key for key, (_, (user, *_)) in self._entries.items() if predicate(user)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+
+def revocation_keys(user):
+    return [f'auth:revoked:user:{user.pk}', f'auth:revoked:plan:{user.plan_id}']
+
+
+def revoke(key):
+    # Basta con que dure lo que una entrada de token_cache: las anteriores ya han caducado
+    cache.set(key, time.time(), getattr(settings, 'TOKEN_CACHE_TTL', 60))
+
+
+def revoke_user(user_id):
+    """
+    Invalida en todos los workers los tokens cacheados del usuario (logout,
+    token borrado, cambios del usuario).
+    """
+    revoke(f'auth:revoked:user:{user_id}')
+
+
+def revoke_plan(plan_id):
+    revoke(f'auth:revoked:plan:{plan_id}')
+
+
+def is_revoked(cached, revocations):
+    """
+    Alguna revocación es posterior a la carga de la entrada.
+    """
+    _, _, loaded_at = cached
+    return any(revoked_at >= loaded_at for revoked_at in revocations.values())
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que guarda en memoria el usuario (con su plan ya cargado)
+    de cada token, de modo que una petición autenticada no hace ninguna consulta
+    cuando el token está en caché: solo una lectura de las revocaciones en la
+    caché compartida.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None and is_revoked(cached, cache.get_many(revocation_keys(cached[0]))):
+            cached = None
+        if cached is None:
+            model = self.get_model()
+            loaded_at = time.time()
+            try:
+                token = model.objects.select_related('user__plan').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cached = self.cache_token(token, loaded_at)
+        return self.credentials(cached)
+
+    async def aauthenticate(self, request):
+        """
+        Versión asíncrona de authenticate() para las vistas async nativas, que
+        no pasan por DRF (ver streaming.async_views).
+        """
+        key = self.token_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None and is_revoked(cached, await cache.aget_many(revocation_keys(cached[0]))):
+            cached = None
+        if cached is None:
+            model = self.get_model()
+            loaded_at = time.time()
+            try:
+                token = await model.objects.select_related('user__plan').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cached = self.cache_token(token, loaded_at)
+        return self.credentials(cached)
+
+    def token_key(self, request):
+        """
+        Extrae la clave del token de la cabecera Authorization, con las mismas
+        reglas que TokenAuthentication.authenticate().
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+    def cache_token(self, token, loaded_at):
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        cached = (token.user, token, loaded_at)
+        token_cache.set(token.key, cached)
+        return cached
+
+    @staticmethod
+    def credentials(cached):
+        user, token, _ = cached
+        # Cada petición recibe su propia copia para no compartir estado entre hilos
+        return (copy.copy(user), token)
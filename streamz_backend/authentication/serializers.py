@@ -1,13 +1,14 @@
 from rest_framework import serializers
+from streamz_backend.instrumentation import TimedSerializerMixin
 from .models import User, SubscriptionPlan
 from django.contrib.auth.password_validation import validate_password
 
-class SubscriptionPlanSerializer(serializers.ModelSerializer):
+class SubscriptionPlanSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = SubscriptionPlan
         fields = ['id', 'name', 'price', 'max_screens', 'video_quality']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'plan', 'subscription_active', 'subscription_end_date']
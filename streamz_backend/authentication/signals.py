@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .models import User, SubscriptionPlan
+from .authentication import revoke_plan, revoke_user, token_cache
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Al cerrar sesión (o revocar un token) deja de aceptarse inmediatamente
+    """
+    token_cache.invalidate(instance.key)
+    revoke_user(instance.user_id)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """
+    Cambios de plan, de suscripción o de estado del usuario
+    """
+    token_cache.invalidate_matching(lambda user: user.pk == instance.pk)
+    revoke_user(instance.pk)
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_plan_tokens(sender, instance, **kwargs):
+    token_cache.invalidate_matching(lambda user: user.plan_id == instance.pk)
+    revoke_plan(instance.pk)
@@ -1,3 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import TokenCache, token_cache
+from .models import SubscriptionPlan, User
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = SubscriptionPlan.objects.create(
+            name='premium', price=15, max_screens=4, video_quality='4K'
+        )
+        cls.user = User.objects.create_user(username='ana', password='secreto123', plan=cls.plan)
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_profile(self):
+        return self.client.get('/api/auth/profile/')
+
+    def test_cached_token_skips_lookup(self):
+        self.assertEqual(self.get_profile().status_code, 200)
+        # Con el token en caché, el perfil (usuario y plan) no hace ninguna consulta
+        with self.assertNumQueries(0):
+            response = self.get_profile()
+        self.assertEqual(response.data['username'], 'ana')
+
+    def test_logout_revokes_cached_token(self):
+        self.assertEqual(self.get_profile().status_code, 200)
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 204)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_logout_in_another_worker_revokes_cached_token(self):
+        self.assertEqual(self.get_profile().status_code, 200)
+        # El logout lo atiende otro worker: su propia caché de tokens, la
+        # caché de Django compartida
+        with mock.patch('authentication.signals.token_cache', TokenCache()):
+            self.assertEqual(self.client.post('/api/auth/logout/').status_code, 204)
+
+        self.assertIsNotNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_plan_change_in_another_worker_invalidates(self):
+        self.get_profile()
+        with mock.patch('authentication.signals.token_cache', TokenCache()):
+            self.plan.video_quality = 'HD'
+            self.plan.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_profile().status_code, 200)
+
+    def test_subscription_change_invalidates(self):
+        self.get_profile()
+        self.user.subscription_active = False
+        self.user.save()
+        self.assertFalse(self.get_profile().data['subscription_active'])
+
+    def test_inactive_user_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_plan_change_invalidates(self):
+        self.get_profile()
+        self.plan.video_quality = 'HD'
+        self.plan.save()
+        with self.assertNumQueries(1):
+            response = self.get_profile()
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token inexistente')
+        self.assertEqual(self.get_profile().status_code, 401)
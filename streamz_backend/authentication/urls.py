@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     SubscriptionPlanViewSet, UserRegistrationView,
-    LoginView, UserProfileView
+    LoginView, LogoutView, UserProfileView
 )
 
 router = DefaultRouter()
@@ -12,5 +12,6 @@ urlpatterns = [
     path('', include(router.urls)),
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('profile/', UserProfileView.as_view(), name='profile'),
 ]
\ No newline at end of file
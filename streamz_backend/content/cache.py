@@ -0,0 +1,103 @@
+# content/cache.py
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from streamz_backend.routers import pin_catalogue_reads
+
+from .entitlements import user_tier
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+
+
+def catalogue_version():
+    """
+    Versión actual del catálogo. Forma parte de todas las claves de respuesta,
+    así que cambiarla invalida de golpe todas las respuestas cacheadas.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, uuid4().hex, None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    cache.set(CATALOGUE_VERSION_KEY, uuid4().hex, None)
+    # Que la versión nueva no se llene con lo que aún sirven las réplicas
+    pin_catalogue_reads()
+
+
+def plan_tier(request):
+    """
+    Grupo de usuarios que ven exactamente el mismo catálogo.
+    """
+    if settings.DEBUG:
+        return 'all'  # En desarrollo todos ven todo el contenido (ver ContentViewSet)
+    tier = user_tier(request.user)
+    # Los planes gratuitos tienen nivel 0
+    return f'tier-{tier:.2f}' if tier is not None else 'none'
+
+
+class CatalogueCacheMixin:
+    """
+    Cachea las respuestas de lectura del catálogo, compartidas por todos los
+    usuarios de un mismo nivel de plan, y responde 304 cuando el cliente ya
+    tiene la versión vigente (If-None-Match).
+
+    Las claves incluyen la versión del catálogo, que cambian las señales de
+    content.signals cuando se modifica contenido, géneros, episodios o planes.
+    """
+    cache_per_plan = True
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogueCacheMixin, self).list(
+            request, *args, **kwargs
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogueCacheMixin, self).retrieve(
+            request, *args, **kwargs
+        ))
+
+    def response_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        location = hashlib.md5(
+            f'{request.get_host()}{request.path}?{query}'.encode()
+        ).hexdigest()
+        tier = plan_tier(request) if self.cache_per_plan else 'all'
+        return f'catalogue:{catalogue_version()}:{tier}:{location}'
+
+    def cached_response(self, request, build_response):
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            etag = '"%s"' % hashlib.md5(JSONRenderer().render(response.data)).hexdigest()
+            cached = (etag, response.data)
+            cache.set(key, cached, getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 300))
+
+        etag, data = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(data, headers={'ETag': etag})
+
+
+def cache_catalogue_response(view_method):
+    """
+    Aplica la caché de CatalogueCacheMixin a una acción extra de un viewset.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: view_method(self, request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,142 @@
+# content/compact.py
+"""
+Serialización compacta de solo lectura para los listados con más tráfico.
+
+En una página de 20 títulos, instanciar ContentSerializer con su
+GenreSerializer anidado (campos, validadores, un serializer por género...)
+cuesta más CPU que las propias consultas. Los serializers compactos:
+
+- trabajan sobre filas de .values() (no se instancian modelos) o, si se les
+  pasan, sobre instancias;
+- convierten cada fila con un mapeo de campos precompilado (nombre de salida
+  -> columna), en el mismo orden que el serializer de DRF equivalente;
+- añaden los géneros con una consulta a la tabla intermedia y los nombres de
+  un mapa id -> nombre en caché, sin join con la tabla de géneros.
+
+El JSON resultante es idéntico byte a byte al del serializer de DRF
+(ver ContentCompactSerializer y los tests). Las vistas los eligen con
+CompactListMixin (content/mixins.py).
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Model
+
+from streamz_backend.instrumentation import TimedSerializerMixin
+from .models import Content, Genre
+
+GENRE_NAMES_KEY = 'catalogue:genre-names'
+# Columna del campo de géneros en el mapeo de campos (se añade a cada fila)
+GENRES = '_genres'
+
+
+def genre_names(genre_ids=()):
+    """
+    Mapa {id: nombre} de todos los géneros, en caché hasta que cambie alguno
+    (content.signals). Si falta alguno de genre_ids (p. ej. creado por el
+    importador, que no envía señales), se vuelve a cargar.
+
+    Las señales solo limpian la caché del proceso que hace el cambio si no es
+    compartida: el mapa caduca como las respuestas del catálogo, de modo que
+    un género renombrado no se sirve con el nombre antiguo más de
+    CATALOGUE_CACHE_TIMEOUT segundos.
+    """
+    names = cache.get(GENRE_NAMES_KEY)
+    if names is None or not names.keys() >= set(genre_ids):
+        names = dict(Genre.objects.values_list('id', 'name'))
+        cache.set(GENRE_NAMES_KEY, names, getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 300))
+    return names
+
+
+def invalidate_genre_names():
+    cache.delete(GENRE_NAMES_KEY)
+
+
+class CompactSerializer:
+    """
+    Base de los serializers compactos. Las subclases declaran el modelo y
+    `fields`: {campo de salida: columna de .values() o GENRES}.
+
+    Admite la misma llamada que un serializer de DRF en los listados
+    (Serializer(filas, many=True, context=...).data).
+    """
+    model = None
+    fields = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Mapeo precompilado: nombres de salida y un itemgetter con sus columnas
+        cls.names = list(cls.fields)
+        cls.getter = itemgetter(*cls.fields.values())
+        cls.has_genres = GENRES in cls.fields.values()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @classmethod
+    def columns(cls):
+        """
+        Columnas que hay que pedir a .values().
+        """
+        return [column for column in cls.fields.values() if column != GENRES]
+
+    @property
+    def data(self):
+        rows = self.instance if self.many else [self.instance]
+        data = self.to_representation(rows)
+        return data if self.many else data[0]
+
+    def to_representation(self, rows):
+        rows = [self.as_row(row) for row in rows]
+        if self.has_genres:
+            genres = self.genres(rows)
+            for row in rows:
+                row[GENRES] = genres.get(row['id'], [])
+        names, getter = self.names, self.getter
+        return [dict(zip(names, getter(row))) for row in rows]
+
+    def as_row(self, row):
+        if isinstance(row, Model):
+            return {column: getattr(row, column) for column in self.columns()}
+        return row
+
+    def genres(self, rows):
+        """
+        {id: [{'id': ..., 'name': ...}, ...]} con los géneros de cada fila,
+        ordenados por id como en el prefetch de los serializers de DRF.
+        """
+        ids = [row['id'] for row in rows]
+        if not ids:
+            return {}
+        pairs = list(
+            self.model.genres.through.objects.filter(
+                **{f'{self.model._meta.model_name}_id__in': ids}
+            ).order_by('genre_id').values_list(f'{self.model._meta.model_name}_id', 'genre_id')
+        )
+        names = genre_names({genre_id for _, genre_id in pairs})
+        genres = defaultdict(list)
+        for row_id, genre_id in pairs:
+            genres[row_id].append({'id': genre_id, 'name': names[genre_id]})
+        return genres
+
+
+class ContentCompactSerializer(TimedSerializerMixin, CompactSerializer):
+    """
+    Equivalente compacto de ContentSerializer.
+    """
+    model = Content
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'release_year': 'release_year',
+        'content_type': 'content_type',
+        'genres': GENRES,
+        'thumbnail': 'thumbnail',
+        'video_file': 'video_file',
+        'min_subscription_plan': 'min_subscription_plan_id',
+    }
@@ -0,0 +1,63 @@
+# content/entitlements.py
+"""
+Niveles de acceso al catálogo por plan.
+
+El nivel de un plan es su precio: incluye los títulos cuyo plan mínimo no es
+más caro. Cada título guarda en entitlement_tier el precio de su plan mínimo,
+de modo que el catálogo de un usuario es entitlement_tier <= precio de su
+plan: un rango sobre el índice content_tier_type_year_idx, sin join con
+SubscriptionPlan.
+
+El nivel de un plan no depende de los demás: crear o borrar otro plan no lo
+desplaza, y no hay ningún mapa en caché que pueda quedarse antiguo en otros
+workers. Cambiar el precio de un plan o borrarlo actualiza sus títulos
+(content.signals).
+"""
+from collections import defaultdict
+
+from authentication.models import SubscriptionPlan
+from .models import Content
+
+
+def tier_for_plan(plan_id):
+    if plan_id is None:
+        return None
+    return SubscriptionPlan.objects.filter(pk=plan_id).values_list('price', flat=True).first()
+
+
+def user_tier(user):
+    if not user.is_authenticated or not getattr(user, 'plan_id', None):
+        return None
+    # El plan llega ya cargado con el usuario del token (CachedTokenAuthentication)
+    return user.plan.price
+
+
+def entitled_contents(user):
+    """
+    Títulos que incluye el plan del usuario.
+    """
+    tier = user_tier(user)
+    if tier is None:
+        return Content.objects.none()
+    return Content.objects.filter(entitlement_tier__lte=tier)
+
+
+def refresh_entitlement_tiers():
+    """
+    Recalcula el nivel de los títulos que han cambiado, con una UPDATE por
+    nivel. Devuelve el número de títulos actualizados.
+    """
+    plans_by_tier = defaultdict(list)
+    for plan_id, price in SubscriptionPlan.objects.values_list('id', 'price'):
+        plans_by_tier[price].append(plan_id)
+
+    updated = 0
+    for tier, plan_ids in plans_by_tier.items():
+        updated += Content.objects.filter(
+            min_subscription_plan_id__in=plan_ids
+        ).exclude(entitlement_tier=tier).update(entitlement_tier=tier)
+    # Títulos sin plan (o cuyo plan se borró): no los incluye ningún plan
+    updated += Content.objects.filter(
+        min_subscription_plan__isnull=True, entitlement_tier__isnull=False
+    ).update(entitlement_tier=None)
+    return updated
@@ -0,0 +1,372 @@
+# content/importer.py
+"""
+Importación masiva del catálogo (títulos, episodios y géneros) desde volcados
+JSON lines o CSV.
+
+El fichero se lee en streaming y se procesa por bloques de `chunk_size`
+registros: cada bloque cuesta un número fijo de consultas (bulk_create,
+bulk_update e inserciones en bloque en la tabla intermedia de géneros), y la
+memoria usada no depende del tamaño del fichero.
+
+Los registros se identifican por external_id, de modo que volver a importar
+el mismo volcado actualiza lo que cambió y no duplica nada.
+
+Formato (JSON lines; en CSV las mismas columnas, con los géneros separados
+por "|"):
+
+    {"external_id": "tt01", "title": "...", "description": "...",
+     "release_year": 2020, "content_type": "series", "genres": ["Drama"],
+     "thumbnail": "...", "video_file": "...", "min_subscription_plan": "premium",
+     "episodes": [{"external_id": "tt01-1", "title": "...", "season_number": 1,
+                   "episode_number": 1, "video_file": "...", "duration": 45}]}
+
+Los episodios también pueden ir como registros propios con
+"series_external_id" en lugar de anidados en su serie.
+"""
+import csv
+import json
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from authentication.models import SubscriptionPlan
+from .cache import bump_catalogue_version
+from .models import Content, Episode, Genre
+from .signals import catalogue_imported
+
+CONTENT_FIELDS = [
+    'title', 'description', 'release_year', 'content_type',
+    'thumbnail', 'video_file', 'min_subscription_plan_id', 'entitlement_tier',
+]
+EPISODE_FIELDS = ['series_id', 'title', 'season_number', 'episode_number', 'video_file', 'duration']
+CONTENT_TYPES = {value for value, _ in Content.CONTENT_TYPES}
+# Errores que se conservan para el informe (el resto solo se cuentan)
+MAX_REPORTED_ERRORS = 100
+# Títulos por DELETE al quitar géneros: SQLite no admite expresiones de más de
+# 1000 niveles y un bloque puede cambiar los géneros de todos sus títulos
+GENRE_DELETE_BATCH_SIZE = 200
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def read_records(dump, format='jsonl'):
+    """
+    Lee registros de un fichero binario abierto, sin cargarlo entero.
+    Genera (número de línea, registro o None si no se pudo leer, bytes leídos).
+    """
+    consumed = 0
+
+    def lines():
+        nonlocal consumed
+        for raw in dump:
+            consumed += len(raw)
+            yield raw.decode('utf-8')
+
+    if format == 'csv':
+        reader = csv.DictReader(lines())
+        for row in reader:
+            yield reader.line_num, csv_record(row), consumed
+        return
+
+    for number, line in enumerate(lines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None, consumed
+
+
+def csv_record(row):
+    record = {key: value for key, value in row.items() if key and value not in (None, '')}
+    if 'genres' in record:
+        record['genres'] = record['genres'].split('|')
+    elif 'genres' in row:
+        record['genres'] = []
+    return record
+
+
+class CatalogueImporter:
+    def __init__(self, chunk_size=1000, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = dict.fromkeys([
+            'records', 'contents_created', 'contents_updated', 'contents_unchanged',
+            'episodes_created', 'episodes_updated', 'episodes_unchanged', 'errors',
+        ], 0)
+        self.errors = []
+        # Contenidos ya existentes que cambiaron (ellos, sus géneros o sus episodios)
+        self.changed_content_ids = set()
+        # Episodios ya existentes que cambiaron
+        self.changed_episode_ids = set()
+        self._genres = None
+        self._plans = None
+        self._plan_prices = {}
+
+    def run(self, records):
+        """
+        Importa un iterable de (número de línea, registro, posición) como el que
+        genera read_records y devuelve las estadísticas.
+        """
+        chunk = []
+        position = None
+        for number, record, position in records:
+            chunk.append((number, record))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk, position)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk, position)
+
+        # bulk_create y bulk_update no envían señales: invalidar aquí la caché del catálogo
+        if any(self.stats[key] for key in [
+            'contents_created', 'contents_updated', 'episodes_created', 'episodes_updated'
+        ]):
+            bump_catalogue_version()
+        if self.changed_content_ids:
+            catalogue_imported.send(
+                sender=Content, content_ids=self.changed_content_ids,
+                episode_ids=self.changed_episode_ids,
+            )
+        return self.stats
+
+    def import_chunk(self, chunk, position=None):
+        contents = {}
+        episodes = {}
+        for number, record in chunk:
+            self.stats['records'] += 1
+            try:
+                if record is None:
+                    raise InvalidRecord("Registro ilegible")
+                if record.get('series_external_id'):
+                    episode = self.clean_episode(record, record['series_external_id'])
+                    episodes[episode['external_id']] = (number, episode)
+                    continue
+                content = self.clean_content(record)
+                series_episodes = [
+                    self.clean_episode(episode, content['external_id'])
+                    for episode in record.get('episodes') or []
+                ]
+            except InvalidRecord as exc:
+                self.error(number, exc)
+                continue
+            # Si un external_id se repite en el bloque, gana el último
+            contents[content['external_id']] = content
+            for episode in series_episodes:
+                episodes[episode['external_id']] = (number, episode)
+
+        with transaction.atomic():
+            content_ids = self.upsert_contents(contents)
+            self.upsert_episodes(episodes, content_ids)
+
+        if self.progress:
+            self.progress(self.stats, position)
+
+    def error(self, number, exc):
+        self.stats['errors'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, str(exc)))
+
+    def clean_content(self, record):
+        external_id = str(record.get('external_id') or '').strip()
+        if not external_id:
+            raise InvalidRecord("Falta external_id")
+        if not record.get('title'):
+            raise InvalidRecord(f"{external_id}: falta title")
+        content_type = record.get('content_type')
+        if content_type not in CONTENT_TYPES:
+            raise InvalidRecord(f"{external_id}: content_type inválido: {content_type!r}")
+        try:
+            release_year = int(record.get('release_year'))
+        except (TypeError, ValueError):
+            raise InvalidRecord(f"{external_id}: release_year inválido")
+
+        genres = record.get('genres')
+        if genres is not None:
+            if not isinstance(genres, list) or not all(isinstance(name, str) for name in genres):
+                raise InvalidRecord(f"{external_id}: genres debe ser una lista de nombres")
+            genres = sorted({name.strip() for name in genres if name.strip()})
+        plan_id = self.plan_id(record.get('min_subscription_plan'), external_id)
+
+        return {
+            'external_id': external_id,
+            'genres': genres,
+            'fields': {
+                'title': str(record['title'])[:200],
+                'description': record.get('description') or '',
+                'release_year': release_year,
+                'content_type': content_type,
+                'thumbnail': record.get('thumbnail') or '',
+                'video_file': record.get('video_file') or '',
+                'min_subscription_plan_id': plan_id,
+                'entitlement_tier': self._plan_prices.get(plan_id),
+            },
+        }
+
+    def clean_episode(self, record, series_external_id):
+        try:
+            season_number = int(record.get('season_number'))
+            episode_number = int(record.get('episode_number'))
+            duration = int(record.get('duration') or 0)
+        except (TypeError, ValueError):
+            raise InvalidRecord(f"{series_external_id}: temporada, episodio o duración inválidos")
+        external_id = str(record.get('external_id') or '').strip() or (
+            f'{series_external_id}:S{season_number}E{episode_number}'
+        )
+        return {
+            'external_id': external_id,
+            'series_external_id': str(series_external_id),
+            'fields': {
+                'title': str(record.get('title') or f'Episodio {episode_number}')[:200],
+                'season_number': season_number,
+                'episode_number': episode_number,
+                'video_file': record.get('video_file') or '',
+                'duration': duration,
+            },
+        }
+
+    def plan_id(self, value, external_id):
+        if value in (None, ''):
+            return None
+        if self._plans is None:
+            self._plans = {}
+            for plan_id, name, price in SubscriptionPlan.objects.values_list('id', 'name', 'price'):
+                self._plans.setdefault(name.lower(), plan_id)
+                self._plans[str(plan_id)] = plan_id
+                # Nivel de acceso de los títulos del plan (content.entitlements)
+                self._plan_prices[plan_id] = price
+        plan_id = self._plans.get(str(value).lower())
+        if plan_id is None:
+            raise InvalidRecord(f"{external_id}: plan desconocido: {value!r}")
+        return plan_id
+
+    def genre_ids(self, names):
+        """
+        Devuelve {nombre: id}, creando en bloque los géneros que no existan.
+        """
+        if self._genres is None:
+            self._genres = {}
+            for genre_id, name in Genre.objects.order_by('id').values_list('id', 'name'):
+                self._genres.setdefault(name, genre_id)
+        missing = sorted(set(names) - set(self._genres))
+        for genre in Genre.objects.bulk_create([Genre(name=name) for name in missing]):
+            self._genres[genre.name] = genre.id
+        return {name: self._genres[name] for name in names}
+
+    def upsert_contents(self, contents):
+        """
+        Crea o actualiza los títulos del bloque y sus géneros. Devuelve
+        {external_id: id}.
+        """
+        if not contents:
+            return {}
+        existing = Content.objects.in_bulk(list(contents), field_name='external_id')
+
+        created = Content.objects.bulk_create([
+            Content(external_id=external_id, **content['fields'])
+            for external_id, content in contents.items() if external_id not in existing
+        ])
+        changed = []
+        for external_id, instance in existing.items():
+            fields = contents[external_id]['fields']
+            if any(getattr(instance, name) != value for name, value in fields.items()):
+                for name, value in fields.items():
+                    setattr(instance, name, value)
+                changed.append(instance)
+        if changed:
+            Content.objects.bulk_update(changed, CONTENT_FIELDS)
+            self.changed_content_ids.update(instance.id for instance in changed)
+
+        self.stats['contents_created'] += len(created)
+        self.stats['contents_updated'] += len(changed)
+        self.stats['contents_unchanged'] += len(existing) - len(changed)
+
+        ids = {instance.external_id: instance.id for instance in [*existing.values(), *created]}
+        self.replace_genres(contents, ids, existing_ids={instance.id for instance in existing.values()})
+        return ids
+
+    def replace_genres(self, contents, ids, existing_ids):
+        """
+        Deja a cada título exactamente los géneros del registro (si los trae),
+        con un DELETE y un INSERT en bloque sobre la tabla intermedia.
+        """
+        contents = {
+            ids[external_id]: content['genres']
+            for external_id, content in contents.items() if content['genres'] is not None
+        }
+        if not contents:
+            return
+        genre_ids = self.genre_ids({name for names in contents.values() for name in names})
+        desired = {
+            (content_id, genre_ids[name]) for content_id, names in contents.items() for name in names
+        }
+
+        Through = Content.genres.through
+        current = set(Through.objects.filter(
+            content_id__in=existing_ids & set(contents)
+        ).values_list('content_id', 'genre_id'))
+
+        stale = defaultdict(list)
+        for content_id, genre_id in current - desired:
+            stale[content_id].append(genre_id)
+        stale_items = sorted(stale.items())
+        for start in range(0, len(stale_items), GENRE_DELETE_BATCH_SIZE):
+            Through.objects.filter(reduce(or_, (
+                Q(content_id=content_id, genre_id__in=genre_ids_to_remove)
+                for content_id, genre_ids_to_remove in stale_items[start:start + GENRE_DELETE_BATCH_SIZE]
+            ))).delete()
+        added = desired - current
+        Through.objects.bulk_create([
+            Through(content_id=content_id, genre_id=genre_id)
+            for content_id, genre_id in added
+        ], ignore_conflicts=True)
+        self.changed_content_ids.update(stale)
+        self.changed_content_ids.update(
+            content_id for content_id, _ in added if content_id in existing_ids
+        )
+
+    def upsert_episodes(self, episodes, content_ids):
+        if not episodes:
+            return
+        series_external_ids = {episode['series_external_id'] for _, episode in episodes.values()}
+        missing = series_external_ids - set(content_ids)
+        if missing:
+            # Series importadas en bloques (o ejecuciones) anteriores
+            content_ids = {**content_ids, **dict(
+                Content.objects.filter(external_id__in=missing).values_list('external_id', 'id')
+            )}
+
+        valid = {}
+        for external_id, (number, episode) in episodes.items():
+            series_id = content_ids.get(episode['series_external_id'])
+            if series_id is None:
+                self.error(number, InvalidRecord(f"{external_id}: serie desconocida: {episode['series_external_id']}"))
+                continue
+            valid[external_id] = {**episode['fields'], 'series_id': series_id}
+
+        existing = Episode.objects.in_bulk(list(valid), field_name='external_id')
+        created = Episode.objects.bulk_create([
+            Episode(external_id=external_id, **fields)
+            for external_id, fields in valid.items() if external_id not in existing
+        ])
+        changed = []
+        for external_id, instance in existing.items():
+            fields = valid[external_id]
+            if any(getattr(instance, name) != value for name, value in fields.items()):
+                for name, value in fields.items():
+                    setattr(instance, name, value)
+                changed.append(instance)
+        if changed:
+            Episode.objects.bulk_update(changed, EPISODE_FIELDS)
+            self.changed_content_ids.update(instance.series_id for instance in changed)
+            self.changed_episode_ids.update(instance.id for instance in changed)
+
+        self.stats['episodes_created'] += len(created)
+        self.stats['episodes_updated'] += len(changed)
+        self.stats['episodes_unchanged'] += len(existing) - len(changed)
@@ -0,0 +1,146 @@
+import json
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from content.importer import CatalogueImporter, read_records
+from content.models import Content, Episode, Genre
+from streamz_backend.benchmarking import synthetic_vocabulary, throwaway_database
+
+
+class QueryCounter:
+    """
+    execute_wrapper que solo cuenta consultas (CaptureQueriesContext guarda
+    como mucho 9000 y una importación grande hace muchas más en modo fila a fila).
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el throughput de import_catalogue sobre un volcado sintético en una base "
+        "de datos desechable: primera importación, reimportación sin cambios y, como "
+        "referencia, la creación fila a fila con el ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=20000)
+        parser.add_argument('--episodes', type=int, default=5, help="Episodios por serie")
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--row-by-row', type=int, default=1000,
+            help="Títulos que se crean fila a fila para la referencia"
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = synthetic_vocabulary(rng)
+        genres = [f'Género {index}' for index in range(options['genres'])]
+
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as dump:
+            self.stderr.write(f"Generando volcado de {options['titles']} títulos...")
+            records = [
+                self.record(rng, vocabulary, genres, index, options['episodes'])
+                for index in range(options['titles'])
+            ]
+            for record in records:
+                dump.write(json.dumps(record).encode() + b'\n')
+            dump.flush()
+
+            with throwaway_database():
+                results = {
+                    'import': self.run_import(dump.name, options['chunk_size']),
+                    'reimport': self.run_import(dump.name, options['chunk_size']),
+                    'row_by_row': self.run_row_by_row(records[:options['row_by_row']]),
+                }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>10}: {stats['records']} títulos en {stats['seconds']} s, "
+                f"{stats['records_per_s']} títulos/s, {stats['queries_per_record']} consultas/título"
+            )
+
+    def record(self, rng, vocabulary, genres, index, episodes):
+        content_type = rng.choice(['movie', 'series', 'documentary'])
+        record = {
+            'external_id': f'bench-{index}',
+            'title': ' '.join(rng.choices(vocabulary, k=rng.randint(1, 4))).capitalize(),
+            'description': ' '.join(rng.choices(vocabulary, k=20)),
+            'release_year': rng.randint(1950, 2025),
+            'content_type': content_type,
+            'genres': rng.sample(genres, min(len(genres), rng.randint(1, 3))),
+            'thumbnail': 'https://example.com/thumbnail.jpg',
+            'video_file': 'https://example.com/video.mp4',
+        }
+        if content_type == 'series':
+            record['episodes'] = [
+                {
+                    'title': f'Episodio {number}', 'season_number': number // 10 + 1,
+                    'episode_number': number % 10 + 1, 'duration': rng.randint(20, 60),
+                    'video_file': 'https://example.com/video.mp4',
+                }
+                for number in range(episodes)
+            ]
+        return record
+
+    def measure(self, records, run):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            run()
+        seconds = time.perf_counter() - start
+        return {
+            'records': records,
+            'seconds': round(seconds, 2),
+            'records_per_s': round(records / seconds, 1) if seconds else None,
+            'queries_per_record': round(counter.count / records, 2) if records else None,
+        }
+
+    def run_import(self, path, chunk_size):
+        importer = CatalogueImporter(chunk_size=chunk_size)
+
+        def run():
+            with open(path, 'rb') as dump:
+                importer.run(read_records(dump))
+
+        stats = self.measure(sum(1 for _ in open(path, 'rb')), run)
+        stats['result'] = importer.stats
+        return stats
+
+    def run_row_by_row(self, records):
+        """
+        Lo que costaba antes: un save() por título y por episodio y un
+        genres.add() por título.
+        """
+        def run():
+            genres = {}
+            for record in records:
+                content = Content.objects.create(
+                    external_id=f"row-{record['external_id']}",
+                    **{key: record[key] for key in [
+                        'title', 'description', 'release_year', 'content_type', 'thumbnail', 'video_file'
+                    ]}
+                )
+                for name in record['genres']:
+                    if name not in genres:
+                        genres[name], _ = Genre.objects.get_or_create(name=name)
+                content.genres.add(*(genres[name] for name in record['genres']))
+                for episode in record.get('episodes', []):
+                    Episode.objects.create(series=content, **episode)
+
+        return self.measure(len(records), run)
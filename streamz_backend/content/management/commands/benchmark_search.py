@@ -0,0 +1,70 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from content.models import Content
+from content.search import FullTextSearchFilter
+from content.views import ContentViewSet
+from streamz_backend.benchmarking import (
+    create_titles, measure, synthetic_vocabulary, throwaway_database
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda del catálogo con LIKE (SearchFilter) frente al índice "
+        "de texto completo, sobre un catálogo sintético en una base de datos desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = synthetic_vocabulary(rng)
+
+        with throwaway_database():
+            self.stderr.write(f"Generando {options['titles']} títulos...")
+            create_titles(rng, vocabulary, options['titles'])
+
+            terms = [
+                rng.choice(vocabulary)[:rng.randint(3, 5)] for _ in range(options['queries'])
+            ]
+            results = {
+                'like': self.run_backend(filters.SearchFilter, terms),
+                'fulltext': self.run_backend(FullTextSearchFilter, terms),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>9}: media {stats['mean_ms']} ms, p95 {stats['p95_ms']} ms, "
+                f"{stats['ops_per_s']} búsquedas/s"
+            )
+
+    def run_backend(self, backend_class, terms):
+        """
+        Mide lo que hace el endpoint por búsqueda: COUNT de la paginación y
+        primera página de resultados.
+        """
+        factory = APIRequestFactory()
+        view = ContentViewSet()
+        backend = backend_class()
+        pending = iter(terms)
+
+        def search():
+            request = Request(factory.get('/', {'search': next(pending)}))
+            queryset = backend.filter_queryset(request, Content.objects.all(), view)
+            queryset.count()
+            list(queryset[:20])
+
+        return measure(search, len(terms))
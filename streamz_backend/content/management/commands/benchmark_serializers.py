@@ -0,0 +1,94 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from content.compact import ContentCompactSerializer, genre_names
+from content.models import Content, Genre
+from content.serializers import ContentSerializer
+from streamz_backend.benchmarking import generate_dataset, measure, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el coste por elemento de serializar páginas del catálogo con "
+        "ContentSerializer (DRF, instancias con prefetch de géneros) frente a "
+        "ContentCompactSerializer sobre instancias y sobre filas de .values(), "
+        "en una base de datos desechable. Comprueba además que el JSON es idéntico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=5000)
+        parser.add_argument('--pages', type=int, default=500, help="Páginas serializadas por variante")
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        page_size = options['page_size']
+
+        with throwaway_database():
+            self.stderr.write(f"Generando {options['titles']} títulos...")
+            generate_dataset(
+                users=1, titles=options['titles'], episodes=0, genres=20, events=0,
+                seed=options['seed']
+            )
+            ordered = Content.objects.order_by('-release_year', 'id')
+            ids = list(ordered.values_list('id', flat=True))
+            pages = [
+                ids[start:start + page_size]
+                for start in (
+                    rng.randrange(0, max(1, len(ids) - page_size)) for _ in range(options['pages'])
+                )
+            ]
+            variants = {
+                'drf': self.drf_page,
+                'compact-instances': self.compact_instances_page,
+                'compact': self.compact_rows_page,
+            }
+
+            # Mismo JSON byte a byte en todas las variantes
+            expected = JSONRenderer().render(self.drf_page(pages[0]))
+            for name, variant in variants.items():
+                if JSONRenderer().render(variant(pages[0])) != expected:
+                    raise CommandError(f"{name} no produce el mismo JSON que ContentSerializer")
+
+            genre_names()  # el mapa de nombres está en caché salvo tras cambios
+            results = {}
+            for name, variant in variants.items():
+                pending = iter(pages)
+                stats = measure(lambda: variant(next(pending)), len(pages))
+                stats['us_per_item'] = round(stats['mean_ms'] * 1000 / page_size, 1)
+                results[name] = stats
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        baseline = results['drf']['us_per_item']
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>18}: {stats['us_per_item']} µs/elemento "
+                f"(x{baseline / stats['us_per_item']:.1f}), página {stats['mean_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, {stats['queries']} consultas"
+            )
+
+    # Cada variante lee una página por ids y la serializa, como hacen las vistas
+
+    def drf_page(self, ids):
+        contents = Content.objects.filter(id__in=ids).order_by('-release_year', 'id').prefetch_related(
+            Prefetch('genres', queryset=Genre.objects.order_by('id'))
+        )
+        return ContentSerializer(contents, many=True).data
+
+    def compact_instances_page(self, ids):
+        contents = Content.objects.filter(id__in=ids).order_by('-release_year', 'id')
+        return ContentCompactSerializer(list(contents), many=True).data
+
+    def compact_rows_page(self, ids):
+        rows = Content.objects.filter(id__in=ids).order_by('-release_year', 'id').values(
+            *ContentCompactSerializer.columns()
+        )
+        return ContentCompactSerializer(rows, many=True).data
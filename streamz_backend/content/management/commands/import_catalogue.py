@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from content.importer import CatalogueImporter, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa un volcado del catálogo (JSON lines o CSV) por bloques, creando o "
+        "actualizando títulos, episodios y géneros según su external_id. "
+        "Usa '-' para leer de la entrada estándar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'],
+            help="Formato del volcado (por defecto, según la extensión)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--json', action='store_true', help="Resumen en JSON")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        self.started = time.perf_counter()
+
+        if path == '-':
+            self.size = None
+            stats, errors = self.run(sys.stdin.buffer, format, options['chunk_size'])
+        else:
+            try:
+                dump = open(path, 'rb')
+            except OSError as exc:
+                raise CommandError(f"No se puede abrir {path}: {exc}")
+            self.size = os.path.getsize(path)
+            with dump:
+                stats, errors = self.run(dump, format, options['chunk_size'])
+
+        stats['seconds'] = round(time.perf_counter() - self.started, 2)
+        if options['json']:
+            self.stdout.write(json.dumps({**stats, 'first_errors': errors}, indent=2))
+            return
+        for number, message in errors:
+            self.stderr.write(f"Línea {number}: {message}")
+        self.stdout.write(
+            f"{stats['records']} registros en {stats['seconds']} s: "
+            f"títulos {stats['contents_created']} creados, {stats['contents_updated']} actualizados, "
+            f"{stats['contents_unchanged']} sin cambios; episodios {stats['episodes_created']} creados, "
+            f"{stats['episodes_updated']} actualizados, {stats['episodes_unchanged']} sin cambios; "
+            f"{stats['errors']} errores"
+        )
+
+    def run(self, dump, format, chunk_size):
+        importer = CatalogueImporter(chunk_size=chunk_size, progress=self.report_progress)
+        stats = importer.run(read_records(dump, format))
+        return stats, importer.errors
+
+    def report_progress(self, stats, position):
+        elapsed = time.perf_counter() - self.started
+        done = f"{position / self.size:.0%} " if self.size else ''
+        self.stderr.write(
+            f"{done}{stats['records']} registros ({stats['records'] / elapsed:.0f}/s), "
+            f"{stats['errors']} errores"
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('content', '0002_content_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['-release_year', 'id'], name='content_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['content_type', '-release_year', 'id'], name='content_type_year_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+from content.search import create_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        # Al revertir, SQLite también reconstruye la tabla: recrear los triggers al final
+        migrations.RunPython(migrations.RunPython.noop, create_search_index),
+        migrations.AddField(
+            model_name='content',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        # SQLite reconstruye content_content para añadir la columna única, lo que
+        # elimina los triggers del índice de búsqueda: volver a crearlos
+        migrations.RunPython(create_search_index, migrations.RunPython.noop),
+    ]
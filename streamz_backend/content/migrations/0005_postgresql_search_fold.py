@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from content.search import rebuild_postgresql_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_external_ids'),
+    ]
+
+    operations = [
+        # Índice de PostgreSQL sin tildes (ver POSTGRESQL_FOLD); en SQLite no hace nada
+        migrations.RunPython(rebuild_postgresql_search_index, migrations.RunPython.noop),
+    ]
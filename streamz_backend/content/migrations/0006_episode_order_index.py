@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_postgresql_search_fold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['series', 'season_number', 'episode_number'], name='episode_order_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+def backfill_entitlement_tiers(apps, schema_editor):
+    """
+    Nivel de cada título: el precio de su plan mínimo, como
+    content.entitlements.refresh_entitlement_tiers.
+    """
+    SubscriptionPlan = apps.get_model('authentication', 'SubscriptionPlan')
+    Content = apps.get_model('content', 'Content')
+    for plan_id, price in SubscriptionPlan.objects.values_list('id', 'price'):
+        Content.objects.filter(min_subscription_plan_id=plan_id).update(entitlement_tier=price)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('content', '0006_episode_order_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='entitlement_tier',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=6, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['entitlement_tier', 'content_type', '-release_year', 'id'], name='content_tier_type_year_idx'),
+        ),
+        migrations.RunPython(backfill_entitlement_tiers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# content/mixins.py
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, QuerySet, prefetch_related_objects
+
+
+class EagerLoadingMixin:
+    """
+    Aplica a lo que se va a serializar las relaciones que declara el serializer
+    (select_related_fields y prefetch_related_fields), de modo que una página
+    cueste un número fijo de consultas en lugar de una por elemento.
+
+    Funciona tanto con querysets como con listas ya evaluadas (por ejemplo,
+    resultados de in_bulk o páginas de un paginador).
+    """
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.plan_queries(queryset))
+
+    def get_serializer(self, *args, **kwargs):
+        if args:
+            args = (self.plan_queries(args[0]),) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def plan_queries(self, instance):
+        serializer_class = self.get_serializer_class()
+        select_related = getattr(serializer_class, 'select_related_fields', [])
+        prefetch_related = getattr(serializer_class, 'prefetch_related_fields', [])
+
+        if isinstance(instance, QuerySet):
+            # Un queryset ya evaluado no admite cambios sin volver a consultar
+            if instance._result_cache is None:
+                if select_related:
+                    instance = instance.select_related(*select_related)
+                if prefetch_related:
+                    instance = instance.prefetch_related(*prefetch_related)
+            return instance
+
+        instances = [instance] if isinstance(instance, Model) else instance
+        if isinstance(instances, (list, tuple)) and instances:
+            # prefetch_related_objects omite las relaciones que ya están cargadas,
+            # pero no las claves ajenas nulas: consultaría "id = NULL"
+            lookups = [
+                lookup for lookup in (*select_related, *prefetch_related)
+                if not self.is_null_relation(instances, lookup)
+            ]
+            if lookups:
+                prefetch_related_objects(list(instances), *lookups)
+        return instance
+
+    @staticmethod
+    def is_null_relation(instances, lookup):
+        """
+        La relación por la que empieza lookup es una clave ajena nula en todos los objetos.
+        """
+        name = getattr(lookup, 'prefetch_through', lookup).split('__')[0]
+        model = type(instances[0])
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return False
+        return all(isinstance(item, model) and getattr(item, field.attname) is None for item in instances)
+
+
+class CompactListMixin:
+    """
+    Sirve los listados con un serializer compacto (content/compact.py) sobre
+    filas de .values() en lugar de instancias y ModelSerializer. Debe ir antes
+    de EagerLoadingMixin: el serializer compacto carga él mismo los géneros.
+
+    compact_serializer_class: serializer compacto de la vista.
+    compact_actions: acciones en las que se usa (las vistas genéricas, que
+    no tienen acciones, cuentan como 'list').
+    """
+    compact_serializer_class = None
+    compact_actions = ('list',)
+
+    def use_compact(self):
+        return (
+            self.compact_serializer_class is not None
+            and getattr(settings, 'COMPACT_SERIALIZERS', True)
+            and getattr(self, 'action', 'list') in self.compact_actions
+        )
+
+    def get_serializer_class(self):
+        if self.use_compact():
+            return self.compact_serializer_class
+        return super().get_serializer_class()
+
+    def paginate_queryset(self, queryset):
+        if isinstance(queryset, QuerySet) and self.use_compact():
+            queryset = queryset.values(*self.compact_serializer_class.columns())
+        return super().paginate_queryset(queryset)
+
+    def in_bulk_ordered(self, queryset, ids):
+        """
+        Elementos de queryset con los ids dados, en ese orden: filas de
+        .values() con el serializer compacto o instancias sin él.
+        """
+        if self.use_compact():
+            rows = queryset.filter(pk__in=ids).values(*self.compact_serializer_class.columns())
+            by_id = {row['id']: row for row in rows}
+        else:
+            by_id = queryset.in_bulk(ids)
+        return [by_id[pk] for pk in ids if pk in by_id]
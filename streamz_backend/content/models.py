@@ -21,6 +21,46 @@ class Content(models.Model):
     thumbnail = models.URLField()
     video_file = models.URLField()
     min_subscription_plan = models.ForeignKey('authentication.SubscriptionPlan', on_delete=models.SET_NULL, null=True)
+    # Precio del plan mínimo, su nivel de acceso (content/entitlements.py), para filtrar sin join con los planes
+    entitlement_tier = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, editable=False)
+    # Identificador en el catálogo de origen, para importar de forma idempotente
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Paginación por cursor del catálogo y de movies/series/documentaries
+            models.Index(fields=['-release_year', 'id'], name='content_year_id_idx'),
+            models.Index(fields=['content_type', '-release_year', 'id'], name='content_type_year_id_idx'),
+            # Catálogo filtrado por el plan del usuario
+            models.Index(
+                fields=['entitlement_tier', 'content_type', '-release_year', 'id'],
+                name='content_tier_type_year_idx'
+            ),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Plan con el que se cargó, para recalcular el nivel solo si cambia
+        instance._saved_plan_id = instance.__dict__.get('min_subscription_plan_id', ...)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if self.min_subscription_plan_id != getattr(self, '_saved_plan_id', ...):
+            self.entitlement_tier = self.plan_tier()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'min_subscription_plan' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'entitlement_tier'}
+        super().save(*args, **kwargs)
+        self._saved_plan_id = self.min_subscription_plan_id
+    
+    def plan_tier(self):
+        from .entitlements import tier_for_plan
+        
+        # Sin consulta si el plan ya está cargado (p. ej. asignado como objeto)
+        if self.min_subscription_plan_id and Content.min_subscription_plan.is_cached(self):
+            return self.min_subscription_plan.price
+        return tier_for_plan(self.min_subscription_plan_id)
     
     def __str__(self):
         return self.title
@@ -32,6 +72,13 @@ class Episode(models.Model):
     season_number = models.IntegerField()
     video_file = models.URLField()
     duration = models.IntegerField()  # en minutos
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Episodios de una serie en orden (siguiente episodio, temporadas)
+            models.Index(fields=['series', 'season_number', 'episode_number'], name='episode_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.series.title} - S{self.season_number}E{self.episode_number} - {self.title}"
\ No newline at end of file
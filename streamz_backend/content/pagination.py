@@ -0,0 +1,152 @@
+# content/pagination.py
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor sobre una clave compuesta (keyset).
+
+    El cursor guarda los valores de `ordering` del último (o primer) elemento de
+    la página y la siguiente página se obtiene con un WHERE sobre esos valores,
+    de modo que la página N cuesta lo mismo que la primera: sin COUNT(*) ni
+    OFFSET. El último campo de `ordering` debe ser único (normalmente el id) y
+    conviene que exista un índice con el mismo orden.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            # Para la página anterior se recorre el orden al revés y se invierte el resultado
+            ordering = tuple(self.invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        try:
+            if position is not None:
+                queryset = queryset.filter(self.after(ordering, position))
+            results = list(queryset[:self.page_size + 1])
+        except (TypeError, ValueError, ValidationError):
+            # Valores del cursor que no corresponden al tipo de los campos
+            raise NotFound(self.invalid_cursor_message)
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position(self.page[0]), reverse=True)
+
+    def position(self, instance):
+        # Instancias o filas de .values() (content.mixins.CompactListMixin)
+        if isinstance(instance, dict):
+            return [instance[field.lstrip('-')] for field in self.ordering]
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def after(self, ordering, position):
+        """
+        Condición "fila posterior a position" en el orden dado:
+        (a < va) OR (a = va AND b > vb) OR ...
+
+        Se añade además la cota del primer campo (a <= va) para que la base de
+        datos pueda recorrer el índice como un rango.
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': position[index]}))
+
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & reduce(or_, conditions)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = {'p': position}
+        if reverse:
+            cursor['r'] = 1
+        # default=str conserva los microsegundos de las fechas, a diferencia de
+        # DjangoJSONEncoder, y Django los vuelve a interpretar al filtrar
+        encoded = urlsafe_b64encode(
+            json.dumps(cursor, default=str, separators=(',', ':')).encode()
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class CatalogueKeysetPagination(KeysetPagination):
+    # Usa los índices (content_type, -release_year, id) y (-release_year, id)
+    ordering = ('-release_year', 'id')
+
+
+class EpisodeKeysetPagination(KeysetPagination):
+    # Episodios de una serie en orden, sobre el índice (series, season_number, episode_number)
+    ordering = ('season_number', 'episode_number', 'id')
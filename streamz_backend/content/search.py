@@ -0,0 +1,204 @@
+# content/search.py
+import re
+
+from django.db import connections
+from django.db.utils import OperationalError
+from rest_framework import filters
+
+SQLITE_INDEX = 'content_content_fts'
+POSTGRESQL_INDEX = 'content_content_search_idx'
+
+# Quita las tildes (la configuración 'simple' no lo hace y la extensión
+# unaccent no es IMMUTABLE, así que no sirve en un índice)
+POSTGRESQL_FOLD = 'streamz_fold'
+ACCENTED = 'áàâäãéèêëíìîïóòôöõúùûüñçÁÀÂÄÃÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÑÇ'
+UNACCENTED = 'aaaaaeeeeiiiiooooouuuuncAAAAAEEEEIIIIOOOOOUUUUNC'
+
+# Misma expresión que indexa el índice GIN, para que PostgreSQL lo use
+POSTGRESQL_VECTOR = (
+    f"to_tsvector('simple', {POSTGRESQL_FOLD}(coalesce(content_content.title, '') || ' ' || "
+    "coalesce(content_content.description, '')))"
+)
+# Para ordenar: el título pesa más que la descripción (como bm25 en SQLite).
+# Solo se calcula para las filas que ya filtró el índice
+POSTGRESQL_RANK_VECTOR = (
+    f"setweight(to_tsvector('simple', {POSTGRESQL_FOLD}(coalesce(content_content.title, ''))), 'A') || "
+    f"setweight(to_tsvector('simple', {POSTGRESQL_FOLD}(coalesce(content_content.description, ''))), 'D')"
+)
+
+SQLITE_FORWARD = [
+    # Índice FTS5 de contenido externo: guarda solo el índice, no una copia de los textos
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_INDEX} USING fts5(
+        title, description,
+        content='content_content', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )
+    """,
+    # Triggers que mantienen el índice sincronizado con content_content
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_insert AFTER INSERT ON content_content BEGIN
+        INSERT INTO {SQLITE_INDEX}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_delete AFTER DELETE ON content_content BEGIN
+        INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_INDEX}_update
+    AFTER UPDATE OF title, description ON content_content BEGIN
+        INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SQLITE_INDEX}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"INSERT INTO {SQLITE_INDEX}({SQLITE_INDEX}) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_insert",
+    f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_delete",
+    f"DROP TRIGGER IF EXISTS {SQLITE_INDEX}_update",
+    f"DROP TABLE IF EXISTS {SQLITE_INDEX}",
+]
+
+POSTGRESQL_FORWARD = [
+    f"""
+    CREATE OR REPLACE FUNCTION {POSTGRESQL_FOLD}(text) RETURNS text
+    AS $$ SELECT translate($1, '{ACCENTED}', '{UNACCENTED}') $$
+    LANGUAGE SQL IMMUTABLE PARALLEL SAFE
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {POSTGRESQL_INDEX} ON content_content USING GIN (
+        to_tsvector('simple', {POSTGRESQL_FOLD}(coalesce(title, '') || ' ' || coalesce(description, '')))
+    )
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    f"DROP INDEX IF EXISTS {POSTGRESQL_INDEX}",
+    f"DROP FUNCTION IF EXISTS {POSTGRESQL_FOLD}(text)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Crea (o recrea) el índice de texto completo de Content. Es idempotente, así
+    que las migraciones que reconstruyen la tabla en SQLite (y con ello pierden
+    los triggers) pueden volver a llamarla.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for sql in SQLITE_FORWARD:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # SQLite compilado sin FTS5: la búsqueda sigue usando LIKE
+            for sql in SQLITE_BACKWARD:
+                schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        for sql in POSTGRESQL_FORWARD:
+            schema_editor.execute(sql)
+    _index_available.clear()
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        for sql in POSTGRESQL_BACKWARD:
+            schema_editor.execute(sql)
+    _index_available.clear()
+
+
+def rebuild_postgresql_search_index(apps, schema_editor):
+    """
+    Vuelve a crear el índice de PostgreSQL cuando cambia su expresión. En
+    SQLite no hace nada (reconstruir FTS5 no es necesario).
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRESQL_BACKWARD + POSTGRESQL_FORWARD:
+            schema_editor.execute(sql)
+
+
+# Caché por alias de base de datos de si existe el índice FTS5
+_index_available = {}
+
+
+def sqlite_index_available(using):
+    if using not in _index_available:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_INDEX]
+            )
+            _index_available[using] = cursor.fetchone() is not None
+    return _index_available[using]
+
+
+def search_words(terms):
+    """
+    Separa los términos de búsqueda en palabras, descartando la sintaxis
+    propia de cada motor (comillas, operadores, etc.).
+    """
+    return [word for term in terms for word in re.findall(r'\w+', term)]
+
+
+def fold(word):
+    """
+    Quita las tildes de una palabra, como streamz_fold en PostgreSQL.
+    """
+    return word.translate(FOLD_TABLE)
+
+
+FOLD_TABLE = str.maketrans(ACCENTED, UNACCENTED)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter que usa el índice de texto completo de la base de datos en
+    lugar de LIKE: FTS5 en SQLite y tsvector en PostgreSQL.
+
+    Cada palabra se busca por prefijo (búsqueda mientras se escribe) y los
+    resultados se ordenan por relevancia. Con otros motores, o si el índice no
+    existe, se usa el SearchFilter estándar.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        words = search_words(self.get_search_terms(request))
+        if not words:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        if vendor == 'sqlite' and sqlite_index_available(queryset.db):
+            return self.filter_sqlite(queryset, words)
+        if vendor == 'postgresql':
+            return self.filter_postgresql(queryset, words)
+        return super().filter_queryset(request, queryset, view)
+
+    def filter_sqlite(self, queryset, words):
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.extra(
+            tables=[SQLITE_INDEX],
+            where=[f'{SQLITE_INDEX}.rowid = content_content.id', f'{SQLITE_INDEX} MATCH %s'],
+            params=[match],
+            # bm25 devuelve valores más bajos cuanto más relevante; el título pesa más
+            select={'search_rank': f'bm25({SQLITE_INDEX}, 10.0, 1.0)'},
+            order_by=['search_rank'],
+        )
+
+    def filter_postgresql(self, queryset, words):
+        tsquery = ' & '.join(f'{fold(word)}:*' for word in words)
+        return queryset.extra(
+            where=[f"{POSTGRESQL_VECTOR} @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+            select={'search_rank': f"ts_rank({POSTGRESQL_RANK_VECTOR}, to_tsquery('simple', %s))"},
+            select_params=[tsquery],
+            order_by=['-search_rank'],
+        )
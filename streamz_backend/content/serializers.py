@@ -1,27 +1,46 @@
 # content/serializers.py
+from django.db.models import Count, Prefetch, Sum
 from rest_framework import serializers
+from streamz_backend.instrumentation import TimedSerializerMixin
 from .models import Genre, Content, Episode
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ['id', 'name']
 
-class EpisodeSerializer(serializers.ModelSerializer):
+class EpisodeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Episode
         fields = ['id', 'title', 'season_number', 'episode_number', 'video_file', 'duration']
 
-class ContentSerializer(serializers.ModelSerializer):
+class ContentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     genres = GenreSerializer(many=True, read_only=True)
     
+    # Relaciones que las vistas cargan por adelantado (ver content.mixins.EagerLoadingMixin)
+    prefetch_related_fields = [
+        Prefetch('genres', queryset=Genre.objects.order_by('id')),
+    ]
+    
     class Meta:
         model = Content
         fields = ['id', 'title', 'description', 'release_year', 'content_type', 
                   'genres', 'thumbnail', 'video_file', 'min_subscription_plan']
 
 class ContentDetailSerializer(ContentSerializer):
-    episodes = EpisodeSerializer(many=True, read_only=True)
+    # Solo el resumen por temporada: los episodios se piden paginados a
+    # content/{id}/episodes/?season=, así que el detalle no crece con la serie
+    seasons = serializers.SerializerMethodField()
     
     class Meta(ContentSerializer.Meta):
-        fields = ContentSerializer.Meta.fields + ['episodes']
\ No newline at end of file
+        fields = ContentSerializer.Meta.fields + ['seasons']
+    
+    def get_seasons(self, obj):
+        """
+        Número de episodios y duración total (minutos) de cada temporada.
+        """
+        return list(
+            obj.episodes.order_by('season_number').values('season_number').annotate(
+                episodes=Count('id'), duration=Sum('duration')
+            )
+        )
@@ -0,0 +1,44 @@
+# content/signals.py
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+from .models import Genre, Content, Episode
+from .cache import bump_catalogue_version
+from .compact import invalidate_genre_names
+from .entitlements import refresh_entitlement_tiers
+
+# Enviada por el importador (bulk_create/bulk_update no envían señales) con los
+# ids de los contenidos existentes que cambiaron, ellos o sus episodios o géneros
+# (content_ids), y los de los episodios existentes que cambiaron (episode_ids)
+catalogue_imported = Signal()
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+@receiver(post_save, sender='authentication.SubscriptionPlan')
+@receiver(post_delete, sender='authentication.SubscriptionPlan')
+def invalidate_catalogue_cache(sender, **kwargs):
+    """
+    Invalida las respuestas cacheadas del catálogo cuando cambia algo que aparece en ellas
+    """
+    bump_catalogue_version()
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_names_cache(sender, **kwargs):
+    # Mapa id -> nombre de los serializers compactos
+    invalidate_genre_names()
+
+@receiver(post_save, sender='authentication.SubscriptionPlan')
+@receiver(post_delete, sender='authentication.SubscriptionPlan')
+def refresh_plan_tiers(sender, **kwargs):
+    # Un cambio de precio o un plan borrado (SET_NULL en sus títulos, sin
+    # señales) cambian el nivel de acceso de sus títulos
+    refresh_entitlement_tiers()
+
+@receiver(m2m_changed, sender=Content.genres.through)
+def invalidate_catalogue_cache_on_genres(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalogue_version()
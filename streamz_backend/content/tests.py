@@ -1,3 +1,608 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from authentication.models import User, SubscriptionPlan
+from streamz_backend.database import database_config
+from streamz_backend.instrumentation import (
+    InstrumentationMiddleware, RequestMetrics, _current_metrics, instrument_connection, registry
+)
+from .compact import ContentCompactSerializer, genre_names
+from .importer import CatalogueImporter, read_records
+from .models import Content, Episode, Genre
+from .serializers import ContentSerializer
+
+
+class QueryBudgetMixin:
+    """
+    Comprueba que un endpoint hace el mismo número fijo de consultas sin importar
+    cuántos elementos devuelva.
+    """
+
+    def assertQueryBudget(self, url, budget, add_items, sizes=(1, 10)):
+        for size in sizes:
+            add_items(size)
+            with self.subTest(url=url, size=size), self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+
+def create_content(plan, genres, content_type='movie', **kwargs):
+    content = Content.objects.create(
+        title=kwargs.pop('title', 'Título'), description=kwargs.pop('description', '...'),
+        release_year=kwargs.pop('release_year', 2020), content_type=content_type,
+        thumbnail='http://example.com/t.jpg', video_file='http://example.com/v.mp4',
+        min_subscription_plan=plan, **kwargs
+    )
+    content.genres.set(genres)
+    return content
+
+
+class ContentTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = SubscriptionPlan.objects.create(
+            name='premium', price=15, max_screens=4, video_quality='4K'
+        )
+        cls.user = User.objects.create_user(username='ana', password='secreto123', plan=cls.plan)
+        cls.genres = [Genre.objects.create(name=name) for name in ('Drama', 'Comedia')]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class ContentQueryBudgetTests(QueryBudgetMixin, ContentTestCase):
+    def add_content(self, count, content_type='movie'):
+        for _ in range(count):
+            create_content(self.plan, self.genres, content_type)
+
+    def test_listings(self):
+        # Página (paginación por cursor, sin COUNT) y géneros; los nombres de
+        # los géneros salen del mapa en caché (content/compact.py)
+        genre_names()
+        self.assertQueryBudget('/api/content/content/', 2, self.add_content)
+        self.assertQueryBudget(
+            '/api/content/content/series/', 2,
+            lambda count: self.add_content(count, 'series')
+        )
+
+    def test_detail(self):
+        series = create_content(self.plan, self.genres, 'series')
+
+        def add_episodes(count):
+            for number in range(count):
+                Episode.objects.create(
+                    series=series, title='Episodio', season_number=1,
+                    episode_number=number, video_file='http://example.com/e.mp4', duration=40
+                )
+
+        # Contenido, géneros y resumen de temporadas: no depende del número de episodios
+        self.assertQueryBudget(f'/api/content/content/{series.id}/', 3, add_episodes)
+        # Serie y página de episodios
+        self.assertQueryBudget(f'/api/content/content/{series.id}/episodes/', 2, add_episodes)
+
+
+class FullTextSearchTests(ContentTestCase):
+    def search(self, term):
+        response = self.client.get('/api/content/content/', {'search': term})
+        return [item['title'] for item in response.data['results']]
+
+    def test_prefix_matching_and_ranking(self):
+        create_content(self.plan, self.genres, title='Cielo rojo', description='Un drama sobre marte')
+        create_content(self.plan, self.genres, title='Marte', description='Documental espacial')
+        create_content(self.plan, self.genres, title='Océano', description='Nada que ver')
+
+        self.assertEqual(self.search('mar'), ['Marte', 'Cielo rojo'])
+        self.assertEqual(self.search('oceano'), ['Océano'])
+
+    def test_index_follows_updates_and_deletes(self):
+        content = create_content(self.plan, self.genres, title='Borrador', description='...')
+        content.title = 'Definitivo'
+        content.save()
+
+        self.assertEqual(self.search('borr'), [])
+        self.assertEqual(self.search('defin'), ['Definitivo'])
+
+        content.delete()
+        self.assertEqual(self.search('defin'), [])
+
+    def test_search_syntax_is_ignored(self):
+        create_content(self.plan, self.genres, title='Marte', description='...')
+
+        self.assertEqual(self.search('"mar*'), ['Marte'])
+
+
+class KeysetPaginationTests(ContentTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Varios títulos por año para cubrir los empates en release_year
+        for number in range(45):
+            create_content(cls.plan, cls.genres, title=f'T{number}', release_year=2000 + number % 4)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_follow_keyset_order(self):
+        expected = list(Content.objects.order_by('-release_year', 'id').values_list('id', flat=True))
+
+        self.assertEqual(self.walk('/api/content/content/'), expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/content/content/')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(first.data['previous'])
+
+    def test_deep_pages_cost_the_same(self):
+        response = self.client.get('/api/content/content/')
+        response = self.client.get(response.data['next'])
+        with self.assertNumQueries(2):
+            self.client.get(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/content/content/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class EpisodeListTests(ContentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.series = create_content(self.plan, self.genres, 'series')
+        for season, count in ((2, 3), (1, 25)):
+            for number in range(1, count + 1):
+                Episode.objects.create(
+                    series=self.series, title=f'T{season}E{number}', season_number=season,
+                    episode_number=number, video_file='http://example.com/e.mp4', duration=40 + season
+                )
+
+    def test_detail_has_season_summary(self):
+        response = self.client.get(f'/api/content/content/{self.series.id}/')
+
+        self.assertNotIn('episodes', response.data)
+        self.assertEqual(response.data['seasons'], [
+            {'season_number': 1, 'episodes': 25, 'duration': 25 * 41},
+            {'season_number': 2, 'episodes': 3, 'duration': 3 * 42},
+        ])
+
+    def test_episodes_are_paginated_in_order(self):
+        url = f'/api/content/content/{self.series.id}/episodes/'
+        titles = []
+        while url:
+            response = self.client.get(url)
+            titles += [episode['title'] for episode in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(titles, [f'T1E{number}' for number in range(1, 26)] + ['T2E1', 'T2E2', 'T2E3'])
+
+    def test_episodes_of_a_season(self):
+        response = self.client.get(f'/api/content/content/{self.series.id}/episodes/?season=2')
+        self.assertEqual([episode['episode_number'] for episode in response.data['results']], [1, 2, 3])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get(f'/api/content/content/{self.series.id}/episodes/?season=uno')
+        self.assertEqual(response.status_code, 400)
+
+    def test_single_episode(self):
+        episode = self.series.episodes.get(season_number=2, episode_number=3)
+        response = self.client.get(f'/api/content/content/{self.series.id}/episodes/{episode.id}/')
+        self.assertEqual(response.data['title'], 'T2E3')
+
+        other = create_content(self.plan, self.genres, 'series')
+        self.assertEqual(self.client.get(f'/api/content/content/{other.id}/episodes/{episode.id}/').status_code, 404)
+
+    @override_settings(DEBUG=False)
+    def test_episodes_follow_plan_entitlement(self):
+        basic = SubscriptionPlan.objects.create(name='básico', price=5, max_screens=1, video_quality='SD')
+        self.client.force_authenticate(User.objects.create_user(username='luis', password='secreto123', plan=basic))
+
+        response = self.client.get(f'/api/content/content/{self.series.id}/episodes/')
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogueCacheTests(ContentTestCase):
+    def test_repeated_reads_are_served_from_cache(self):
+        create_content(self.plan, self.genres, title='Marte')
+        first = self.client.get('/api/content/content/movies/')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/content/content/movies/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/content/genres/')['ETag']
+
+        response = self.client.get('/api/content/genres/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalogue_changes_invalidate_responses(self):
+        content = create_content(self.plan, self.genres[:1], title='Marte')
+        etag = self.client.get('/api/content/content/')['ETag']
+
+        content.genres.add(self.genres[1])
+        response = self.client.get('/api/content/content/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results'][0]['genres']), 2)
+
+    @override_settings(DEBUG=False)
+    def test_responses_are_not_shared_between_plan_tiers(self):
+        basic = SubscriptionPlan.objects.create(name='básico', price=5, max_screens=1, video_quality='SD')
+        create_content(basic, self.genres, title='Para todos')
+        create_content(self.plan, self.genres, title='Solo premium')
+        basic_user = User.objects.create_user(username='luis', password='secreto123', plan=basic)
+
+        premium = self.client.get('/api/content/content/')
+        self.client.force_authenticate(basic_user)
+        basic_response = self.client.get('/api/content/content/')
+
+        self.assertEqual(len(premium.data['results']), 2)
+        self.assertEqual([item['title'] for item in basic_response.data['results']], ['Para todos'])
+
+
+class CompactSerializerTests(ContentTestCase):
+    def setUp(self):
+        super().setUp()
+        create_content(self.plan, self.genres[::-1], title='Ñandú: «edición» especial')
+        create_content(None, [], 'series', title='Sin plan ni géneros')
+        create_content(self.plan, self.genres[:1], 'documentary', description='')
+
+    def test_same_json_as_model_serializer(self):
+        contents = Content.objects.order_by('id').prefetch_related('genres')
+        expected = JSONRenderer().render(ContentSerializer(contents, many=True).data)
+
+        rows = Content.objects.order_by('id').values(*ContentCompactSerializer.columns())
+        self.assertEqual(JSONRenderer().render(ContentCompactSerializer(rows, many=True).data), expected)
+        instances = list(Content.objects.order_by('id'))
+        self.assertEqual(JSONRenderer().render(ContentCompactSerializer(instances, many=True).data), expected)
+
+    def test_listings_match_model_serializer(self):
+        urls = [
+            '/api/content/content/', '/api/content/content/series/',
+            '/api/content/content/?search=nandu', '/api/streaming/recommendations/',
+        ]
+        compact = [self.client.get(url).content for url in urls]
+        cache.clear()
+        with override_settings(COMPACT_SERIALIZERS=False):
+            self.assertEqual([self.client.get(url).content for url in urls], compact)
+
+    def test_genre_names_follow_changes(self):
+        self.client.get('/api/content/content/')
+        self.genres[0].name = 'Drama romántico'
+        self.genres[0].save()
+        # Géneros creados sin señales (importador): el mapa se recarga al no encontrarlos
+        Genre.objects.bulk_create([Genre(name='Terror')])
+        Content.objects.get(content_type='documentary').genres.add(Genre.objects.get(name='Terror'))
+
+        names = {
+            genre['name'] for item in self.client.get('/api/content/content/').data['results']
+            for genre in item['genres']
+        }
+        self.assertEqual(names, {'Drama romántico', 'Comedia', 'Terror'})
+
+    def test_genre_names_expire(self):
+        genre_names()
+        # Renombrado en otro proceso: las señales no limpian esta caché
+        Genre.objects.filter(pk=self.genres[0].pk).update(name='Suspense')
+        self.assertNotEqual(genre_names()[self.genres[0].pk], 'Suspense')
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 301):
+            self.assertEqual(genre_names()[self.genres[0].pk], 'Suspense')
+
+
+@override_settings(DEBUG=False)
+class EntitlementTests(ContentTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.basic = SubscriptionPlan.objects.create(name='básico', price=5, max_screens=1, video_quality='SD')
+        cls.basic_user = User.objects.create_user(username='luis', password='secreto123', plan=cls.basic)
+
+    def titles(self, user):
+        self.client.force_authenticate(user)
+        return sorted(item['title'] for item in self.client.get('/api/content/content/').data['results'])
+
+    def test_tiers_follow_plan_prices(self):
+        cheap = create_content(self.basic, self.genres, title='Para todos')
+        premium = create_content(self.plan, self.genres, title='Solo premium')
+        create_content(None, self.genres, title='Sin plan')
+
+        self.assertEqual(
+            (cheap.entitlement_tier, premium.entitlement_tier), (self.basic.price, self.plan.price)
+        )
+        self.assertEqual(self.titles(self.basic_user), ['Para todos'])
+        self.assertEqual(self.titles(self.user), ['Para todos', 'Solo premium'])
+
+    def test_listing_does_not_join_plans(self):
+        create_content(self.basic, self.genres)
+        genre_names()
+        # Página y géneros
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/content/content/movies/')
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertFalse(any('subscriptionplan' in query['sql'] for query in context.captured_queries))
+
+    def test_plan_changes_update_content_tiers(self):
+        create_content(self.basic, self.genres, title='Para todos')
+        create_content(self.plan, self.genres, title='Solo premium')
+
+        # Un plan más barato no cambia el nivel de los demás
+        tiers = dict(Content.objects.values_list('title', 'entitlement_tier'))
+        free = SubscriptionPlan.objects.create(name='gratis', price=0, max_screens=1, video_quality='SD')
+        self.assertEqual(dict(Content.objects.values_list('title', 'entitlement_tier')), tiers)
+        self.assertEqual(self.titles(self.basic_user), ['Para todos'])
+
+        # Subir el precio del básico por encima del premium
+        self.basic.price = 20
+        self.basic.save()
+        self.assertEqual(self.titles(self.user), ['Solo premium'])
+
+        # Borrar un plan deja sus títulos fuera de todos los planes
+        self.plan.delete()
+        self.assertIsNone(Content.objects.get(title='Solo premium').entitlement_tier)
+        free_user = User.objects.create_user(username='eva', password='secreto123', plan=free)
+        self.assertEqual(self.titles(free_user), [])
+        self.assertEqual(self.titles(self.basic_user), ['Para todos'])
+
+    def test_free_plan_is_a_tier(self):
+        free = SubscriptionPlan.objects.create(name='gratis', price=0, max_screens=1, video_quality='SD')
+        create_content(free, self.genres, title='Gratis')
+        free_user = User.objects.create_user(username='eva', password='secreto123', plan=free)
+        no_plan = User.objects.create_user(username='leo', password='secreto123')
+
+        # No comparten respuestas en caché con los usuarios sin plan
+        self.assertEqual(self.titles(no_plan), [])
+        self.assertEqual(self.titles(free_user), ['Gratis'])
+
+    def test_saving_without_plan_change_does_not_read_plans(self):
+        content = Content.objects.get(pk=create_content(self.plan, self.genres).pk)
+        content.title = 'Otro título'
+        with CaptureQueriesContext(connection) as context:
+            content.save()
+        self.assertFalse(any('subscriptionplan' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(Content.objects.get(pk=content.pk).entitlement_tier, self.plan.price)
+
+    def test_content_plan_change_updates_tier(self):
+        content = create_content(self.plan, self.genres, title='Estreno')
+        content.min_subscription_plan = self.basic
+        content.save(update_fields=['min_subscription_plan'])
+
+        self.assertEqual(Content.objects.get(pk=content.pk).entitlement_tier, self.basic.price)
+        self.assertEqual(self.titles(self.basic_user), ['Estreno'])
+
+    def test_importer_sets_tiers(self):
+        dump = io.BytesIO((json.dumps({
+            'external_id': 'peli-1', 'title': 'Roma', 'release_year': 2018,
+            'content_type': 'movie', 'min_subscription_plan': 'básico',
+        }) + '\n').encode())
+        CatalogueImporter().run(read_records(dump))
+
+        self.assertEqual(Content.objects.get(external_id='peli-1').entitlement_tier, self.basic.price)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTests(ContentTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_server_timing_header(self):
+        self.user.is_staff = True
+        create_content(self.plan, self.genres)
+        genre_names()
+        response = self.client.get('/api/content/content/')
+
+        timing = response['Server-Timing']
+        self.assertIn('sql;dur=', timing)
+        self.assertIn('"2 consultas"', timing)
+        self.assertIn('serialize;dur=', timing)
+        self.assertNotIn('dup;', timing)
+
+    def test_server_timing_is_staff_only(self):
+        response = self.client.get('/api/content/content/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_authenticate(None)
+        self.assertFalse(self.client.get('/api/auth/plans/').has_header('Server-Timing'))
+
+    def test_async_requests_are_measured_in_async_mode(self):
+        async def view(request):
+            await Content.objects.acount()
+            return HttpResponse()
+
+        middleware = InstrumentationMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = AsyncRequestFactory().get('/')
+        request.user = User(is_staff=True)
+        response = async_to_sync(middleware)(request)
+        self.assertIn('"1 consultas"', response['Server-Timing'])
+
+    def test_duplicate_queries_are_traced_to_serializer_field(self):
+        for _ in range(3):
+            create_content(self.plan, self.genres)
+
+        instrument_connection(connection)
+        metrics = RequestMetrics(duplicate_threshold=3)
+        token = _current_metrics.set(metrics)
+        try:
+            # Sin prefetch: una consulta de géneros por título
+            ContentSerializer(Content.objects.all(), many=True).data
+        finally:
+            _current_metrics.reset(token)
+
+        [(origin, count, _)] = metrics.duplicates()
+        self.assertEqual((origin, count), ('ContentSerializer.genres', 3))
+        self.assertGreater(metrics.serialization_time, 0)
+
+    def test_histograms_are_admin_only(self):
+        self.client.get('/api/content/content/')
+        self.assertEqual(self.client.get('/api/instrumentation/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        views = self.client.get('/api/instrumentation/').data['views']
+        self.assertEqual(views['content-list']['requests'], 1)
+        self.assertEqual(views['content-list']['sql_count']['buckets']['<=1'], 1)
+
+
+class CatalogueImportTests(ContentTestCase):
+    def run_import(self, lines, format='jsonl', chunk_size=2):
+        dump = io.BytesIO(''.join(line + '\n' for line in lines).encode())
+        importer = CatalogueImporter(chunk_size=chunk_size)
+        importer.run(read_records(dump, format))
+        return importer
+
+    def records(self, **changes):
+        series = {
+            'external_id': 'serie-1', 'title': 'La casa', 'description': 'Un robo',
+            'release_year': 2017, 'content_type': 'series', 'genres': ['Drama', 'Suspenso'],
+            'min_subscription_plan': 'premium',
+            'episodes': [{'season_number': 1, 'episode_number': 1, 'duration': 45}],
+        }
+        series.update(changes)
+        return [
+            json.dumps(series),
+            json.dumps({
+                'external_id': 'peli-1', 'title': 'Roma', 'release_year': 2018,
+                'content_type': 'movie', 'genres': ['Drama'], 'min_subscription_plan': self.plan.id,
+            }),
+            json.dumps({
+                'series_external_id': 'serie-1', 'season_number': 1, 'episode_number': 2, 'duration': 50,
+            }),
+        ]
+
+    def test_import_is_idempotent(self):
+        importer = self.run_import(self.records())
+        self.assertEqual(importer.stats['contents_created'], 2)
+        self.assertEqual(importer.stats['episodes_created'], 2)
+
+        series = Content.objects.get(external_id='serie-1')
+        self.assertEqual(series.min_subscription_plan, self.plan)
+        self.assertEqual(sorted(series.genres.values_list('name', flat=True)), ['Drama', 'Suspenso'])
+        # Reutiliza el género existente y crea solo el nuevo
+        self.assertEqual(Genre.objects.filter(name='Drama').count(), 1)
+
+        importer = self.run_import(self.records())
+        self.assertEqual(importer.stats['contents_unchanged'], 2)
+        self.assertEqual(importer.stats['episodes_unchanged'], 2)
+        self.assertEqual(Content.objects.count(), 2)
+        self.assertEqual(Episode.objects.count(), 2)
+
+    def test_reimport_updates_fields_and_genres(self):
+        self.run_import(self.records())
+        importer = self.run_import(self.records(title='La casa de papel', genres=['Comedia']))
+
+        self.assertEqual(importer.stats['contents_updated'], 1)
+        series = Content.objects.get(external_id='serie-1')
+        self.assertEqual(series.title, 'La casa de papel')
+        self.assertEqual(list(series.genres.values_list('name', flat=True)), ['Comedia'])
+        # El índice de búsqueda sigue al día tras las escrituras en bloque
+        response = self.client.get('/api/content/content/', {'search': 'papel'})
+        self.assertEqual([item['id'] for item in response.data['results']], [series.id])
+
+    def test_genre_changes_in_large_chunks(self):
+        def movies(genre):
+            return [
+                json.dumps({
+                    'external_id': f'peli-{index}', 'title': f'Peli {index}', 'release_year': 2000,
+                    'content_type': 'movie', 'genres': [genre],
+                })
+                for index in range(1200)
+            ]
+
+        self.run_import(movies('Drama'), chunk_size=1200)
+        self.run_import(movies('Comedia'), chunk_size=1200)
+        self.assertEqual(
+            set(Content.genres.through.objects.values_list('genre__name', flat=True)), {'Comedia'}
+        )
+
+    def test_invalid_records_are_reported(self):
+        importer = self.run_import([
+            'no es json',
+            json.dumps({'external_id': 'x', 'title': 'X', 'release_year': 2000, 'content_type': 'opera'}),
+            json.dumps({'series_external_id': 'inexistente', 'season_number': 1, 'episode_number': 1}),
+        ] + self.records())
+
+        self.assertEqual(importer.stats['errors'], 3)
+        self.assertEqual([number for number, _ in importer.errors], [1, 2, 3])
+        self.assertEqual(Content.objects.count(), 2)
+
+    def test_csv(self):
+        importer = self.run_import([
+            'external_id,title,release_year,content_type,genres,series_external_id,season_number,episode_number',
+            'doc-1,Planeta,2019,documentary,Naturaleza|Ciencia,,,',
+            ',,,,,doc-1,1,1',
+        ], format='csv')
+
+        self.assertEqual(importer.stats['errors'], 0)
+        documentary = Content.objects.get(external_id='doc-1')
+        self.assertEqual(documentary.genres.count(), 2)
+        self.assertEqual(documentary.episodes.count(), 1)
+
+    def test_import_invalidates_catalogue_cache(self):
+        self.client.get('/api/content/content/')
+        self.run_import(self.records())
+        response = self.client.get('/api/content/content/')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_import_reports_changed_contents(self):
+        self.assertEqual(self.run_import(self.records()).changed_content_ids, set())
+        self.assertEqual(self.run_import(self.records()).changed_content_ids, set())
+
+        importer = self.run_import(self.records(genres=['Comedia']))
+        series = Content.objects.get(external_id='serie-1')
+        self.assertEqual(importer.changed_content_ids, {series.id})
+
+
+class DatabaseConfigTests(TestCase):
+    def test_sqlite_tuning(self):
+        config = database_config('sqlite:////tmp/streamz.sqlite3', conn_max_age=30)
+        self.assertEqual(config['CONN_MAX_AGE'], 30)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertIn('journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+        config = database_config('sqlite:////tmp/streamz.sqlite3', conn_max_age=0, sqlite_tuning=False)
+        self.assertEqual(config['OPTIONS'], {})
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+
+    @skipUnless(connection.vendor == 'sqlite', "Solo con SQLite")
+    def test_init_command_is_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # 1 = NORMAL (el valor por defecto es 2 = FULL)
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_postgres_pool(self):
+        url = 'postgres://streamz:secreto@db:5432/streamz'
+        config = database_config(url, conn_max_age=60)
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertNotIn('pool', config['OPTIONS'])
+
+        if importlib.util.find_spec('psycopg_pool') is None:
+            with self.assertRaises(ImproperlyConfigured):
+                database_config(url, pool=True)
+            return
+        config = database_config(url, conn_max_age=60, pool=True, pool_max_size=20)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
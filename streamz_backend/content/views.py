@@ -1,43 +1,67 @@
 # content/views.py
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Genre, Content, Episode
 from .serializers import GenreSerializer, ContentSerializer, ContentDetailSerializer, EpisodeSerializer
 from .permissions import HasActiveSubscription
+from .mixins import CompactListMixin, EagerLoadingMixin
+from .compact import ContentCompactSerializer
+from .search import FullTextSearchFilter
+from .pagination import CatalogueKeysetPagination, EpisodeKeysetPagination
+from .cache import CatalogueCacheMixin, cache_catalogue_response
+from .entitlements import entitled_contents
 from django.conf import settings
+from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
-class GenreViewSet(viewsets.ReadOnlyModelViewSet):
+class GenreViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_per_plan = False  # Los géneros son iguales para todos los planes
 
-class ContentViewSet(viewsets.ReadOnlyModelViewSet):
+class ContentViewSet(CatalogueCacheMixin, CompactListMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Content.objects.all()
     serializer_class = ContentSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    compact_serializer_class = ContentCompactSerializer
+    compact_actions = ('list', 'movies', 'series', 'documentaries')
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['content_type', 'release_year', 'genres']
     search_fields = ['title', 'description']
     permission_classes = [AllowAny]
+    pagination_class = CatalogueKeysetPagination
+    
+    @property
+    def paginator(self):
+        # Los resultados de búsqueda se ordenan por relevancia, que no sirve como
+        # cursor, así que se paginan por número de página
+        if not hasattr(self, '_paginator') and self.request.query_params.get(api_settings.SEARCH_PARAM):
+            self._paginator = PageNumberPagination()
+        if not hasattr(self, '_paginator') and self.action == 'episodes':
+            self._paginator = EpisodeKeysetPagination()
+        return super().paginator
     
     def get_queryset(self):
     # Modificación para desarrollo - muestra todo el contenido
         if settings.DEBUG:
             return Content.objects.all()
     
-    # Comportamiento original - filtrar por plan
-        user = self.request.user
-        if user.is_authenticated and hasattr(user, 'plan') and user.plan:
-            return Content.objects.filter(min_subscription_plan__price__lte=user.plan.price)
-        return Content.objects.none()
+    # Comportamiento original - filtrar por plan (por nivel de acceso, sin join con los planes)
+        return entitled_contents(self.request.user)
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ContentDetailSerializer
-        return ContentSerializer
+        if self.action in ('episodes', 'episode'):
+            return EpisodeSerializer
+        return super().get_serializer_class()
     
     @action(detail=False, methods=['get'])
+    @cache_catalogue_response
     def movies(self, request):
         movies = self.get_queryset().filter(content_type='movie')
         page = self.paginate_queryset(movies)
@@ -45,6 +69,7 @@ class ContentViewSet(viewsets.ReadOnlyModelViewSet):
         return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_catalogue_response
     def series(self, request):
         series = self.get_queryset().filter(content_type='series')
         page = self.paginate_queryset(series)
@@ -52,8 +77,29 @@ class ContentViewSet(viewsets.ReadOnlyModelViewSet):
         return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_catalogue_response
     def documentaries(self, request):
         docs = self.get_queryset().filter(content_type='documentary')
         page = self.paginate_queryset(docs)
         serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response(serializer.data)
\ No newline at end of file
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    @cache_catalogue_response
+    def episodes(self, request, pk=None):
+        # Episodios de la serie paginados por cursor, opcionalmente de una temporada
+        episodes = self.get_object().episodes.all()
+        season = request.query_params.get('season')
+        if season is not None:
+            if not season.isdigit():
+                raise ValidationError({'season': 'Debe ser un número de temporada'})
+            episodes = episodes.filter(season_number=int(season))
+        page = self.paginate_queryset(episodes)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'], url_path=r'episodes/(?P<episode_id>[0-9]+)')
+    @cache_catalogue_response
+    def episode(self, request, pk=None, episode_id=None):
+        episode = get_object_or_404(self.get_object().episodes.all(), pk=episode_id)
+        return Response(self.get_serializer(episode).data)
@@ -0,0 +1,201 @@
+# streaming/async_views.py
+"""
+Versiones asíncronas (ASGI) de los endpoints de streaming que más tráfico
+reciben: update_progress, continue_watching, recent y trending.
+
+Usan el ORM asíncrono de Django, de modo que bajo un servidor ASGI (uvicorn)
+una escritura lenta no bloquea un worker entero. Devuelven las mismas
+respuestas que las vistas de DRF, pero no pasan por DRF (que no soporta vistas
+asíncronas): autentican solo con token, a través de la misma caché de tokens.
+
+Se sirven en lugar de las síncronas cuando ASYNC_STREAMING_VIEWS está activo
+(ver streaming/urls.py y Procfile.asgi).
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import aprefetch_related_objects
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_page
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from authentication.authentication import CachedTokenAuthentication
+from content.models import Content
+from content.serializers import ContentSerializer
+from streamz_backend.routers import read_replica
+from . import screens
+from .buffer import progress_buffer, merge_pending, is_enabled as buffer_enabled
+from .continue_watching import aget_items as aget_continue_watching, with_row_flag
+from .models import WatchHistory
+from .serializers import WatchHistorySerializer
+from .trending import atrending_content_ids
+
+authenticator = CachedTokenAuthentication()
+
+
+def render(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type='application/json'
+    )
+
+
+def async_api_view(methods, allow_anonymous=False):
+    """
+    Equivalente mínimo de @api_view para vistas asíncronas: valida el método,
+    autentica el token y convierte las excepciones de DRF en respuestas.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                credentials = await authenticator.aauthenticate(request)
+                if credentials is None and not allow_anonymous:
+                    raise exceptions.NotAuthenticated()
+                request.user = credentials[0] if credentials else AnonymousUser()
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                response = render({'detail': exc.detail}, status=exc.status_code)
+                if exc.status_code == 401:
+                    response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+                return response
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+def request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise exceptions.ParseError()
+    return request.POST
+
+
+async def load_relations(histories):
+    """
+    Carga las relaciones que serializa WatchHistorySerializer, también para los
+    registros que vienen del buffer de heartbeats.
+    """
+    await aprefetch_related_objects(
+        histories,
+        *WatchHistorySerializer.select_related_fields,
+        *WatchHistorySerializer.prefetch_related_fields
+    )
+    return histories
+
+
+def history_queryset(user):
+    return WatchHistory.objects.filter(user=user).order_by('-watched_date')
+
+
+@async_api_view(['POST'])
+async def update_progress(request):
+    data = request_data(request)
+    content_id = data.get('content')
+    episode_id = data.get('episode')
+    watched_time = data.get('watched_time')
+    total_duration = data.get('total_duration')
+
+    if not content_id and not episode_id:
+        return render({"error": "Se requiere content_id o episode_id"}, status=400)
+
+    if not watched_time:
+        return render({"error": "Se requiere watched_time"}, status=400)
+
+    # Calcular el porcentaje visto
+    watched_percentage = 0
+    if total_duration and float(total_duration) > 0:
+        watched_percentage = (float(watched_time) / float(total_duration)) * 100
+
+    content_id = int(content_id) if content_id else None
+    episode_id = int(episode_id) if episode_id else None
+
+    # Limitar las reproducciones simultáneas a las pantallas del plan
+    if not await screens.atouch(request.user, data.get('session')):
+        return render(screens.limit_error(request.user), status=409)
+
+    history, buffered = await asave_progress(
+        request.user, content_id, episode_id, watched_time, watched_percentage
+    )
+    if buffered:
+        return render({
+            'content': history.content_id,
+            'episode': history.episode_id,
+            'watched_time': history.watched_time,
+            'watched_percentage': history.watched_percentage,
+            'watched_date': history.watched_date,
+        }, status=202)
+
+    await load_relations([history])
+    return render(WatchHistorySerializer(history).data)
+
+
+async def asave_progress(user, content_id, episode_id, watched_time, watched_percentage):
+    """
+    Guarda la posición de reproducción (o la deja en el buffer de heartbeats).
+    Devuelve (registro, si quedó en el buffer).
+    """
+    # En modo buffer no se toca la base de datos
+    if buffer_enabled():
+        history = progress_buffer.add(
+            user.id,
+            content_id,
+            episode_id,
+            watched_time,
+            watched_percentage
+        )
+        return history, True
+
+    history, created = await with_row_flag(WatchHistory.objects).aget_or_create(
+        user=user,
+        content_id=content_id,
+        episode_id=episode_id,
+        defaults={
+            'watched_time': watched_time,
+            'watched_percentage': watched_percentage
+        }
+    )
+
+    if not created:
+        history.watched_time = watched_time
+        history.watched_percentage = watched_percentage
+        await history.asave(update_fields=['watched_time', 'watched_percentage', 'watched_date'])
+    return history, False
+
+
+@read_replica
+@async_api_view(['GET'])
+async def continue_watching(request):
+    return render(await aget_continue_watching(request.user))
+
+
+@read_replica
+@async_api_view(['GET'])
+async def recent(request):
+    histories = [history async for history in history_queryset(request.user)[:20]]
+    histories = merge_pending(histories, request.user.id)[:20]
+    await load_relations(histories)
+    return render(WatchHistorySerializer(histories, many=True).data)
+
+
+@read_replica
+@cache_page(settings.TRENDING_CACHE_TIMEOUT)
+@async_api_view(['GET'], allow_anonymous=True)
+async def trending(request):
+    trending_ids = await atrending_content_ids()
+    contents = await Content.objects.ain_bulk(trending_ids)
+    contents = [contents[pk] for pk in trending_ids if pk in contents]
+    await aprefetch_related_objects(contents, *ContentSerializer.prefetch_related_fields)
+
+    # Misma paginación que TrendingContentView, sobre una lista ya cargada
+    paginator = PageNumberPagination()
+    page = paginator.paginate_queryset(contents, Request(request))
+    return render(paginator.get_paginated_response(ContentSerializer(page, many=True).data).data)
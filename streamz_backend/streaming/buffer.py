@@ -0,0 +1,191 @@
+# streaming/buffer.py
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from content.models import Content, Episode
+from .models import WatchHistory
+from .progress import record_progress
+from .series import record_series_progress
+from .recommendations import invalidate_recommendations
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    """
+    Buffer de escritura diferida para los heartbeats del reproductor.
+
+    Agrupa las actualizaciones de progreso por (user, content, episode) dentro
+    del proceso y las vuelca periódicamente a la base de datos con un único
+    upsert masivo, en lugar de un get_or_create + save por heartbeat.
+    """
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, user_id, content_id, episode_id, watched_time, watched_percentage):
+        """
+        Registra el último progreso conocido y devuelve la instancia (sin guardar)
+        que lo representa.
+        """
+        history = WatchHistory(
+            user_id=user_id,
+            content_id=content_id,
+            episode_id=episode_id,
+            watched_time=watched_time,
+            watched_percentage=watched_percentage,
+            watched_date=datetime.now(),
+            playback_key=WatchHistory.make_playback_key(content_id, episode_id),
+        )
+        with self._lock:
+            # El heartbeat más reciente sustituye al anterior
+            self._pending[(user_id, history.playback_key)] = history
+            self._schedule_flush()
+        return history
+
+    def pending_for_user(self, user_id):
+        """
+        Devuelve los heartbeats pendientes de volcar de un usuario.
+        """
+        with self._lock:
+            return [
+                history for (pending_user_id, _), history in self._pending.items()
+                if pending_user_id == user_id
+            ]
+
+    def flush(self):
+        """
+        Vuelca a la base de datos todos los heartbeats pendientes.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = list(self._pending.values()), {}
+                self._timer = None
+
+            pending = self._discard_missing(pending)
+            if not pending:
+                return []
+            new_user_ids = self._load_preference_levels(pending)
+
+            try:
+                with transaction.atomic():
+                    histories = WatchHistory.objects.bulk_create(
+                        pending,
+                        update_conflicts=True,
+                        unique_fields=['user', 'playback_key'],
+                        update_fields=['watched_time', 'watched_percentage', 'watched_date'],
+                    )
+            except Exception:
+                # Volver a encolar lo que no se pudo guardar sin pisar heartbeats más nuevos
+                with self._lock:
+                    for history in pending:
+                        self._pending.setdefault((history.user_id, history.playback_key), history)
+                    self._schedule_flush()
+                raise
+
+            # Un título nuevo en el historial cambia lo que se le puede recomendar
+            invalidate_recommendations(new_user_ids)
+            on_flush(histories)
+            return histories
+
+    def _discard_missing(self, pending):
+        # Descarta heartbeats de contenidos o episodios inexistentes, que harían
+        # fallar el lote completo por la clave foránea
+        content_ids = {history.content_id for history in pending if history.content_id}
+        episode_ids = {history.episode_id for history in pending if history.episode_id}
+        if content_ids:
+            content_ids = set(Content.objects.filter(id__in=content_ids).values_list('id', flat=True))
+        if episode_ids:
+            episode_ids = set(Episode.objects.filter(id__in=episode_ids).values_list('id', flat=True))
+        return [
+            history for history in pending
+            if (not history.content_id or history.content_id in content_ids)
+            and (not history.episode_id or history.episode_id in episode_ids)
+        ]
+
+    def _load_preference_levels(self, pending):
+        # El upsert no devuelve los valores previos, así que se leen antes para
+        # que el pipeline de preferencias sepa qué umbrales y qué vista del día
+        # ya se contabilizaron. Devuelve los usuarios con registros que aún no existían.
+        levels = {
+            (user_id, playback_key): (level, trending_day)
+            for user_id, playback_key, level, trending_day in WatchHistory.objects.filter(
+                user_id__in={history.user_id for history in pending},
+                playback_key__in={history.playback_key for history in pending}
+            ).values_list('user_id', 'playback_key', 'preference_level', 'trending_day')
+        }
+        new_user_ids = set()
+        for history in pending:
+            key = (history.user_id, history.playback_key)
+            if key not in levels:
+                new_user_ids.add(history.user_id)
+            history.preference_level, history.trending_day = levels.get(key, (0, None))
+        return new_user_ids
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Error al volcar el buffer de progreso")
+
+
+def on_flush(histories):
+    """
+    Aplica a los registros volcados los efectos que normalmente dispara post_save,
+    ya que bulk_create no envía señales.
+    """
+    # continue_watching mezcla en sus lecturas lo pendiente de este buffer
+    from .continue_watching import record as record_continue_watching
+
+    record_progress(histories)
+    record_series_progress(histories)
+    record_continue_watching(histories)
+
+
+def is_enabled():
+    return getattr(settings, 'PROGRESS_BUFFER_ENABLED', False)
+
+
+progress_buffer = ProgressBuffer(
+    flush_interval=getattr(settings, 'PROGRESS_BUFFER_FLUSH_INTERVAL', 5)
+)
+
+# Volcar lo pendiente cuando el proceso (p. ej. un worker de gunicorn) termina
+atexit.register(progress_buffer.flush)
+
+
+def merge_pending(histories, user_id):
+    """
+    Superpone los heartbeats pendientes de un usuario a una lista de registros
+    leídos de la base de datos, para que las lecturas vean la última posición.
+    Devuelve la lista ordenada por fecha de visualización descendente.
+    """
+    if not is_enabled():
+        return list(histories)
+
+    merged = {history.playback_key: history for history in histories}
+    for pending in progress_buffer.pending_for_user(user_id):
+        history = merged.get(pending.playback_key)
+        if history is None:
+            merged[pending.playback_key] = pending
+            continue
+        history.watched_time = pending.watched_time
+        history.watched_percentage = pending.watched_percentage
+        history.watched_date = pending.watched_date
+
+    return sorted(merged.values(), key=lambda history: history.watched_date, reverse=True)
@@ -0,0 +1,237 @@
+# streaming/collaborative.py
+"""
+Recomendador colaborativo item-item.
+
+El modelo se entrena offline (manage.py train_recommender) a partir de
+WatchHistory: cada fila usuario x título pesa watched_percentage / 100, y la
+similitud entre dos títulos es el coseno entre sus columnas. De cada título
+se guardan solo sus `neighbors` vecinos más parecidos, en formato CSR, como
+ficheros .npy que el servidor abre con memory-mapping (no se cargan enteros
+en memoria y los comparten todos los workers a través de la caché de páginas).
+
+En línea, la puntuación de un título es la suma de sus similitudes con lo
+que ha visto el usuario, ponderadas por cuánto lo vio: unas pocas operaciones
+vectorizadas sobre las filas de los títulos vistos.
+
+NumPy (y SciPy para entrenar) son opcionales: sin ellos, o sin un modelo
+entrenado, se usa la heurística de géneros.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import WatchHistory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import scipy.sparse as sparse
+except ImportError:
+    sparse = None
+
+CURRENT_FILE = 'current.json'
+ARRAYS = ['items', 'indptr', 'indices', 'similarities']
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def model_dir():
+    return settings.RECOMMENDER_MODEL_DIR
+
+
+class ItemItemModel:
+    def __init__(self, version, path):
+        self.version = version
+        self.items, self.indptr, self.indices, self.similarities = (
+            np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ARRAYS
+        )
+        # Índice content_id -> posición, ordenado para buscar con searchsorted
+        self.order = np.argsort(self.items)
+        self.sorted_items = np.asarray(self.items)[self.order]
+
+    def positions(self, content_ids):
+        """
+        Devuelve (posiciones, máscara) de los content_ids que conoce el modelo.
+        """
+        content_ids = np.asarray(content_ids, dtype=np.int64)
+        found = np.searchsorted(self.sorted_items, content_ids)
+        found = np.minimum(found, len(self.sorted_items) - 1)
+        known = self.sorted_items[found] == content_ids
+        return self.order[found[known]], known
+
+    def score(self, content_ids, weights, limit):
+        """
+        Devuelve [(content_id, puntuación)] de los `limit` títulos más
+        parecidos a los vistos, excluyendo estos.
+        """
+        if not len(self.sorted_items):
+            return []
+        rows, known = self.positions(content_ids)
+        weights = np.asarray(weights, dtype=np.float32)[known]
+        if not len(rows):
+            return []
+
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return []
+        # Índices planos de los vecinos de todas las filas vistas, sin bucles en Python
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        scores = np.zeros(len(self.items), dtype=np.float32)
+        np.add.at(
+            scores, self.indices[offsets],
+            self.similarities[offsets] * np.repeat(weights, lengths)
+        )
+        scores[rows] = 0  # No recomendar lo que ya vio
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [
+            (int(self.items[index]), round(float(scores[index]), 4)) for index in candidates
+        ]
+
+
+def load_model():
+    """
+    Devuelve el modelo vigente, volviendo a abrirlo si se ha entrenado uno nuevo.
+    """
+    global _model
+    if np is None:
+        return None
+    try:
+        with open(os.path.join(model_dir(), CURRENT_FILE)) as current_file:
+            version = json.load(current_file)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if _model is None or _model.version != version:
+        with _model_lock:
+            if _model is None or _model.version != version:
+                _model = ItemItemModel(version, os.path.join(model_dir(), version))
+    return _model
+
+
+def recommend(user, limit):
+    """
+    Recomendaciones item-item del usuario, o None si no hay modelo o el usuario
+    no ha visto nada que el modelo conozca (arranque en frío).
+    """
+    model = load_model()
+    if model is None:
+        return None
+    watched = list(
+        WatchHistory.objects.filter(
+            user=user, content__isnull=False
+        ).values_list('content_id', 'watched_percentage')
+    )
+    if not watched:
+        return None
+    content_ids, percentages = zip(*watched)
+    weights = np.clip(np.asarray(percentages, dtype=np.float32) / 100, 0, 1)
+    return model.score(content_ids, weights, limit) or None
+
+
+def train(neighbors=50, block_size=None):
+    """
+    Entrena el modelo con el historial actual y lo publica como versión
+    vigente. Devuelve un resumen del entrenamiento.
+    """
+    if np is None or sparse is None:
+        raise ImproperlyConfigured("Entrenar el recomendador requiere NumPy y SciPy")
+
+    started = time.perf_counter()
+    rows = WatchHistory.objects.filter(
+        content__isnull=False, watched_percentage__gt=0
+    ).values_list('user_id', 'content_id', 'watched_percentage')
+    user_ids, content_ids, percentages = [], [], []
+    for user_id, content_id, percentage in rows.iterator(chunk_size=10000):
+        user_ids.append(user_id)
+        content_ids.append(content_id)
+        percentages.append(percentage)
+
+    users, user_rows = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    items, item_columns = np.unique(np.asarray(content_ids, dtype=np.int64), return_inverse=True)
+    values = np.clip(np.asarray(percentages, dtype=np.float32) / 100, 0, 1)
+    ratings = sparse.csr_matrix(
+        (values, (user_rows, item_columns)), shape=(len(users), len(items)), dtype=np.float32
+    )
+    # Varias filas del mismo título (p. ej. episodios) se suman: limitar a 1
+    ratings.data = np.minimum(ratings.data, 1)
+
+    # Coseno: normalizar cada columna (título) y multiplicar R^T R por bloques,
+    # conservando solo los `neighbors` vecinos más parecidos de cada título
+    norms = np.sqrt(np.asarray(ratings.multiply(ratings).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = (ratings @ sparse.diags(1 / norms)).tocsc().astype(np.float32)
+    transposed = normalized.T.tocsr()
+    # Bloques de filas cuyo resultado denso ocupe ~64 MB
+    block_size = block_size or max(1, (16 * 1024 * 1024) // max(1, len(items)))
+
+    indptr = [0]
+    indices, similarities = [], []
+    for start in range(0, len(items), block_size):
+        block = (transposed[start:start + block_size] @ normalized).toarray()
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = 0
+        k = min(neighbors, block.shape[1])
+        if k:
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        for row in range(len(block)):
+            neighbours = top[row] if k else np.empty(0, dtype=np.int64)
+            neighbours = neighbours[block[row, neighbours] > 0]
+            neighbours = neighbours[np.argsort(-block[row, neighbours])]
+            indices.append(neighbours.astype(np.int32))
+            similarities.append(block[row, neighbours].astype(np.float32))
+            indptr.append(indptr[-1] + len(neighbours))
+
+    arrays = {
+        'items': items,
+        'indptr': np.asarray(indptr, dtype=np.int64),
+        'indices': np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+        'similarities': np.concatenate(similarities) if similarities else np.empty(0, dtype=np.float32),
+    }
+    version = publish(arrays)
+    return {
+        'version': version,
+        'users': len(users),
+        'items': len(items),
+        'interactions': int(ratings.nnz),
+        'neighbors': int(len(arrays['indices'])),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def publish(arrays, keep=2):
+    """
+    Escribe una nueva versión del modelo y la marca como vigente de forma
+    atómica; conserva solo las `keep` versiones más recientes.
+    """
+    root = model_dir()
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+
+    temporary = os.path.join(root, CURRENT_FILE + '.tmp')
+    with open(temporary, 'w') as current_file:
+        json.dump({'version': version}, current_file)
+    os.replace(temporary, os.path.join(root, CURRENT_FILE))
+
+    versions = sorted(
+        name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name))
+    )
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
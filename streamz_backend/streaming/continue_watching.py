@@ -0,0 +1,249 @@
+# streaming/continue_watching.py
+"""
+Lista "seguir viendo" desnormalizada (modelo ContinueWatching).
+
+Cada usuario tiene una fila con sus LIMIT títulos en curso ya serializados,
+del más reciente al más antiguo, de modo que el endpoint continue_watching es
+una consulta por clave primaria, sin joins ni ordenación.
+
+- La fila se construye con la consulta original la primera vez que se lee.
+- Al registrar progreso (post_save de WatchHistory o volcado del buffer) se
+  actualiza la posición del título, se sube al principio o se añade; al
+  completarse (>= 90%) o borrarse, se quita. Solo se mantienen filas que ya
+  existen. Los heartbeats leen su registro con with_row_flag(), que indica si
+  el usuario tiene fila: sin ella no hay nada que mantener ni que bloquear.
+- Si se quita un título de una lista recortada, podría faltar el siguiente en
+  curso: la fila se borra y se reconstruye en la siguiente lectura.
+- Los cambios del catálogo que aparecen en content_details o
+  episode_details (títulos, episodios, géneros) borran las filas que los
+  contienen (ver signals.py).
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
+from django.utils import timezone
+from rest_framework import serializers
+
+from .buffer import progress_buffer, is_enabled as buffer_enabled
+from .models import ContinueWatching, WatchHistory
+from .serializers import WatchHistorySerializer
+
+LIMIT = 10
+# Contenidos o episodios por consulta al invalidar filas
+INVALIDATE_BATCH_SIZE = 200
+
+
+class PositionSerializer(serializers.ModelSerializer):
+    """
+    Campos de un elemento que cambian con cada heartbeat.
+    """
+    class Meta:
+        model = WatchHistory
+        fields = ['watched_time', 'watched_percentage', 'watched_date']
+
+
+def in_progress(watched_percentage):
+    """
+    Comenzado pero no completado.
+    """
+    return 0 < watched_percentage < 90
+
+
+def item_key(item):
+    return (item['content'], item['episode'])
+
+
+def serialize(histories):
+    """
+    Serializa los registros como los devuelve la API, cargando antes sus relaciones.
+    """
+    prefetch_related_objects(
+        histories,
+        *WatchHistorySerializer.select_related_fields,
+        *WatchHistorySerializer.prefetch_related_fields
+    )
+    return WatchHistorySerializer(histories, many=True).data
+
+
+def make_row(user_id, items, truncated):
+    return ContinueWatching(
+        user_id=user_id,
+        items=items[:LIMIT],
+        content_ids=','.join(['', *(row_token(item) for item in items[:LIMIT]), '']),
+        truncated=truncated or len(items) > LIMIT,
+        # bulk_update no aplica auto_now
+        updated_at=timezone.now(),
+    )
+
+
+def row_token(item):
+    """
+    Clave de un elemento en content_ids: el id del contenido o, para los
+    episodios (que tienen content nulo), "e" seguido del id del episodio.
+    """
+    return str(item['content']) if item['content'] else f"e{item['episode']}"
+
+
+def build(user_id):
+    """
+    Construye (o reconstruye) la fila del usuario a partir del historial.
+    """
+    # Dentro de una transacción el historial se lee de default, no de una réplica
+    with transaction.atomic():
+        histories = list(
+            WatchHistory.objects.filter(
+                user_id=user_id, watched_percentage__lt=90, watched_percentage__gt=0
+            ).select_related(
+                *WatchHistorySerializer.select_related_fields
+            ).prefetch_related(
+                *WatchHistorySerializer.prefetch_related_fields
+            ).order_by('-watched_date')[:LIMIT + 1]
+        )
+        row = make_row(user_id, WatchHistorySerializer(histories, many=True).data, truncated=False)
+        ContinueWatching.objects.bulk_create(
+            [row], update_conflicts=True, unique_fields=['user'],
+            update_fields=['items', 'content_ids', 'truncated', 'updated_at'],
+        )
+    return row.items
+
+
+def get_items(user):
+    """
+    Devuelve la lista del usuario, con la última posición aún no volcada del
+    buffer de heartbeats.
+    """
+    items = ContinueWatching.objects.filter(pk=user.id).values_list('items', flat=True).first()
+    if items is None:
+        items = build(user.id)
+    return merge_pending_items(items, user.id)
+
+
+async def aget_items(user):
+    """
+    Versión asíncrona de get_items. La lectura de la fila, que es lo habitual,
+    usa el ORM asíncrono; construirla o mezclar el buffer pasa por get_items.
+    """
+    if not (buffer_enabled() and progress_buffer.pending_for_user(user.id)):
+        items = await ContinueWatching.objects.filter(pk=user.id).values_list('items', flat=True).afirst()
+        if items is not None:
+            return items
+    return await sync_to_async(get_items)(user)
+
+
+def merge_pending_items(items, user_id):
+    if not buffer_enabled():
+        return items
+    pending = progress_buffer.pending_for_user(user_id)
+    if not pending:
+        return items
+    # Los títulos del buffer que aún no estaban en la fila pueden pasar de LIMIT
+    return apply(items, pending)[0][:LIMIT]
+
+
+def apply(items, histories, deleted=False):
+    """
+    Aplica a una lista de elementos un lote de registros de un mismo usuario.
+    Devuelve (elementos, si se quitó algún elemento).
+    """
+    histories = {(history.content_id, history.episode_id): history for history in histories}
+    current = {item_key(item): item for item in items}
+    removed = any(
+        key in current and (deleted or not in_progress(history.watched_percentage))
+        for key, history in histories.items()
+    )
+    if deleted:
+        return [item for item in items if item_key(item) not in histories], removed
+
+    updated = []
+    missing = []
+    for key, history in histories.items():
+        if not in_progress(history.watched_percentage):
+            continue
+        item = current.get(key)
+        if item is None:
+            missing.append(history)
+            continue
+        updated.append({**item, **PositionSerializer(history).data})
+    if missing:
+        updated.extend(serialize(missing))
+
+    # Lo que se acaba de ver va al principio, en orden de fecha descendente
+    updated.sort(key=lambda item: item['watched_date'], reverse=True)
+    return updated + [item for item in items if item_key(item) not in histories], removed
+
+
+def with_row_flag(queryset):
+    """
+    Anota en cada registro de WatchHistory si su usuario tiene fila
+    (has_continue_watching), sin coste adicional al leerlo.
+    """
+    return queryset.annotate(
+        has_continue_watching=Exists(ContinueWatching.objects.filter(pk=OuterRef('user_id')))
+    )
+
+
+def record(histories, deleted=False):
+    """
+    Mantiene las filas existentes tras guardar (o borrar) un lote de registros.
+    """
+    by_user = defaultdict(list)
+    for history in histories:
+        if not getattr(history, 'has_continue_watching', True):
+            # Leído con with_row_flag y sin fila: nada que mantener
+            continue
+        by_user[history.user_id].append(history)
+    if not by_user:
+        return
+
+    with transaction.atomic():
+        rows = ContinueWatching.objects.select_for_update().in_bulk(list(by_user))
+        if not rows:
+            return
+        changed = []
+        stale = []
+        for user_id, row in rows.items():
+            items, removed = apply(row.items, by_user[user_id], deleted=deleted)
+            if items == row.items:
+                continue
+            if removed and row.truncated:
+                # Falta saber qué título entra en el hueco: reconstruir al leer
+                stale.append(user_id)
+                continue
+            changed.append(make_row(user_id, items, row.truncated))
+        if stale:
+            ContinueWatching.objects.filter(pk__in=stale).delete()
+        if changed:
+            ContinueWatching.objects.bulk_update(
+                changed, ['items', 'content_ids', 'truncated', 'updated_at']
+            )
+
+
+def invalidate_contents(content_ids):
+    """
+    Borra las filas que muestran alguno de los contenidos indicados; se
+    reconstruyen con los datos nuevos en la siguiente lectura.
+    """
+    invalidate_tokens({str(content_id) for content_id in content_ids if content_id})
+
+
+def invalidate_episodes(episode_ids):
+    invalidate_tokens({f'e{episode_id}' for episode_id in episode_ids if episode_id})
+
+
+def invalidate_tokens(tokens):
+    # Por lotes: SQLite no admite expresiones de más de 1000 niveles y una
+    # importación puede cambiar miles de títulos
+    tokens = sorted(tokens)
+    for start in range(0, len(tokens), INVALIDATE_BATCH_SIZE):
+        ContinueWatching.objects.filter(reduce(or_, (
+            Q(content_ids__contains=f',{token},')
+            for token in tokens[start:start + INVALIDATE_BATCH_SIZE]
+        ))).delete()
+
+
+def invalidate_all():
+    ContinueWatching.objects.all().delete()
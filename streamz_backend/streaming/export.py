@@ -0,0 +1,255 @@
+# streaming/export.py
+"""
+Exportación masiva de WatchHistory para analítica, en JSON lines o CSV
+(comprimidos con gzip) o en Parquet.
+
+Las filas se leen con .iterator(chunk_size=...) (cursor en el servidor en
+PostgreSQL) y se codifican por bloques, de modo que la memoria usada no
+depende del tamaño de la tabla.
+
+La exportación incremental usa watched_date como marca de agua: se exportan
+las filas con since < watched_date <= until, y until es la marca de la
+siguiente. Como watched_date se actualiza con cada avance, una fila
+modificada vuelve a salir en la siguiente exportación (los consumidores deben
+quedarse con la última versión de cada id).
+
+until no es el momento en que empieza la exportación sino
+WATCH_HISTORY_EXPORT_LAG segundos antes: el buffer de heartbeats guarda
+watched_date con la hora del heartbeat hasta PROGRESS_BUFFER_FLUSH_INTERVAL
+segundos después, y una transacción abierta puede confirmar filas con una
+fecha ya pasada. Sin ese margen esas filas quedarían por detrás de la marca
+y ninguna exportación las recogería.
+"""
+import asyncio
+import csv
+import io
+import json
+import threading
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import WatchHistory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+COLUMNS = [
+    'id', 'user_id', 'content_id', 'episode_id',
+    'watched_time', 'watched_percentage', 'watched_date',
+]
+FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def parse_watermark(value):
+    """
+    Convierte una marca de agua ISO 8601 en un datetime comparable con
+    watched_date.
+    """
+    since = parse_datetime(value) if value else None
+    if since is None:
+        raise ExportError(f"Marca de agua inválida: {value!r}")
+    if timezone.is_aware(since) and not settings.USE_TZ:
+        since = timezone.make_naive(since)
+    return since
+
+
+class WatchHistoryExport:
+    """
+    Exportación de las filas con since < watched_date <= until, ordenadas por
+    (watched_date, id). until es por defecto el momento en que se crea menos
+    WATCH_HISTORY_EXPORT_LAG segundos.
+    """
+
+    def __init__(self, format='jsonl', compress=True, since=None, until=None, chunk_size=5000):
+        if format not in FORMATS:
+            raise ExportError(f"Formato desconocido: {format}")
+        if format == 'parquet' and pa is None:
+            raise ExportError("Exportar a Parquet requiere pyarrow")
+        self.until = until or timezone.now() - timedelta(seconds=settings.WATCH_HISTORY_EXPORT_LAG)
+        if since is not None and since >= self.until:
+            raise ExportError("La marca de agua es posterior al final de la exportación")
+        self.format = format
+        self.since = since
+        # Parquet ya comprime cada columna; gzip solo se aplica a los formatos de texto
+        self.compress = compress and format != 'parquet'
+        self.chunk_size = chunk_size
+        self.rows = 0
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else FORMATS[self.format][0]
+
+    @property
+    def filename(self):
+        extension = FORMATS[self.format][1] + ('.gz' if self.compress else '')
+        return f"watch_history_{self.until:%Y%m%dT%H%M%S}.{extension}"
+
+    def queryset(self):
+        queryset = WatchHistory.objects.filter(watched_date__lte=self.until)
+        if self.since is not None:
+            queryset = queryset.filter(watched_date__gt=self.since)
+        return queryset.order_by('watched_date', 'id').values_list(*COLUMNS)
+
+    def blocks(self):
+        """
+        Genera el fichero en bloques de bytes, uno por cada chunk_size filas.
+        """
+        encoder = {'jsonl': JsonLinesEncoder, 'csv': CsvEncoder, 'parquet': ParquetEncoder}[self.format]()
+        compressor = zlib.compressobj(wbits=31) if self.compress else None
+
+        def compressed(data):
+            if compressor is not None:
+                data = compressor.compress(data)
+            return [data] if data else []
+
+        batch = []
+        for row in self.queryset().iterator(chunk_size=self.chunk_size):
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                self.rows += len(batch)
+                yield from compressed(encoder.encode(batch))
+                batch = []
+        self.rows += len(batch)
+        yield from compressed(encoder.encode(batch) + encoder.close())
+        if compressor is not None:
+            yield compressor.flush()
+
+
+class JsonLinesEncoder:
+    def encode(self, rows):
+        return ''.join(
+            json.dumps(dict(zip(COLUMNS, row[:-1]), watched_date=row[-1].isoformat())) + '\n'
+            for row in rows
+        ).encode()
+
+    def close(self):
+        return b''
+
+
+class CsvEncoder:
+    def __init__(self):
+        self.header = True
+
+    def encode(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(COLUMNS)
+            self.header = False
+        writer.writerows(row[:-1] + (row[-1].isoformat(),) for row in rows)
+        return buffer.getvalue().encode()
+
+    def close(self):
+        return b''
+
+
+class ParquetEncoder:
+    """
+    Escribe un row group por bloque en un búfer que se vacía tras cada
+    escritura: el fichero sale por trozos sin tener que estar entero en memoria.
+    """
+
+    def __init__(self):
+        self.schema = pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()),
+            ('content_id', pa.int64()), ('episode_id', pa.int64()),
+            ('watched_time', pa.int64()), ('watched_percentage', pa.float64()),
+            ('watched_date', pa.timestamp('us')),
+        ])
+        self.sink = DrainableBuffer()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression='snappy')
+
+    def encode(self, rows):
+        if rows:
+            columns = list(zip(*rows))
+            self.writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+                schema=self.schema
+            ))
+        return self.sink.drain()
+
+    def close(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+class DrainableBuffer(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+async def aiter_in_thread(blocks, queue_size=4):
+    """
+    Recorre un generador síncrono de bloques en un hilo propio (con su propia
+    conexión a la base de datos) y los entrega de forma asíncrona, para servir
+    la exportación bajo ASGI sin bloquear el bucle de eventos ni el hilo
+    compartido de sync_to_async. La cola acotada limita la memoria.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for block in blocks:
+                if stopped.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(block), loop).result()
+            item = done
+        except Exception as exc:
+            item = exc
+        finally:
+            blocks.close()
+            connections.close_all()
+        if not stopped.is_set():
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Si el cliente se desconecta, desbloquear al productor y dejarlo terminar
+        stopped.set()
+        while not queue.empty():
+            queue.get_nowait()
@@ -0,0 +1,211 @@
+import json
+import platform
+import random
+from datetime import datetime
+from itertools import cycle
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from streamz_backend.benchmarking import generate_dataset, measure, throwaway_database
+
+# Usuarios distintos entre los que rotan las peticiones
+CLIENTS = 50
+
+# Métricas que se comparan con --compare (más bajo es mejor salvo ops_per_s)
+COMPARED_METRICS = ['mean_ms', 'p95_ms', 'ops_per_s', 'queries']
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de los endpoints de la API sobre un conjunto de datos sintético "
+        "en una base de datos desechable. Mide latencia, throughput y consultas SQL "
+        "por petición y puede guardar el resultado en JSON para compararlo entre "
+        "ejecuciones (--output / --compare)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--titles', type=int, default=5000)
+        parser.add_argument('--episodes', type=int, default=10, help="Episodios por serie")
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--events', type=int, default=20000, help="Eventos de visualización")
+        parser.add_argument('--repeat', type=int, default=200, help="Peticiones por endpoint")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--endpoint', action='append', dest='endpoints',
+            help="Medir solo este endpoint (se puede repetir)"
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help="Vaciar la caché antes de cada petición (mide el camino sin caché)"
+        )
+        parser.add_argument('--output', help="Guardar el resultado en este fichero JSON")
+        parser.add_argument('--compare', help="Comparar con un resultado JSON anterior")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        endpoints = self.endpoints()
+        selected = options['endpoints'] or list(endpoints)
+        unknown = set(selected) - set(endpoints)
+        if unknown:
+            raise CommandError(
+                f"Endpoints desconocidos: {', '.join(sorted(unknown))}. "
+                f"Disponibles: {', '.join(endpoints)}"
+            )
+
+        with throwaway_database():
+            self.stderr.write("Generando datos sintéticos...")
+            dataset = generate_dataset(
+                users=options['users'], titles=options['titles'], episodes=options['episodes'],
+                genres=options['genres'], events=options['events'], seed=options['seed'],
+            )
+            results = {}
+            for name in selected:
+                self.stderr.write(f"Midiendo {name}...")
+                # Semilla propia por endpoint: medir solo algunos no cambia sus peticiones
+                request = endpoints[name](dataset, random.Random(f"{options['seed']}:{name}"))
+                results[name] = self.run_endpoint(request, options['repeat'], options['cold'])
+
+        report = {
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'options': {
+                    key: options[key] for key in
+                    ['users', 'titles', 'episodes', 'genres', 'events', 'repeat', 'seed', 'cold']
+                },
+            },
+            'endpoints': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+        elif baseline:
+            self.write_comparison(baseline, report)
+        else:
+            self.write_table(report)
+
+    def endpoints(self):
+        """
+        Cada endpoint es una función (dataset, rng) -> request, donde request()
+        hace una petición. Las peticiones van rotando entre usuarios, títulos y
+        términos de búsqueda para no medir siempre el mismo caso.
+        """
+        def get(path_for):
+            def build(dataset, rng):
+                clients = cycle(self.clients(dataset))
+                values = self.samples(dataset, rng)
+
+                def request():
+                    return next(clients).get(path_for(values))
+                return request
+            return build
+
+        def update_progress(dataset, rng):
+            clients = cycle(self.clients(dataset))
+            content_ids = cycle(rng.sample(dataset['content_ids'], min(100, len(dataset['content_ids']))))
+
+            def request():
+                return next(clients).post('/api/streaming/history/update_progress/', {
+                    'content': next(content_ids),
+                    'watched_time': rng.randint(1, 6000),
+                    'total_duration': 6000,
+                }, content_type='application/json')
+            return request
+
+        return {
+            'profile': get(lambda values: '/api/auth/profile/'),
+            'plans': get(lambda values: '/api/auth/plans/'),
+            'genres': get(lambda values: '/api/content/genres/'),
+            'catalogue': get(lambda values: '/api/content/content/'),
+            'catalogue_movies': get(lambda values: '/api/content/content/movies/'),
+            'catalogue_series': get(lambda values: '/api/content/content/series/'),
+            'content_detail': get(lambda values: f"/api/content/content/{next(values['series'])}/"),
+            'search': get(lambda values: f"/api/content/content/?search={next(values['terms'])}"),
+            'history': get(lambda values: '/api/streaming/history/'),
+            'continue_watching': get(lambda values: '/api/streaming/history/continue_watching/'),
+            'recent': get(lambda values: '/api/streaming/history/recent/'),
+            'update_progress': update_progress,
+            'recommendations': get(lambda values: '/api/streaming/recommendations/'),
+            'trending': get(lambda values: '/api/streaming/trending/'),
+            'preferences': get(lambda values: '/api/streaming/preferences/'),
+        }
+
+    def clients(self, dataset):
+        # Un cliente por usuario, autenticado con su token como en producción
+        return [
+            Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {key}')
+            for key in dataset['tokens'][:CLIENTS]
+        ]
+
+    def samples(self, dataset, rng, count=100):
+        vocabulary = dataset['vocabulary']
+        return {
+            'series': cycle(rng.sample(dataset['series_ids'], min(count, len(dataset['series_ids'])))
+                            or [dataset['content_ids'][0]]),
+            'terms': cycle([rng.choice(vocabulary)[:rng.randint(3, 5)] for _ in range(count)]),
+        }
+
+    def run_endpoint(self, request, repeat, cold):
+        failures = []
+
+        def call():
+            if cold:
+                cache.clear()
+            response = request()
+            if response.status_code >= 400:
+                failures.append(response.status_code)
+
+        # Calentar fuera de la medición una ronda completa de usuarios (caché de
+        # tokens y cachés de proceso), para que los resultados no dependan de
+        # qué endpoints se midieron antes
+        for _ in range(CLIENTS):
+            request()
+        stats = measure(call, repeat)
+        stats['errors'] = len(failures)
+        return stats
+
+    def write_table(self, report):
+        self.stdout.write(
+            f"{'endpoint':>18} {'media ms':>9} {'p95 ms':>9} {'ops/s':>9} {'consultas':>9} {'errores':>8}"
+        )
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{name:>18} {stats['mean_ms']:>9} {stats['p95_ms']:>9} "
+                f"{stats['ops_per_s']:>9} {stats['queries']:>9} {stats['errors']:>8}"
+            )
+
+    def write_comparison(self, baseline, report):
+        """
+        Muestra, por endpoint, cada métrica junto a su cambio porcentual
+        respecto a la ejecución anterior.
+        """
+        self.stdout.write(f"{'endpoint':>18} " + ' '.join(f'{metric:>22}' for metric in COMPARED_METRICS))
+        for name, stats in report['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            cells = []
+            for metric in COMPARED_METRICS:
+                value = stats[metric]
+                old = previous.get(metric) if previous else None
+                if old is None or value is None:
+                    change = 'nuevo'
+                elif old == 0:
+                    change = '=' if value == 0 else 'antes 0'
+                else:
+                    change = f'{(value - old) / old * 100:+.1f}%'
+                cells.append(f'{value} ({change})'.rjust(22))
+            self.stdout.write(f'{name:>18} ' + ' '.join(cells))
@@ -0,0 +1,168 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.test import Client
+
+from streamz_backend.benchmarking import generate_dataset, percentile, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del camino de escritura (heartbeats de update_progress con N "
+        "reproductores concurrentes) bajo cada perfil de base de datos: SQLite sin "
+        "ajustar, SQLite con WAL y, si se indica --postgres-url, PostgreSQL con una "
+        "conexión por petición, con conexiones persistentes y con pool. Cada perfil "
+        "se mide en un proceso aparte sobre una base de datos desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Reproductores concurrentes")
+        parser.add_argument('--duration', type=float, default=10, help="Segundos por perfil")
+        parser.add_argument(
+            '--postgres-url',
+            help="DATABASE_URL de un servidor PostgreSQL en el que crear la base de datos desechable"
+        )
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            help="Medir solo este perfil (se puede repetir)"
+        )
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+        # Uso interno: mide el perfil configurado en el entorno de este proceso
+        parser.add_argument('--worker', action='store_true', help="(interno)")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_workload(options['threads'], options['duration'])))
+            return
+
+        profiles = self.profiles(options['postgres_url'])
+        selected = options['profiles'] or list(profiles)
+        unknown = set(selected) - set(profiles)
+        if unknown:
+            raise CommandError(
+                f"Perfiles desconocidos: {', '.join(sorted(unknown))}. "
+                f"Disponibles: {', '.join(profiles)}"
+            )
+
+        results = {}
+        for name in selected:
+            self.stderr.write(f"Midiendo {name}...")
+            results[name] = self.run_profile(profiles[name], options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'perfil':>20} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errores':>8}"
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>20} {stats['ops_per_s']:>8} {stats['p50_ms']:>8} "
+                f"{stats['p95_ms']:>8} {stats['max_ms']:>8} {stats['errors']:>8}"
+            )
+
+    def profiles(self, postgres_url):
+        """
+        Variables de entorno de cada perfil.
+        """
+        # El worker usa un fichero temporal propio; de la URL solo importa el motor
+        sqlite_url = 'sqlite:///benchmark.sqlite3'
+        profiles = {
+            # Lo que había antes: modo rollback journal y una conexión por petición
+            'sqlite': {'DATABASE_URL': sqlite_url, 'SQLITE_TUNING': 'False', 'DATABASE_CONN_MAX_AGE': '0'},
+            'sqlite-wal': {'DATABASE_URL': sqlite_url, 'SQLITE_TUNING': 'True', 'DATABASE_CONN_MAX_AGE': '60'},
+        }
+        if postgres_url:
+            profiles.update({
+                'postgres': {'DATABASE_URL': postgres_url, 'DATABASE_CONN_MAX_AGE': '0'},
+                'postgres-persistent': {'DATABASE_URL': postgres_url, 'DATABASE_CONN_MAX_AGE': '60'},
+                'postgres-pool': {'DATABASE_URL': postgres_url, 'DATABASE_POOL': 'True'},
+            })
+        return profiles
+
+    def run_profile(self, environment, options):
+        result = subprocess.run(
+            [
+                sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_database',
+                '--worker', '--threads', str(options['threads']), '--duration', str(options['duration']),
+            ],
+            env={**os.environ, **environment}, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def run_workload(self, threads, duration):
+        """
+        Lanza `threads` reproductores que envían heartbeats durante `duration`
+        segundos. Cada heartbeat cierra las conexiones caducadas antes y después
+        de la petición, como hacen request_started y request_finished fuera de
+        los tests, para que cuente el coste de abrir conexiones según CONN_MAX_AGE.
+        """
+        if connection.vendor == 'sqlite':
+            # Un fichero, no la base de datos en memoria de los tests: los hilos
+            # tienen que competir por el bloqueo de escritura como en producción
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), f'streamz-benchmark-{os.getpid()}.sqlite3'
+            )
+
+        with throwaway_database():
+            dataset = generate_dataset(
+                users=threads, titles=200, episodes=0, genres=5, events=0, seed=42
+            )
+            connections.close_all()
+            timings = []
+            errors = []
+            deadline = time.monotonic() + duration
+
+            def player(index):
+                client = Client(
+                    HTTP_HOST='localhost', HTTP_AUTHORIZATION=f"Token {dataset['tokens'][index]}",
+                    raise_request_exception=False,
+                )
+                content_ids = dataset['content_ids']
+                position = 0
+                try:
+                    while time.monotonic() < deadline:
+                        position += 1
+                        start = time.perf_counter()
+                        close_old_connections()
+                        response = client.post('/api/streaming/history/update_progress/', {
+                            'content': content_ids[(index * 7 + position // 10) % len(content_ids)],
+                            'watched_time': position, 'total_duration': 6000,
+                        }, content_type='application/json')
+                        close_old_connections()
+                        if response.status_code >= 400:
+                            errors.append(response.status_code)
+                        else:
+                            timings.append((time.perf_counter() - start) * 1000)
+                finally:
+                    connections.close_all()
+
+            workers = [threading.Thread(target=player, args=(index,)) for index in range(threads)]
+            started = time.monotonic()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.monotonic() - started
+
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'ops_per_s': round(len(timings) / elapsed, 1),
+            'mean_ms': round(statistics.fmean(timings), 2) if timings else None,
+            'p50_ms': round(percentile(timings, 50), 2) if timings else None,
+            'p95_ms': round(percentile(timings, 95), 2) if timings else None,
+            'max_ms': round(timings[-1], 2) if timings else None,
+            'errors': len(errors),
+        }
@@ -0,0 +1,107 @@
+import json
+import random
+import time
+from itertools import cycle
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from authentication.models import User
+from streaming import screens
+from streaming.models import ScreenSession
+from streamz_backend.benchmarking import generate_dataset, measure, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el coste del límite de pantallas simultáneas (streaming/screens.py) "
+        "con la caché configurada (CACHE_URL): screens.touch() en el caso habitual "
+        "(sesión activa, una lectura de caché), al refrescar o registrar una sesión "
+        "(transacción en la base de datos) y al rechazarla, y update_progress con el límite "
+        "activado frente a desactivado, en una base de datos desechable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=2000, help="Llamadas por variante")
+        parser.add_argument('--requests', type=int, default=300, help="Peticiones por variante")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+
+        with throwaway_database():
+            self.stderr.write("Generando datos sintéticos...")
+            dataset = generate_dataset(
+                users=options['users'], titles=200, episodes=0, genres=5, events=0,
+                seed=options['seed']
+            )
+            users = list(User.objects.select_related('plan'))
+            cache.clear()
+
+            # Sesión ya registrada y reciente: una lectura de caché, sin consultas
+            for user in users:
+                screens.touch(user, 'benchmark')
+            active = cycle(users)
+            results['touch_active'] = measure(lambda: screens.touch(next(active), 'benchmark'), options['repeat'])
+
+            # Sesión a punto de caducar: transacción para refrescarla (como al
+            # registrar una nueva). Una llamada por usuario
+            cache.clear()
+            ScreenSession.objects.update(expires_at=time.time() + 1)
+            stale = iter(users)
+            results['touch_refresh'] = measure(lambda: screens.touch(next(stale), 'benchmark'), len(users))
+
+            # Pantallas llenas: la sesión se rechaza sin escribir
+            cache.clear()
+            ScreenSession.objects.all().delete()
+            for user in users:
+                for session in range(screens.max_screens(user)):
+                    screens.touch(user, f'ocupada-{session}')
+            full = cycle(users)
+            results['touch_rejected'] = measure(lambda: screens.touch(next(full), 'otra'), options['repeat'])
+
+            for enabled in (False, True):
+                cache.clear()
+                ScreenSession.objects.all().delete()
+                with override_settings(SCREEN_LIMIT_ENABLED=enabled):
+                    results[f'update_progress_limit_{"on" if enabled else "off"}'] = self.measure_heartbeats(
+                        dataset, rng, options['requests']
+                    )
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Caché: {settings.CACHES['default']['BACKEND']}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>26}: media {stats['mean_ms'] * 1000:.1f} µs, p95 {stats['p95_ms'] * 1000:.1f} µs, "
+                f"{stats['queries']} consultas"
+            )
+        overhead = (
+            results['update_progress_limit_on']['mean_ms'] - results['update_progress_limit_off']['mean_ms']
+        )
+        self.stdout.write(f"Coste del límite por heartbeat: {overhead * 1000:+.1f} µs")
+
+    def measure_heartbeats(self, dataset, rng, repeat):
+        # Un cliente por usuario y una sesión por cliente, como los reproductores
+        clients = cycle([
+            (Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {key}'), f'sesion-{index}')
+            for index, key in enumerate(dataset['tokens'][:50])
+        ])
+        content_ids = dataset['content_ids']
+
+        def request():
+            client, session = next(clients)
+            client.post('/api/streaming/history/update_progress/', {
+                'content': rng.choice(content_ids), 'watched_time': rng.randint(1, 6000),
+                'total_duration': 6000, 'session': session,
+            }, content_type='application/json')
+
+        for _ in range(50):
+            request()
+        return measure(request, repeat)
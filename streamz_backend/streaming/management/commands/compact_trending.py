@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from streaming.trending import compact_buckets
+
+
+class Command(BaseCommand):
+    help = (
+        "Compacta los contadores de trending: borra los buckets fuera de la ventana "
+        "y agrupa por día los buckets horarios antiguos. Pensado para ejecutarse "
+        "periódicamente (p. ej. cada hora desde un cron)."
+    )
+
+    def handle(self, *args, **options):
+        expired, compacted = compact_buckets()
+        self.stdout.write(self.style.SUCCESS(
+            f"{expired} buckets expirados eliminados, {compacted} buckets horarios compactados"
+        ))
@@ -0,0 +1,76 @@
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from streaming.export import FORMATS, ExportError, WatchHistoryExport, parse_watermark
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el historial de visualización completo (o solo lo modificado desde "
+        "una marca de agua) en JSON lines o CSV comprimidos, o en Parquet, leyendo la "
+        "tabla por bloques con memoria constante. Con --watermark-file la marca se lee "
+        "del fichero y se actualiza al terminar, para exportaciones incrementales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='jsonl')
+        parser.add_argument(
+            '--output', default='-',
+            help="Fichero de salida ('-' para la salida estándar)"
+        )
+        parser.add_argument('--no-gzip', action='store_true', help="No comprimir JSON lines ni CSV")
+        parser.add_argument('--since', help="Exportar solo filas con watched_date posterior (ISO 8601)")
+        parser.add_argument(
+            '--watermark-file',
+            help="Fichero con la marca de agua de la exportación anterior; se actualiza al terminar"
+        )
+        parser.add_argument('--chunk-size', type=int, default=settings.WATCH_HISTORY_EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        since = options['since']
+        watermark_file = options['watermark_file']
+        if since is None and watermark_file and os.path.exists(watermark_file):
+            with open(watermark_file) as state:
+                since = state.read().strip() or None
+
+        try:
+            export = WatchHistoryExport(
+                format=options['format'],
+                compress=not options['no_gzip'],
+                since=parse_watermark(since) if since else None,
+                chunk_size=options['chunk_size'],
+            )
+        except ExportError as exc:
+            raise CommandError(str(exc))
+
+        output = options['output']
+        if output == '-':
+            self.write(export, sys.stdout.buffer)
+        else:
+            # Escribir en un temporal y renombrar: una exportación a medias nunca
+            # queda con el nombre definitivo
+            temporary = f'{output}.tmp'
+            try:
+                with open(temporary, 'wb') as output_file:
+                    self.write(export, output_file)
+                os.replace(temporary, output)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        if watermark_file:
+            with open(watermark_file, 'w') as state:
+                state.write(export.until.isoformat())
+        self.stderr.write(
+            f"{export.rows} filas exportadas"
+            + (f" desde {export.since.isoformat()}" if export.since else "")
+            + f"; marca de agua: {export.until.isoformat()}"
+        )
+
+    def write(self, export, output_file):
+        for block in export.blocks():
+            output_file.write(block)
+        output_file.flush()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from authentication.models import User
+from content.models import Content
+from streamz_backend.benchmarking import percentile
+
+USERNAME_PREFIX = 'loadtest-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de los endpoints de streaming contra un servidor en marcha: "
+        "simula N reproductores concurrentes que envían heartbeats a update_progress "
+        "y consultan continue_watching, recent y trending. Crea (una sola vez) los "
+        "usuarios 'loadtest-*' y sus tokens en la base de datos configurada, que debe "
+        "ser la misma que usa el servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--players', type=int, default=1000)
+        parser.add_argument('--duration', type=float, default=30, help="Segundos de carga")
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Segundos entre heartbeats de cada reproductor"
+        )
+        parser.add_argument(
+            '--reads-every', type=int, default=10,
+            help="Cada cuántos heartbeats un reproductor consulta los listados"
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        tokens = self.prepare_players(options['players'])
+        content_ids = list(Content.objects.values_list('id', flat=True)[:200])
+        if not content_ids:
+            self.stderr.write("No hay contenido en el catálogo; se necesita al menos un título.")
+            return
+
+        results = asyncio.run(LoadTest(
+            options['url'], tokens, content_ids, options['interval'],
+            options['reads_every'], random.Random(options['seed'])
+        ).run(options['duration']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['players']} reproductores, {results['duration_s']} s: "
+            f"{results['requests_per_s']} peticiones/s, {results['errors']} errores"
+        )
+        for name, stats in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:>18}: {stats['requests']} peticiones, p50 {stats['p50_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, {stats['errors']} errores"
+            )
+
+    def prepare_players(self, count):
+        """
+        Crea los usuarios y tokens que falten y devuelve los tokens.
+        """
+        usernames = [f'{USERNAME_PREFIX}{index:05d}' for index in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        User.objects.bulk_create([
+            # Sin contraseña utilizable: solo se autentican por token
+            User(username=username, password='!')
+            for username in usernames if username not in existing
+        ])
+
+        users = User.objects.filter(username__in=usernames)
+        with_token = set(Token.objects.filter(user__in=users).values_list('user_id', flat=True))
+        Token.objects.bulk_create([
+            Token(key=Token.generate_key(), user=user)
+            for user in users if user.id not in with_token
+        ])
+        return list(Token.objects.filter(user__in=users).values_list('key', flat=True))
+
+
+class LoadTest:
+    def __init__(self, url, tokens, content_ids, interval, reads_every, rng):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.tokens = tokens
+        self.content_ids = content_ids
+        self.interval = interval
+        self.reads_every = reads_every
+        self.rng = rng
+        self.timings = {}
+        self.errors = {}
+
+    async def run(self, duration):
+        self.deadline = time.monotonic() + duration
+        start = time.monotonic()
+        await asyncio.gather(*(self.player(token) for token in self.tokens))
+        elapsed = time.monotonic() - start
+
+        endpoints = {}
+        for name in sorted(set(self.timings) | set(self.errors)):
+            timings = sorted(self.timings.get(name, []))
+            endpoints[name] = {
+                'requests': len(timings),
+                'errors': self.errors.get(name, 0),
+                'mean_ms': round(statistics.fmean(timings), 3) if timings else None,
+                'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+                'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+                'max_ms': round(timings[-1], 3) if timings else None,
+            }
+        total = sum(stats['requests'] for stats in endpoints.values())
+        return {
+            'players': len(self.tokens),
+            'duration_s': round(elapsed, 1),
+            'requests': total,
+            'requests_per_s': round(total / elapsed, 1),
+            'errors': sum(stats['errors'] for stats in endpoints.values()),
+            'endpoints': endpoints,
+        }
+
+    async def player(self, token):
+        connection = Connection(self.host, self.port, token)
+        content_id = self.rng.choice(self.content_ids)
+        position = self.rng.randint(0, 5000)
+        # Los reproductores no arrancan todos a la vez
+        await asyncio.sleep(self.rng.uniform(0, self.interval))
+        heartbeats = 0
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.monotonic()
+                position += int(self.interval) or 1
+                await self.call(connection, 'update_progress', 'POST', '/api/streaming/history/update_progress/', {
+                    'content': content_id, 'watched_time': position, 'total_duration': 6000,
+                })
+                heartbeats += 1
+                if heartbeats % self.reads_every == 0:
+                    await self.call(connection, 'continue_watching', 'GET', '/api/streaming/history/continue_watching/')
+                    await self.call(connection, 'recent', 'GET', '/api/streaming/history/recent/')
+                    await self.call(connection, 'trending', 'GET', '/api/streaming/trending/')
+                await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+        finally:
+            connection.close()
+
+    async def call(self, connection, name, method, path, payload=None):
+        start = time.perf_counter()
+        try:
+            status = await connection.request(method, self.prefix + path, payload)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            connection.close()
+            status = None
+        if status is None or status >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        else:
+            self.timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+
+class Connection:
+    """
+    Cliente HTTP/1.1 mínimo con keep-alive, para no depender de librerías
+    externas. Vuelve a conectar si el servidor cierra la conexión.
+    """
+
+    def __init__(self, host, port, token):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = (
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Host: {self.host}\r\n'
+            f'Authorization: Token {self.token}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'
+        )
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("El servidor cerró la conexión")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+            self.close()
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
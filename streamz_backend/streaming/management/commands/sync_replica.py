@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from streamz_backend.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base de datos SQLite principal en las réplicas SQLite configuradas "
+        "en DATABASE_REPLICA_URLS, para probar en local el enrutado de lecturas a "
+        "réplicas. Con --interval repite la copia cada N segundos, simulando el "
+        "retraso de la replicación. Con PostgreSQL la replicación es cosa del servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help="Repetir la copia cada N segundos")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        replicas = [connections[alias].settings_dict for alias in replica_aliases()]
+        if not replicas:
+            raise CommandError("No hay réplicas configuradas (DATABASE_REPLICA_URLS)")
+        if any(not settings_dict['ENGINE'].endswith('sqlite3') for settings_dict in [primary, *replicas]):
+            raise CommandError("sync_replica solo copia bases de datos SQLite")
+
+        while True:
+            start = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        # API de backup de SQLite: copia consistente aunque haya escrituras
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stderr.write(
+                f"Réplicas actualizadas en {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
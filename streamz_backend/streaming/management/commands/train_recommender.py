@@ -0,0 +1,35 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from streaming.collaborative import train
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrena el recomendador item-item con el historial de visualización y lo "
+        "publica en RECOMMENDER_MODEL_DIR como nueva versión vigente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors', type=int, default=50,
+            help="Vecinos que se guardan por título"
+        )
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        try:
+            summary = train(neighbors=options['neighbors'])
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(
+            f"Modelo {summary['version']}: {summary['users']} usuarios, {summary['items']} títulos, "
+            f"{summary['interactions']} interacciones, {summary['neighbors']} vecinos "
+            f"en {summary['seconds']} s"
+        )
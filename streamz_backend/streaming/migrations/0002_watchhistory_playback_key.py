@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Registros por UPDATE o DELETE en bloque
+BATCH_SIZE = 1000
+
+
+def fill_playback_keys(apps, schema_editor):
+    """
+    Calcula playback_key para los registros existentes y elimina los
+    duplicados que impedirían la restricción única.
+
+    Pérdida de datos: de cada (user, playback_key) solo se conserva el registro
+    con más progreso (porcentaje, luego tiempo visto y, en empate, el más
+    reciente); los demás se borran.
+    """
+    WatchHistory = apps.get_model('streaming', 'WatchHistory')
+    seen = set()
+    duplicates = []
+    keyed = []
+    rows = WatchHistory.objects.order_by(
+        '-watched_percentage', '-watched_time', '-watched_date', '-id'
+    ).values_list('pk', 'user_id', 'content_id', 'episode_id')
+    for pk, user_id, content_id, episode_id in rows.iterator():
+        key = f"{content_id or ''}:{episode_id or ''}"
+        if (user_id, key) in seen:
+            duplicates.append(pk)
+            continue
+        seen.add((user_id, key))
+        keyed.append(WatchHistory(pk=pk, playback_key=key))
+
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        WatchHistory.objects.filter(pk__in=duplicates[start:start + BATCH_SIZE]).delete()
+    WatchHistory.objects.bulk_update(keyed, ['playback_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+        ('streaming', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchhistory',
+            name='playback_key',
+            field=models.CharField(default='', editable=False, max_length=41),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_playback_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='watchhistory',
+            unique_together={('user', 'playback_key')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 10:30
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def fill_preference_levels(apps, schema_editor):
+    """
+    Marca como ya contabilizado el umbral alcanzado por los registros existentes,
+    cuyas preferencias se calcularon con la señal anterior.
+    """
+    WatchHistory = apps.get_model('streaming', 'WatchHistory')
+    WatchHistory.objects.update(preference_level=Case(
+        When(watched_percentage__gte=90, then=Value(90)),
+        When(watched_percentage__gte=50, then=Value(50)),
+        When(watched_percentage__gte=20, then=Value(20)),
+        default=Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0002_watchhistory_playback_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchhistory',
+            name='preference_level',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_preference_levels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-18 11:00
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_buckets(apps, schema_editor):
+    """
+    Carga en buckets horarios las vistas de la última semana ya registradas.
+    """
+    WatchHistory = apps.get_model('streaming', 'WatchHistory')
+    TrendingBucket = apps.get_model('streaming', 'TrendingBucket')
+    counts = Counter(
+        (content_id, watched_date.replace(minute=0, second=0, microsecond=0))
+        for content_id, watched_date in WatchHistory.objects.filter(
+            content__isnull=False,
+            preference_level__gte=20,
+            watched_date__gte=datetime.now() - timedelta(days=7)
+        ).values_list('content_id', 'watched_date').iterator()
+    )
+    TrendingBucket.objects.bulk_create(
+        [
+            TrendingBucket(content_id=content_id, bucket_start=start, views=views)
+            for (content_id, start), views in counts.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0001_initial'),
+        ('streaming', '0003_watchhistory_preference_level'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('views', models.IntegerField(default=0)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='content.content')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='streaming_t_bucket__3c4816_idx')],
+                'unique_together': {('content', 'bucket_start')},
+            },
+        ),
+        migrations.RunPython(backfill_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 01:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_keyset_indexes'),
+        ('streaming', '0004_trendingbucket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['user', '-watched_date', '-id'], name='history_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 02:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_external_ids'),
+        ('streaming', '0005_watchhistory_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['watched_date', 'id'], name='history_date_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 02:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('streaming', '0006_watchhistory_export_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContinueWatching',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('items', models.JSONField(default=list)),
+                ('content_ids', models.TextField(default='', editable=False)),
+                ('truncated', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 02:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Debe coincidir con streaming.series.EPISODES_PER_SEASON
+EPISODES_PER_SEASON = 128
+
+
+def backfill_series_progress(apps, schema_editor):
+    """
+    Agrega por serie el historial de episodios existente. preference_level se
+    deja en 0: las series nunca contaron para las preferencias ni para trending,
+    así que el siguiente cruce de umbral de cada una se contabiliza.
+    """
+    WatchHistory = apps.get_model('streaming', 'WatchHistory')
+    SeriesProgress = apps.get_model('streaming', 'SeriesProgress')
+    progress = {}
+    for history in WatchHistory.objects.filter(episode__isnull=False).select_related(
+        'episode'
+    ).order_by('watched_date').iterator(chunk_size=2000):
+        episode = history.episode
+        key = (history.user_id, episode.series_id)
+        row = progress.get(key)
+        if row is None:
+            row = progress[key] = SeriesProgress(
+                user_id=history.user_id, series_id=episode.series_id, completed_episodes=b''
+            )
+        row.last_episode_id = episode.id
+        row.last_season_number = episode.season_number
+        row.last_episode_number = episode.episode_number
+        row.watched_time = history.watched_time
+        row.watched_percentage = history.watched_percentage
+        bit = episode.season_number * EPISODES_PER_SEASON + episode.episode_number
+        if (history.watched_percentage >= 90 and episode.season_number >= 0
+                and 0 <= episode.episode_number < EPISODES_PER_SEASON):
+            bitmap = bytearray(row.completed_episodes)
+            bitmap.extend(bytes(max(0, bit // 8 + 1 - len(bitmap))))
+            if not bitmap[bit // 8] & (1 << bit % 8):
+                bitmap[bit // 8] |= 1 << bit % 8
+                row.completed_count += 1
+            row.completed_episodes = bytes(bitmap)
+    SeriesProgress.objects.bulk_create(progress.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_episode_order_index'),
+        ('streaming', '0007_continuewatching'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_season_number', models.IntegerField()),
+                ('last_episode_number', models.IntegerField()),
+                ('watched_time', models.IntegerField(default=0)),
+                ('watched_percentage', models.FloatField(default=0)),
+                ('completed_episodes', models.BinaryField(default=bytes)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('preference_level', models.IntegerField(default=0, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_episode', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='content.episode')),
+                ('series', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='content.content')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'series')},
+            },
+        ),
+        migrations.RunPython(backfill_series_progress, migrations.RunPython.noop),
+    ]
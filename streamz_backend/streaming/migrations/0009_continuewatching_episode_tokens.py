@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def clear_continue_watching(apps, schema_editor):
+    """
+    Las filas existentes no tienen las claves de episodio en content_ids y no
+    se invalidarían al cambiar un episodio: se reconstruyen en la siguiente lectura.
+    """
+    apps.get_model('streaming', 'ContinueWatching').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0008_seriesprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_continue_watching, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def recount_completed_episodes(apps, schema_editor):
+    """
+    completed_count subía con cada heartbeat >= 90% de un episodio fuera del
+    mapa de bits: se recalcula a partir de los bits marcados.
+    """
+    SeriesProgress = apps.get_model('streaming', 'SeriesProgress')
+    changed = []
+    for row in SeriesProgress.objects.only('completed_episodes', 'completed_count').iterator(chunk_size=2000):
+        count = sum(bin(byte).count('1') for byte in bytes(row.completed_episodes))
+        if count != row.completed_count:
+            row.completed_count = count
+            changed.append(row)
+    SeriesProgress.objects.bulk_update(changed, ['completed_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0009_continuewatching_episode_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_completed_episodes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 03:54
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_trending_days(apps, schema_editor):
+    """
+    Los registros que ya pasaron del 20% contaron su vista al cruzar el umbral:
+    se da por contada la del día de su última reproducción, para no sumar otra
+    hoy en el primer heartbeat.
+    """
+    WatchHistory = apps.get_model('streaming', 'WatchHistory')
+    SeriesProgress = apps.get_model('streaming', 'SeriesProgress')
+    WatchHistory.objects.filter(preference_level__gt=0).update(trending_day=TruncDate('watched_date'))
+    SeriesProgress.objects.filter(preference_level__gt=0).update(trending_day=TruncDate('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaming', '0011_screensession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seriesprogress',
+            name='trending_day',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='watchhistory',
+            name='trending_day',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_trending_days, migrations.RunPython.noop),
+    ]
@@ -9,9 +9,32 @@ class WatchHistory(models.Model):
     watched_time = models.IntegerField(default=0)  # tiempo en segundos
     watched_percentage = models.FloatField(default=0)
     watched_date = models.DateTimeField(auto_now=True)
+    # Clave "content_id:episode_id" que identifica lo que se reproduce, para poder
+    # hacer upserts por (user, playback_key) aunque content o episode sean nulos
+    playback_key = models.CharField(max_length=41, editable=False)
+    # Umbral de progreso más alto (0, 20, 50 o 90) ya contabilizado en las preferencias
+    preference_level = models.IntegerField(default=0, editable=False)
+    # Último día en que el registro contó una vista para trending (una por día
+    # en que se reproduce pasado el 20%)
+    trending_day = models.DateField(null=True, editable=False)
     
     class Meta:
         ordering = ['-watched_date']
+        unique_together = ('user', 'playback_key')
+        indexes = [
+            # Historial del usuario paginado por cursor
+            models.Index(fields=['user', '-watched_date', '-id'], name='history_user_date_idx'),
+            # Exportación incremental por marca de agua (streaming/export.py)
+            models.Index(fields=['watched_date', 'id'], name='history_date_idx'),
+        ]
+        
+    @staticmethod
+    def make_playback_key(content_id, episode_id):
+        return f"{content_id or ''}:{episode_id or ''}"
+    
+    def save(self, *args, **kwargs):
+        self.playback_key = self.make_playback_key(self.content_id, self.episode_id)
+        super().save(*args, **kwargs)
         
     def __str__(self):
         if self.episode:
@@ -24,4 +47,74 @@ class UserPreference(models.Model):
     score = models.FloatField(default=0)  # Para calcular recomendaciones
     
     class Meta:
-        unique_together = ('user', 'genre')
\ No newline at end of file
+        unique_together = ('user', 'genre')
+
+
+class TrendingBucket(models.Model):
+    content = models.ForeignKey(Content, on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()  # inicio de la hora (o del día, tras compactar)
+    views = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('content', 'bucket_start')
+        indexes = [
+            models.Index(fields=['bucket_start']),
+        ]
+
+
+class ContinueWatching(models.Model):
+    """
+    Lista "seguir viendo" de cada usuario, desnormalizada: se mantiene al
+    registrar el progreso (streaming/continue_watching.py) para que leerla sea
+    una consulta por clave primaria, sin joins ni ordenación.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    # Los elementos tal como los devuelve la API (WatchHistorySerializer), del más reciente al más antiguo
+    items = models.JSONField(default=list)
+    # Ids de contenido de los elementos, o "e" e id de episodio (",12,e40,"), para
+    # invalidar la fila cuando cambia uno
+    content_ids = models.TextField(default='', editable=False)
+    # Se descartaron elementos al recortar la lista: puede haber más en curso de los que caben
+    truncated = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SeriesProgress(models.Model):
+    """
+    Progreso agregado de un usuario en una serie, mantenido con cada heartbeat
+    de sus episodios (streaming/series.py). Los registros de episodios tienen
+    content nulo: este agregado es lo que lleva las series a trending, a las
+    preferencias y al endpoint next_episode.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    series = models.ForeignKey(Content, on_delete=models.CASCADE)
+    # Último episodio visto y la posición en él
+    last_episode = models.ForeignKey(Episode, on_delete=models.SET_NULL, null=True, related_name='+')
+    last_season_number = models.IntegerField()
+    last_episode_number = models.IntegerField()
+    watched_time = models.IntegerField(default=0)  # tiempo en segundos
+    watched_percentage = models.FloatField(default=0)
+    # Mapa de bits de episodios completados (>= 90%), un bit por (temporada, episodio)
+    completed_episodes = models.BinaryField(default=bytes)
+    completed_count = models.IntegerField(default=0)
+    # Umbral más alto alcanzado en algún episodio, ya contabilizado para la serie
+    preference_level = models.IntegerField(default=0, editable=False)
+    # Último día en que la serie contó una vista para trending
+    trending_day = models.DateField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'series')
+
+
+class ScreenSession(models.Model):
+    """
+    Reproducción activa de un usuario, una por pantalla ocupada de su plan
+    (streaming/screens.py). La fila caduca sin heartbeats en expires_at.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    session = models.CharField(max_length=64)
+    expires_at = models.FloatField()  # marca de tiempo (time.time())
+
+    class Meta:
+        unique_together = ('user', 'session')
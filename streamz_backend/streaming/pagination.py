@@ -0,0 +1,7 @@
+# streaming/pagination.py
+from content.pagination import KeysetPagination
+
+
+class WatchHistoryKeysetPagination(KeysetPagination):
+    # Usa el índice (user, -watched_date, -id)
+    ordering = ('-watched_date', '-id')
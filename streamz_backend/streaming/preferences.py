@@ -0,0 +1,51 @@
+# streaming/preferences.py
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Least
+
+from .models import UserPreference
+
+MAX_SCORE = 10.0
+# Preferencias por consulta: SQLite no admite expresiones de más de 1000
+# niveles y un lote de la cola de tareas suma varios géneros por título
+UPSERT_BATCH_SIZE = 200
+
+
+def apply_preference_increments(increments):
+    """
+    Aplica en bloque incrementos de puntuación {(user_id, genre_id): incremento}.
+
+    Crea las preferencias que falten y suma los incrementos con una sentencia
+    UPDATE basada en F() por cada UPSERT_BATCH_SIZE preferencias, limitando el
+    score a MAX_SCORE.
+    """
+    increments = [(key, value) for key, value in increments.items() if value]
+    for start in range(0, len(increments), UPSERT_BATCH_SIZE):
+        apply_preference_batch(dict(increments[start:start + UPSERT_BATCH_SIZE]))
+
+
+def apply_preference_batch(increments):
+    UserPreference.objects.bulk_create(
+        [
+            UserPreference(user_id=user_id, genre_id=genre_id, score=0)
+            for user_id, genre_id in increments
+        ],
+        ignore_conflicts=True
+    )
+
+    pairs = reduce(or_, (
+        Q(user_id=user_id, genre_id=genre_id) for user_id, genre_id in increments
+    ))
+    increment = Case(
+        *[
+            When(user_id=user_id, genre_id=genre_id, then=Value(value))
+            for (user_id, genre_id), value in increments.items()
+        ],
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+    UserPreference.objects.filter(pairs).update(
+        score=Least(F('score') + increment, Value(MAX_SCORE))
+    )
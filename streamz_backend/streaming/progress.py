@@ -0,0 +1,141 @@
+# streaming/progress.py
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from content.models import Content
+from tasks.queue import enqueue, task
+from .models import WatchHistory
+from .preferences import apply_preference_increments
+from .recommendations import invalidate_recommendations
+from .trending import record_views
+
+# Umbrales de progreso y la puntuación que aporta alcanzar cada uno
+LEVEL_SCORES = {
+    0: 0.0,
+    20: 0.5,   # Vio al menos un poco
+    50: 1.0,   # Vio la mitad
+    90: 2.0,   # Completó el contenido
+}
+
+# Tarea que aplica los cruces de umbral fuera de la petición (tasks/queue.py)
+APPLY_CROSSINGS = 'streaming.apply_crossings'
+
+
+def progress_level(watched_percentage):
+    """
+    Devuelve el umbral más alto alcanzado con el porcentaje visto.
+    """
+    return max(level for level in LEVEL_SCORES if watched_percentage >= level)
+
+
+def record_progress(histories, today=None):
+    """
+    Procesa un lote de registros de WatchHistory recién guardados.
+
+    Solo generan trabajo los registros que cruzan un umbral nuevo (20/50/90%)
+    o que pasan del 20% por primera vez en el día (una vista para trending),
+    de modo que casi ningún heartbeat hace consultas y las preferencias no se
+    inflan por guardar varias veces el mismo título.
+    Devuelve la lista de cruces (history, nivel_anterior, nivel_nuevo, vista).
+    """
+    today = today or date.today()
+    crossings = []
+    for history in histories:
+        reached = progress_level(history.watched_percentage)
+        level = max(reached, history.preference_level)
+        view = reached > 0 and history.trending_day != today
+        if level > history.preference_level or view:
+            crossings.append((history, history.preference_level, level, view))
+
+    if not crossings:
+        return crossings
+
+    # Guardar el nuevo umbral y el día de la vista para no volver a contabilizarlos
+    pks_by_update = defaultdict(list)
+    for history, previous_level, level, view in crossings:
+        pks_by_update[(level if level > previous_level else None, view)].append(history.pk)
+        history.preference_level = level
+        if view:
+            history.trending_day = today
+    for (level, view), pks in pks_by_update.items():
+        fields = {'trending_day': today} if view else {}
+        if level is not None:
+            fields['preference_level'] = Greatest(F('preference_level'), level)
+        WatchHistory.objects.filter(pk__in=pks).update(**fields)
+
+    defer_crossings([
+        (
+            f'history:{history.pk}:{level}' if level > previous_level else f'history:{history.pk}:{today}',
+            (history.user_id, history.content_id, previous_level, level, view),
+        )
+        for history, previous_level, level, view in crossings
+    ])
+    return crossings
+
+
+def defer_crossings(crossings):
+    """
+    Encola los efectos de los cruces [(clave, cruce)] para el worker de tareas
+    (o los aplica en el momento si la cola está desactivada). La clave evita
+    contabilizar dos veces el mismo cruce de un registro.
+    """
+    enqueue(APPLY_CROSSINGS, [
+        (key, {
+            'user': user_id, 'content': content_id, 'previous_level': previous_level,
+            'level': level, 'view': view,
+        })
+        for key, (user_id, content_id, previous_level, level, view) in crossings
+    ])
+
+
+@task(APPLY_CROSSINGS)
+def apply_crossings_task(payloads):
+    apply_crossings([
+        (
+            payload['user'], payload['content'], payload['previous_level'], payload['level'],
+            # Tareas encoladas antes de contar una vista por día
+            payload.get('view', payload['previous_level'] == 0),
+        )
+        for payload in payloads
+    ])
+
+
+def apply_crossings(crossings):
+    """
+    Aplica los efectos de una lista de cruces (user_id, content_id,
+    nivel_anterior, nivel_nuevo, vista): de un título (record_progress) o de
+    una serie (series.record_series_progress).
+    """
+    update_preferences(crossings)
+    # Una vista para trending por usuario, título y día en que pasa del 20%
+    record_views(content_id for _, content_id, _, _, view in crossings if view and content_id)
+    invalidate_recommendations(
+        user_id for user_id, _, previous_level, level, _ in crossings if level > previous_level
+    )
+
+
+def update_preferences(crossings):
+    """
+    Suma a las preferencias de género la diferencia de puntuación entre el
+    umbral anterior y el nuevo de cada cruce.
+    """
+    content_ids = {content_id for _, content_id, _, _, _ in crossings if content_id}
+    if not content_ids:
+        return  # Episodios: cuentan a través de su serie (streaming/series.py)
+
+    genres_by_content = defaultdict(list)
+    for content_id, genre_id in Content.genres.through.objects.filter(
+        content_id__in=content_ids
+    ).values_list('content_id', 'genre_id'):
+        genres_by_content[content_id].append(genre_id)
+
+    increments = defaultdict(float)
+    for user_id, content_id, previous_level, level, _ in crossings:
+        score_increment = LEVEL_SCORES[level] - LEVEL_SCORES[previous_level]
+        for genre_id in genres_by_content.get(content_id, []):
+            increments[(user_id, genre_id)] += score_increment
+
+    apply_preference_increments(increments)
@@ -0,0 +1,132 @@
+# streaming/recommendations.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from content.models import Content
+from . import collaborative
+from .models import WatchHistory, UserPreference, SeriesProgress
+
+RECOMMENDATIONS_LIMIT = 20
+# Algoritmos seleccionables con ?algorithm= en /recommendations/
+ALGORITHMS = ['genres', 'itemitem']
+
+
+def select_recommendations(user, algorithm=None):
+    """
+    Devuelve (algoritmo usado, [(content_id, score), ...]).
+
+    El modelo item-item se consulta en línea (no necesita caché); si no está
+    disponible o el usuario no tiene historial que el modelo conozca, se usa
+    la heurística de géneros.
+    """
+    algorithm = algorithm or getattr(settings, 'RECOMMENDATIONS_ALGORITHM', 'genres')
+    if algorithm == 'itemitem':
+        recommendations = collaborative.recommend(user, RECOMMENDATIONS_LIMIT)
+        if recommendations is not None:
+            return 'itemitem', recommendations
+    return 'genres', get_recommendations(user)
+
+
+def cache_key(user_id):
+    return f'recommendations:user:{user_id}'
+
+
+def get_recommendations(user):
+    """
+    Devuelve la lista materializada [(content_id, score), ...] del usuario,
+    calculándola y guardándola en caché solo si no existe.
+    """
+    key = cache_key(user.id)
+    recommendations = cache.get(key)
+    if recommendations is None:
+        recommendations = compute_recommendations(user)
+        cache.set(
+            key, recommendations,
+            getattr(settings, 'RECOMMENDATIONS_CACHE_TIMEOUT', 3600)
+        )
+    return recommendations
+
+
+def invalidate_recommendations(user_ids):
+    """
+    Descarta las recomendaciones precalculadas de los usuarios indicados.
+    """
+    cache.delete_many([cache_key(user_id) for user_id in set(user_ids)])
+
+
+def compute_recommendations(user):
+    """
+    Calcula las recomendaciones del usuario a partir de los géneros de lo que ha
+    visto y de sus preferencias guardadas.
+    """
+    # 1. Obtener todos los contenidos que el usuario ha visto, incluidas las
+    # series de las que ha visto episodios (sus registros no tienen content)
+    watched_content_ids = WatchHistory.objects.filter(
+        user=user, content__isnull=False
+    ).values_list('content', flat=True).distinct()
+    watched_series_ids = SeriesProgress.objects.filter(user=user).values_list('series', flat=True)
+
+    # 2. Obtener los géneros preferidos del usuario basado en su historial
+    genre_preferences = {}
+
+    # 2.1 Géneros de contenido completamente visto (alta preferencia)
+    completed_content_genres = WatchHistory.objects.filter(
+        user=user,
+        watched_percentage__gte=90
+    ).values_list('content__genres', flat=True)
+
+    for genre_id in completed_content_genres:
+        if genre_id:
+            genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + 3
+
+    # 2.2 Géneros de contenido parcialmente visto
+    partial_content_genres = WatchHistory.objects.filter(
+        user=user,
+        watched_percentage__lt=90,
+        watched_percentage__gt=20
+    ).values_list('content__genres', flat=True)
+
+    for genre_id in partial_content_genres:
+        if genre_id:
+            genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + 1
+
+    # 2.3 También usar preferencias guardadas si existen
+    saved_preferences = UserPreference.objects.filter(
+        user=user
+    ).values_list('genre_id', 'score')
+
+    for genre_id, score in saved_preferences:
+        genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + score
+
+    # 3. Ordenar los géneros por preferencia
+    sorted_genres = sorted(
+        genre_preferences.items(),
+        key=lambda x: x[1],
+        reverse=True
+    )
+
+    top_genre_ids = [genre_id for genre_id, _ in sorted_genres[:5]]
+
+    # 4. Recomendar contenido basado en géneros preferidos que no haya visto
+    if top_genre_ids:
+        recommendations = Content.objects.filter(
+            genres__in=top_genre_ids
+        ).exclude(
+            id__in=watched_content_ids
+        ).exclude(
+            id__in=watched_series_ids
+        ).annotate(
+            genre_match_count=Count('genres', filter=Q(genres__in=top_genre_ids))
+        ).order_by('-genre_match_count', '-release_year')[:RECOMMENDATIONS_LIMIT]
+
+        return list(recommendations.values_list('id', 'genre_match_count'))
+
+    # Si no hay suficientes datos, recomendar contenido popular
+    recommendations = Content.objects.exclude(
+        id__in=watched_content_ids
+    ).exclude(
+        id__in=watched_series_ids
+    ).order_by('-release_year')[:RECOMMENDATIONS_LIMIT]
+
+    return [(content_id, 0) for content_id in recommendations.values_list('id', flat=True)]
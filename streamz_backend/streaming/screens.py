@@ -0,0 +1,136 @@
+# streaming/screens.py
+"""
+Registro de reproducciones activas para limitar las pantallas simultáneas de
+cada usuario a SubscriptionPlan.max_screens.
+
+Cada pantalla ocupada es una fila de ScreenSession (usuario, sesión,
+caduca_en) en la base de datos, así que el límite es el mismo en todos los
+workers sea cual sea la caché. Los heartbeats (update_progress y el canal
+WebSocket):
+
+- Si la caché recuerda que la sesión se admitió y a su fila le queda más de
+  la mitad de SCREEN_SESSION_TTL, no consultan la base de datos (el caso de
+  casi todos los heartbeats).
+- Si no, en una transacción con la fila del usuario bloqueada, se descartan
+  las sesiones caducadas y se registra o refresca la sesión, salvo que el
+  usuario ya tenga max_screens sesiones distintas. Dos sesiones nuevas del
+  mismo usuario no pueden ocupar a la vez la última pantalla.
+
+Una sesión que deja de enviar heartbeats caduca sola; el canal WebSocket la
+libera además al desconectarse. Los clientes que no envían identificador de
+sesión comparten una (DEFAULT_SESSION) y cuentan como una sola pantalla.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from authentication.models import User
+from .models import ScreenSession
+
+# Sesión de los clientes que no envían identificador
+DEFAULT_SESSION = 'default'
+# Longitud máxima de un identificador de sesión
+SESSION_ID_LENGTH = 64
+
+
+def active_key(user_id, session):
+    return f'screens:{user_id}:{session}'
+
+
+def max_screens(user):
+    # El plan llega ya cargado con el usuario del token (CachedTokenAuthentication)
+    plan = user.plan if user.plan_id else None
+    return plan.max_screens if plan else 1
+
+
+def limit_error(user):
+    return {
+        "error": "Has alcanzado el máximo de pantallas simultáneas de tu plan",
+        "max_screens": max_screens(user),
+    }
+
+
+def is_fresh(expires, now):
+    """
+    A la sesión le queda más de la mitad de su vida: no hace falta refrescarla.
+    """
+    return expires is not None and expires - now > settings.SCREEN_SESSION_TTL / 2
+
+
+def admit(sessions, session_id, limit, now):
+    """
+    Decide si la sesión puede reproducir. Devuelve (admitida, registro a
+    guardar o None si no hay que escribir).
+    """
+    if is_fresh(sessions.get(session_id), now):
+        return True, None
+
+    sessions = {session: expires for session, expires in sessions.items() if expires > now}
+    if session_id not in sessions and len(sessions) >= limit:
+        return False, None
+    sessions[session_id] = now + settings.SCREEN_SESSION_TTL
+    return True, sessions
+
+
+def session_key(session_id):
+    return str(session_id or DEFAULT_SESSION)[:SESSION_ID_LENGTH]
+
+
+def register(user, session):
+    """
+    Registra o refresca la sesión en la base de datos. Devuelve False si el
+    usuario ya tiene todas las pantallas ocupadas por otras sesiones.
+    """
+    now = time.time()
+    with transaction.atomic():
+        # Las sesiones de un usuario se admiten de una en una. En SQLite las
+        # transacciones IMMEDIATE ya van de una en una
+        list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+        current = dict(ScreenSession.objects.filter(user=user).values_list('session', 'expires_at'))
+        admitted, sessions = admit(current, session, max_screens(user), now)
+        if sessions is not None:
+            if current.keys() - sessions.keys():
+                ScreenSession.objects.filter(user=user).exclude(session__in=list(sessions)).delete()
+            if session in current:
+                ScreenSession.objects.filter(user=user, session=session).update(expires_at=sessions[session])
+            else:
+                ScreenSession.objects.create(user=user, session=session, expires_at=sessions[session])
+
+    if admitted:
+        expires = (sessions or current)[session]
+        cache.set(active_key(user.pk, session), expires, settings.SCREEN_SESSION_TTL)
+    return admitted
+
+
+def touch(user, session_id=None):
+    """
+    Registra o refresca la sesión de reproducción del usuario. Devuelve False
+    si ya tiene todas las pantallas de su plan ocupadas por otras sesiones.
+    """
+    if not settings.SCREEN_LIMIT_ENABLED:
+        return True
+    session = session_key(session_id)
+    if is_fresh(cache.get(active_key(user.pk, session)), time.time()):
+        return True
+    return register(user, session)
+
+
+async def atouch(user, session_id=None):
+    if not settings.SCREEN_LIMIT_ENABLED:
+        return True
+    session = session_key(session_id)
+    if is_fresh(await cache.aget(active_key(user.pk, session)), time.time()):
+        return True
+    return await sync_to_async(register)(user, session)
+
+
+async def arelease(user_id, session_id=None):
+    """
+    Libera la pantalla de una sesión que ha terminado de reproducir.
+    """
+    session = session_key(session_id)
+    await cache.adelete(active_key(user_id, session))
+    await ScreenSession.objects.filter(user_id=user_id, session=session).adelete()
@@ -1,23 +1,53 @@
 # streaming/serializers.py
+from django.db.models import Prefetch
 from rest_framework import serializers
+from streamz_backend.instrumentation import TimedSerializerMixin
 from .models import WatchHistory
 from content.serializers import ContentSerializer, EpisodeSerializer
 from .models import UserPreference
 from content.serializers import GenreSerializer
+from content.models import Genre
 
-class WatchHistorySerializer(serializers.ModelSerializer):
+class WatchHistorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     content_details = ContentSerializer(source='content', read_only=True)
     episode_details = EpisodeSerializer(source='episode', read_only=True)
     
+    # Relaciones que las vistas cargan por adelantado (ver content.mixins.EagerLoadingMixin)
+    select_related_fields = ['content', 'episode']
+    prefetch_related_fields = [
+        Prefetch('content__genres', queryset=Genre.objects.order_by('id')),
+    ]
+    
     class Meta:
         model = WatchHistory
         fields = ['id', 'content', 'episode', 'watched_time', 'watched_percentage', 
                   'watched_date', 'content_details', 'episode_details']
         read_only_fields = ['user', 'watched_date']
-        
-class UserPreferenceSerializer(serializers.ModelSerializer):
+
+    def validate(self, attrs):
+        # Un registro por usuario y título (unique_together con playback_key):
+        # el progreso de un título ya registrado se actualiza, no se duplica
+        content = attrs.get('content', getattr(self.instance, 'content', None))
+        episode = attrs.get('episode', getattr(self.instance, 'episode', None))
+        existing = WatchHistory.objects.filter(
+            user=self.context['request'].user,
+            playback_key=WatchHistory.make_playback_key(
+                content.pk if content else None, episode.pk if episode else None
+            ),
+        )
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError(
+                {"non_field_errors": "Ya existe un registro de este título en el historial"}
+            )
+        return attrs
+
+class UserPreferenceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     genre_details = GenreSerializer(source='genre', read_only=True)
     
+    select_related_fields = ['genre']
+    
     class Meta:
         model = UserPreference
         fields = ['id', 'genre', 'score', 'genre_details']
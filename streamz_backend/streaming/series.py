@@ -0,0 +1,184 @@
+# streaming/series.py
+"""
+Progreso agregado por (usuario, serie) a partir de los heartbeats de episodios.
+
+Cada lote de registros guardados (post_save o volcado del buffer) actualiza con
+un upsert la fila SeriesProgress de cada serie: último episodio visto, su
+posición y el mapa de bits de episodios completados. Con ella:
+
+- next_episode sale de una fila y una consulta sobre el índice de episodios,
+  sin recorrer el historial de la serie.
+- La serie cuenta para trending y para las preferencias como un título más:
+  cada umbral (20/50/90%) se contabiliza una vez por serie, la primera vez que
+  lo alcanza cualquiera de sus episodios, y suma una vista cada día en que
+  alguno de sus episodios pasa del 20%.
+"""
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+
+from content.models import Episode
+from .models import SeriesProgress
+from .progress import defer_crossings, progress_level
+
+# Bits por temporada en el mapa de episodios completados: el bit de un episodio
+# es temporada * EPISODES_PER_SEASON + número de episodio, estable aunque se
+# añadan episodios o temporadas. Los episodios con número mayor no se marcan.
+EPISODES_PER_SEASON = 128
+# Episodios siguientes que se leen por consulta para saltar los ya completados
+NEXT_EPISODE_SCAN = 50
+# Filas de progreso que se bloquean por consulta: SQLite no admite expresiones
+# de más de 1000 niveles y un volcado del buffer puede traer miles de series
+LOCK_BATCH_SIZE = 200
+
+
+def episode_bit(season_number, episode_number):
+    if season_number < 0 or not 0 <= episode_number < EPISODES_PER_SEASON:
+        return None
+    return season_number * EPISODES_PER_SEASON + episode_number
+
+
+def is_completed(bitmap, season_number, episode_number):
+    bit = episode_bit(season_number, episode_number)
+    return bit is not None and bit // 8 < len(bitmap) and bool(bitmap[bit // 8] & (1 << bit % 8))
+
+
+def mark_completed(bitmap, season_number, episode_number):
+    """
+    Devuelve el mapa con el episodio marcado como completado.
+    """
+    bit = episode_bit(season_number, episode_number)
+    if bit is None:
+        return bytes(bitmap)
+    bitmap = bytearray(bitmap)
+    if len(bitmap) <= bit // 8:
+        bitmap.extend(bytes(bit // 8 + 1 - len(bitmap)))
+    bitmap[bit // 8] |= 1 << bit % 8
+    return bytes(bitmap)
+
+
+def record_series_progress(histories, today=None):
+    """
+    Actualiza el progreso de las series de los registros de episodios del lote
+    y aplica los cruces de umbral de cada serie. Devuelve las filas guardadas.
+    """
+    histories = [history for history in histories if history.episode_id]
+    if not histories:
+        return []
+
+    episodes = Episode.objects.only(
+        'series_id', 'season_number', 'episode_number'
+    ).in_bulk({history.episode_id for history in histories})
+    histories = sorted(
+        (history for history in histories if history.episode_id in episodes),
+        key=lambda history: history.watched_date
+    )
+    if not histories:
+        return []
+
+    today = today or date.today()
+    viewed = set()
+    crossings = []
+    with transaction.atomic():
+        # En orden, para que dos volcados bloqueen las filas en el mismo orden
+        keys = sorted({(history.user_id, episodes[history.episode_id].series_id) for history in histories})
+        progress = {}
+        for start in range(0, len(keys), LOCK_BATCH_SIZE):
+            progress.update({
+                (row.user_id, row.series_id): row
+                for row in SeriesProgress.objects.select_for_update().filter(reduce(or_, (
+                    Q(user_id=user_id, series_id=series_id)
+                    for user_id, series_id in keys[start:start + LOCK_BATCH_SIZE]
+                )))
+            })
+        levels = {key: row.preference_level for key, row in progress.items()}
+
+        # En orden de fecha: el último registro de cada serie queda como último episodio
+        for history in histories:
+            episode = episodes[history.episode_id]
+            key = (history.user_id, episode.series_id)
+            row = progress.get(key)
+            if row is None:
+                row = progress[key] = SeriesProgress(user_id=history.user_id, series_id=episode.series_id)
+            row.last_episode_id = episode.id
+            row.last_season_number = episode.season_number
+            row.last_episode_number = episode.episode_number
+            row.watched_time = history.watched_time
+            row.watched_percentage = history.watched_percentage
+
+            level = progress_level(float(history.watched_percentage))
+            # Los episodios fuera del mapa de bits no se marcan ni se cuentan
+            if level >= 90 and episode_bit(
+                episode.season_number, episode.episode_number
+            ) is not None and not is_completed(
+                row.completed_episodes, episode.season_number, episode.episode_number
+            ):
+                row.completed_episodes = mark_completed(
+                    row.completed_episodes, episode.season_number, episode.episode_number
+                )
+                row.completed_count += 1
+            row.preference_level = max(row.preference_level, level)
+            if level > 0 and row.trending_day != today:
+                row.trending_day = today
+                viewed.add(key)
+
+        SeriesProgress.objects.bulk_create(
+            list(progress.values()),
+            update_conflicts=True,
+            unique_fields=['user', 'series'],
+            update_fields=[
+                'last_episode', 'last_season_number', 'last_episode_number', 'watched_time',
+                'watched_percentage', 'completed_episodes', 'completed_count',
+                'preference_level', 'trending_day', 'updated_at',
+            ],
+        )
+
+    for (user_id, series_id), row in progress.items():
+        previous_level = levels.get((user_id, series_id), 0)
+        view = (user_id, series_id) in viewed
+        if row.preference_level > previous_level:
+            key = f'series:{user_id}:{series_id}:{row.preference_level}'
+        elif view:
+            key = f'series:{user_id}:{series_id}:{today}'
+        else:
+            continue
+        crossings.append((key, (user_id, series_id, previous_level, row.preference_level, view)))
+    defer_crossings(crossings)
+    return list(progress.values())
+
+
+def next_episode(user, series_id):
+    """
+    Devuelve (episodio, segundo por el que continuar) del siguiente episodio
+    que debe ver el usuario, o (None, 0) si no queda ninguno:
+
+    - El último episodio visto si no lo terminó.
+    - Si no, el primero posterior que no haya completado.
+    - Sin progreso en la serie, el primer episodio.
+    """
+    progress = SeriesProgress.objects.filter(user=user, series_id=series_id).first()
+    if progress and progress.last_episode_id and progress.watched_percentage < 90:
+        episode = Episode.objects.filter(pk=progress.last_episode_id).first()
+        if episode is not None:
+            return episode, progress.watched_time
+
+    episodes = Episode.objects.filter(series_id=series_id).order_by('season_number', 'episode_number')
+    if progress is None:
+        return episodes.first(), 0
+
+    # Por páginas de NEXT_EPISODE_SCAN episodios, continuando tras el último leído
+    season_number, episode_number = progress.last_season_number, progress.last_episode_number
+    while True:
+        page = list(episodes.filter(
+            Q(season_number__gt=season_number)
+            | Q(season_number=season_number, episode_number__gt=episode_number)
+        )[:NEXT_EPISODE_SCAN])
+        for episode in page:
+            if not is_completed(progress.completed_episodes, episode.season_number, episode.episode_number):
+                return episode, 0
+        if len(page) < NEXT_EPISODE_SCAN:
+            return None, 0
+        season_number, episode_number = page[-1].season_number, page[-1].episode_number
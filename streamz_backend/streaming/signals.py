@@ -1,42 +1,75 @@
 # streaming/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from content.models import Content, Episode, Genre
+from content.signals import catalogue_imported
+from . import continue_watching
 from .models import WatchHistory, UserPreference
+from .progress import record_progress
+from .series import record_series_progress
+from .recommendations import invalidate_recommendations
 
 @receiver(post_save, sender=WatchHistory)
 def update_user_preferences(sender, instance, created, **kwargs):
     """
-    Actualiza automáticamente las preferencias del usuario cuando ve contenido
+    Actualiza las preferencias del usuario cuando su progreso cruza un umbral
     """
-    if not instance.content:
-        return  # No actualizar si no hay contenido (sólo episodio)
-    
-    # Obtener los géneros del contenido
-    genres = instance.content.genres.all()
-    
-    for genre in genres:
-        # Incrementar la puntuación basada en el porcentaje visto
-        score_increment = 0
-        
-        if instance.watched_percentage >= 90:
-            # Si completó el contenido, mayor incremento
-            score_increment = 2.0
-        elif instance.watched_percentage >= 50:
-            # Si vio la mitad, incremento medio
-            score_increment = 1.0
-        elif instance.watched_percentage >= 20:
-            # Si vio al menos un poco, pequeño incremento
-            score_increment = 0.5
-            
-        if score_increment > 0:
-            preference, created = UserPreference.objects.get_or_create(
-                user=instance.user,
-                genre=genre,
-                defaults={'score': score_increment}
-            )
-            
-            if not created:
-                # Limitar el score máximo
-                new_score = min(preference.score + score_increment, 10.0)
-                preference.score = new_score
-                preference.save()
\ No newline at end of file
+    if created:
+        # Un título nuevo en el historial cambia lo que se le puede recomendar
+        invalidate_recommendations([instance.user_id])
+    record_progress([instance])
+    record_series_progress([instance])
+    continue_watching.record([instance])
+
+@receiver(post_delete, sender=WatchHistory)
+def remove_from_continue_watching(sender, instance, **kwargs):
+    continue_watching.record([instance], deleted=True)
+
+@receiver(post_delete, sender=WatchHistory)
+@receiver(post_save, sender=UserPreference)
+@receiver(post_delete, sender=UserPreference)
+def refresh_recommendations(sender, instance, **kwargs):
+    """
+    Invalida las recomendaciones precalculadas cuando cambian los datos del usuario
+    """
+    invalidate_recommendations([instance.user_id])
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def invalidate_continue_watching_content(sender, instance, created=False, **kwargs):
+    """
+    Descarta las listas "seguir viendo" que muestran un contenido modificado
+    """
+    if not created:
+        continue_watching.invalidate_contents([instance.pk])
+
+@receiver(post_save, sender=Episode)
+@receiver(post_delete, sender=Episode)
+def invalidate_continue_watching_episode(sender, instance, created=False, **kwargs):
+    if not created:
+        continue_watching.invalidate_episodes([instance.pk])
+
+@receiver(m2m_changed, sender=Content.genres.through)
+def invalidate_continue_watching_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Desde un género (reverse) pk_set son contenidos; post_clear no lo trae
+        if not reverse:
+            continue_watching.invalidate_contents([instance.pk])
+        elif pk_set:
+            continue_watching.invalidate_contents(pk_set)
+        else:
+            continue_watching.invalidate_all()
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender='authentication.SubscriptionPlan')
+def invalidate_continue_watching_catalogue(sender, created=False, **kwargs):
+    # Un género nuevo no aparece aún en ninguna lista. Renombrar o borrar un
+    # género, o borrar un plan (SET_NULL sin señales), afecta a muchos títulos
+    if not created:
+        continue_watching.invalidate_all()
+
+@receiver(catalogue_imported)
+def invalidate_continue_watching_import(sender, content_ids, episode_ids=(), **kwargs):
+    continue_watching.invalidate_contents(content_ids)
+    continue_watching.invalidate_episodes(episode_ids)
@@ -0,0 +1,187 @@
+# streaming/sockets.py
+"""
+Canal WebSocket de progreso de reproducción (/ws/streaming/progress/), servido
+por la aplicación ASGI (streamz_backend/asgi.py) sin pasar por DRF.
+
+El reproductor se autentica una vez al conectar (?token=<clave>, y opcionalmente
+&session=<id> con su identificador de sesión) y envía su posición como
+mensajes JSON:
+
+    {"content": 1, "episode": null, "watched_time": 42.5, "total_duration": 600,
+     "event": "progress"}
+
+Cada mensaje solo se interpreta; la posición se guarda (como update_progress)
+como mucho cada PROGRESS_SOCKET_WRITE_INTERVAL segundos por conexión, y además
+en el momento con los eventos "pause", "ended" y "close", al cambiar de título
+y al desconectarse. Tras cada guardado se responde {"type": "saved", ...}; los
+mensajes no válidos reciben {"type": "error", "error": ...} sin cerrar el canal.
+
+La conexión ocupa una pantalla del plan (streaming/screens.py) mientras envía
+posiciones y la libera al desconectarse.
+"""
+import json
+import math
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections
+from rest_framework import exceptions
+
+from . import screens
+from .async_views import asave_progress, authenticator
+
+# Eventos del reproductor que obligan a guardar la posición en el momento
+FLUSH_EVENTS = {'pause', 'ended', 'close'}
+
+
+class ProgressSession:
+    """
+    Posición pendiente de guardar de una conexión y cuándo se guardó la última.
+    """
+
+    def __init__(self, user, write_interval, session_id):
+        self.user = user
+        self.write_interval = write_interval
+        # Pantalla que ocupa la conexión en el registro de sesiones (screens.py)
+        self.session_id = session_id
+        self.pending = None
+        self.last_write = None
+
+    async def receive(self, message):
+        """
+        Procesa un mensaje del reproductor. Devuelve la respuesta que hay que
+        enviar, o None si la posición solo se ha acumulado.
+        """
+        try:
+            position, event = parse_position(message)
+        except ValueError as exc:
+            return {'type': 'error', 'error': str(exc)}
+        if not await screens.atouch(self.user, self.session_id):
+            return {'type': 'error', **screens.limit_error(self.user)}
+
+        if self.pending and self.pending[:2] != position[:2]:
+            # Cambio de título: guardar la última posición del anterior y el
+            # nuevo en el momento, como el primero de la conexión
+            await self.flush()
+            self.last_write = None
+        self.pending = position
+
+        if event in FLUSH_EVENTS or self.last_write is None or (
+            time.monotonic() - self.last_write >= self.write_interval
+        ):
+            return await self.flush()
+        return None
+
+    async def flush(self):
+        if self.pending is None:
+            return None
+        content_id, episode_id, watched_time, watched_percentage = self.pending
+        self.pending = None
+        self.last_write = time.monotonic()
+        try:
+            history, buffered = await asave_progress(
+                self.user, content_id, episode_id, watched_time, watched_percentage
+            )
+        except (DataError, IntegrityError, ValueError):
+            # Título o episodio inexistente o valores fuera de rango: se avisa
+            # al reproductor sin cerrar el canal. La siguiente posición se guarda en el momento
+            self.last_write = None
+            return {'type': 'error', 'error': "No se pudo guardar la posición"}
+        if not buffered:
+            # Como al terminar una petición: devolver la conexión si ha caducado
+            await sync_to_async(close_old_connections)()
+        return {
+            'type': 'saved',
+            'content': history.content_id,
+            'episode': history.episode_id,
+            'watched_time': history.watched_time,
+            'watched_percentage': history.watched_percentage,
+        }
+
+
+def parse_position(message):
+    """
+    Devuelve ((content_id, episode_id, watched_time, watched_percentage), evento)
+    con las mismas reglas que update_progress.
+    """
+    try:
+        data = json.loads(message)
+        content_id = int(data['content']) if data.get('content') else None
+        episode_id = int(data['episode']) if data.get('episode') else None
+        watched_time = data.get('watched_time')
+        total_duration = float(data.get('total_duration') or 0)
+        watched_time = float(watched_time) if watched_time else None
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError("Mensaje no válido")
+
+    if not content_id and not episode_id:
+        raise ValueError("Se requiere content_id o episode_id")
+    if not watched_time:
+        raise ValueError("Se requiere watched_time")
+    # json admite NaN e Infinity, que no se pueden guardar
+    if not (math.isfinite(watched_time) and math.isfinite(total_duration)):
+        raise ValueError("Mensaje no válido")
+
+    # Calcular el porcentaje visto
+    watched_percentage = 0
+    if total_duration > 0:
+        watched_percentage = (watched_time / total_duration) * 100
+    return (content_id, episode_id, watched_time, watched_percentage), data.get('event')
+
+
+def query_param(scope, name):
+    values = parse_qs(scope.get('query_string', b'').decode()).get(name)
+    return values[0] if values else None
+
+
+def session_id(scope):
+    # El reproductor puede enviar su identificador (el mismo que en
+    # update_progress); si no, la conexión ocupa una pantalla propia
+    return query_param(scope, 'session') or uuid.uuid4().hex
+
+
+async def authenticate(scope):
+    """
+    Usuario del token de la query string, o None si falta o no es válido.
+    """
+    key = query_param(scope, 'token')
+    if not key:
+        return None
+    try:
+        user, _ = await authenticator.aauthenticate_credentials(key)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user
+
+
+async def progress_socket(scope, receive, send):
+    """
+    Aplicación ASGI del canal de progreso.
+    """
+    session = None
+    while True:
+        event = await receive()
+        if event['type'] == 'websocket.connect':
+            user = await authenticate(scope)
+            if user is None:
+                # Cerrar antes de aceptar: el cliente recibe un 403
+                await send({'type': 'websocket.close', 'code': 4401})
+                return
+            session = ProgressSession(
+                user, settings.PROGRESS_SOCKET_WRITE_INTERVAL, session_id(scope)
+            )
+            await send({'type': 'websocket.accept'})
+        elif event['type'] == 'websocket.receive':
+            reply = await session.receive(event.get('text') or event.get('bytes'))
+            if reply is not None:
+                await send({'type': 'websocket.send', 'text': json.dumps(reply)})
+        elif event['type'] == 'websocket.disconnect':
+            if session is not None:
+                try:
+                    await session.flush()
+                finally:
+                    await screens.arelease(session.user.id, session.session_id)
+            return
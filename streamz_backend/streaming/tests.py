@@ -1,3 +1,1051 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication.models import User, SubscriptionPlan
+from content.cache import bump_catalogue_version
+from content.compact import genre_names
+from content.models import Content, Episode, Genre
+from content.tests import QueryBudgetMixin
+from streamz_backend.benchmarking import generate_dataset
+from streamz_backend.routers import CATALOGUE_PIN_KEY, ReplicaRouter, ReplicaRoutingMiddleware
+from . import async_views, collaborative, continue_watching, export, screens, series
+from .buffer import progress_buffer
+from .models import (
+    ContinueWatching, ScreenSession, SeriesProgress, WatchHistory, UserPreference, TrendingBucket,
+)
+from .preferences import apply_preference_increments
+from .trending import add_views, bucket_start, compact_buckets, trending_content_ids
+from .views import WatchHistoryViewSet
+
+
+class StreamingTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = SubscriptionPlan.objects.create(
+            name='premium', price=15, max_screens=4, video_quality='4K'
+        )
+        cls.user = User.objects.create_user(username='ana', password='secreto123', plan=cls.plan)
+        cls.genre = Genre.objects.create(name='Drama')
+        cls.contents = []
+        for i in range(3):
+            content = Content.objects.create(
+                title=f'Título {i}', description='...', release_year=2000 + i,
+                content_type='movie', thumbnail='http://example.com/t.jpg',
+                video_file='http://example.com/v.mp4', min_subscription_plan=cls.plan
+            )
+            content.genres.add(cls.genre)
+            cls.contents.append(content)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def send_heartbeat(self, content, watched_time, total_duration=100):
+        return self.client.post('/api/streaming/history/update_progress/', {
+            'content': content.id, 'watched_time': watched_time, 'total_duration': total_duration
+        })
+
+
+class StreamingQueryBudgetTests(QueryBudgetMixin, StreamingTestCase):
+    def add_history(self, count):
+        for _ in range(count):
+            content = Content.objects.create(
+                title='Título', description='...', release_year=2020, content_type='movie',
+                thumbnail='http://example.com/t.jpg', video_file='http://example.com/v.mp4',
+                min_subscription_plan=self.plan
+            )
+            content.genres.add(self.genre)
+            self.send_heartbeat(content, 30)
+
+    def test_history_listings(self):
+        # Página (con content y episode) y géneros
+        self.assertQueryBudget('/api/streaming/history/', 2, self.add_history)
+        # Lista desnormalizada por clave primaria, una vez construida en la primera lectura
+        self.client.get('/api/streaming/history/continue_watching/')
+        self.assertQueryBudget('/api/streaming/history/continue_watching/', 1, self.add_history)
+        # Registros, contenidos y géneros (sin episodios: son todos películas)
+        self.assertQueryBudget('/api/streaming/history/recent/', 3, self.add_history)
+
+    def test_history_is_paginated_by_date_cursor(self):
+        self.add_history(25)
+
+        first = self.client.get('/api/streaming/history/')
+        second = self.client.get(first.data['next'])
+
+        ids = [item['id'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(
+            ids, list(WatchHistory.objects.order_by('-watched_date', '-id').values_list('id', flat=True))
+        )
+        self.assertIsNone(second.data['next'])
+
+    def test_recommendations_and_trending(self):
+        def add_titles(count):
+            cache.clear()
+            genre_names()
+            self.add_history(count)
+            for _ in range(count):
+                Content.objects.create(
+                    title='Sugerido', description='...', release_year=2021, content_type='movie',
+                    thumbnail='http://example.com/t.jpg', video_file='http://example.com/v.mp4',
+                    min_subscription_plan=self.plan
+                ).genres.add(self.genre)
+
+        # Cálculo de la lista (4), in_bulk y géneros
+        self.assertQueryBudget('/api/streaming/recommendations/', 6, add_titles)
+        # Suma de buckets, in_bulk y géneros
+        self.assertQueryBudget('/api/streaming/trending/', 3, add_titles)
+
+
+class PreferencePipelineTests(StreamingTestCase):
+    def score(self):
+        return UserPreference.objects.get(user=self.user, genre=self.genre).score
+
+    def test_repeated_heartbeats_do_not_inflate_score(self):
+        for watched_time in (25, 30, 35, 40):
+            self.send_heartbeat(self.contents[0], watched_time)
+
+        self.assertEqual(self.score(), 0.5)
+
+    def test_crossings_add_score_difference(self):
+        self.send_heartbeat(self.contents[0], 25)
+        self.send_heartbeat(self.contents[0], 60)
+        self.send_heartbeat(self.contents[0], 95)
+
+        self.assertEqual(self.score(), 2.0)
+
+    def test_score_is_capped(self):
+        UserPreference.objects.create(user=self.user, genre=self.genre, score=9.5)
+        self.send_heartbeat(self.contents[0], 95)
+
+        self.assertEqual(self.score(), 10.0)
+
+    def test_large_batches(self):
+        genres = Genre.objects.bulk_create([Genre(name=f'Género {index}') for index in range(1200)])
+        apply_preference_increments({(self.user.id, genre.id): 0.5 for genre in genres})
+        apply_preference_increments({(self.user.id, genre.id): 0.5 for genre in genres})
+
+        self.assertEqual(
+            set(UserPreference.objects.filter(user=self.user).values_list('score', flat=True)), {1.0}
+        )
+
+    def test_heartbeat_without_crossing_skips_preferences(self):
+        self.send_heartbeat(self.contents[0], 25)
+        # Lectura y guardado del registro más la serialización de la respuesta;
+        # el usuario no tiene lista "seguir viendo" que mantener
+        with self.assertNumQueries(4):
+            self.send_heartbeat(self.contents[0], 30)
+
+
+class RecommendationCacheTests(StreamingTestCase):
+    def recommended_ids(self):
+        response = self.client.get('/api/streaming/recommendations/')
+        return [item['id'] for item in response.data['results']]
+
+    def test_cached_list_is_served_without_recomputing(self):
+        self.recommended_ids()
+        with self.assertNumQueries(2):  # in_bulk + géneros
+            self.recommended_ids()
+
+    def test_watching_a_title_refreshes_the_list(self):
+        self.assertIn(self.contents[0].id, self.recommended_ids())
+
+        self.send_heartbeat(self.contents[0], 95)
+
+        self.assertNotIn(self.contents[0].id, self.recommended_ids())
+
+    def test_preference_change_refreshes_the_list(self):
+        self.recommended_ids()
+        self.client.post('/api/streaming/preferences/like_genre/', {'genre_id': self.genre.id})
+
+        self.assertIsNone(cache.get(f'recommendations:user:{self.user.id}'))
+
+
+class TrendingTests(StreamingTestCase):
+    def test_view_is_counted_once_when_crossing_first_threshold(self):
+        self.send_heartbeat(self.contents[1], 25)
+        self.send_heartbeat(self.contents[1], 60)
+        self.send_heartbeat(self.contents[0], 5)
+
+        self.assertEqual(TrendingBucket.objects.get().views, 1)
+        response = self.client.get('/api/streaming/trending/')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.contents[1].id])
+
+    def test_returning_viewers_count_once_per_day(self):
+        self.send_heartbeat(self.contents[1], 95)
+        self.send_heartbeat(self.contents[1], 96)
+        # Al día siguiente vuelve a verlo desde el principio
+        WatchHistory.objects.update(trending_day=date.today() - timedelta(days=1))
+        self.send_heartbeat(self.contents[1], 5)
+        self.send_heartbeat(self.contents[1], 30)
+        self.send_heartbeat(self.contents[1], 40)
+
+        self.assertEqual(sum(TrendingBucket.objects.values_list('views', flat=True)), 2)
+        # Las preferencias solo suman los umbrales nuevos
+        self.assertEqual(UserPreference.objects.get(user=self.user).score, 2.0)
+
+    def test_ranking_only_uses_buckets_inside_window(self):
+        now = datetime.now()
+        add_views({
+            (self.contents[0].id, now - timedelta(days=8)): 10,
+            (self.contents[1].id, now - timedelta(hours=2)): 2,
+            (self.contents[2].id, now - timedelta(hours=1)): 3,
+        })
+
+        self.assertEqual(trending_content_ids(now), [self.contents[2].id, self.contents[1].id])
+
+    def test_compaction_preserves_window_totals(self):
+        now = datetime(2026, 10, 18, 12)
+        add_views({
+            (self.contents[0].id, datetime(2026, 10, 10, 5)): 4,
+            (self.contents[1].id, datetime(2026, 10, 15, 3)): 2,
+            (self.contents[1].id, datetime(2026, 10, 15, 9)): 3,
+            (self.contents[1].id, datetime(2026, 10, 18, 11)): 1,
+        })
+
+        self.assertEqual(compact_buckets(now), (1, 2))
+        self.assertEqual(TrendingBucket.objects.count(), 2)
+        self.assertEqual(
+            TrendingBucket.objects.get(bucket_start=datetime(2026, 10, 15)).views, 5
+        )
+
+    def test_compacted_days_stay_in_window_until_they_end(self):
+        now = datetime(2026, 10, 18, 12)
+        # Dentro de la ventana (desde el 11 a las 12:00), pero su bucket diario
+        # empieza el 11 a las 00:00
+        add_views({(self.contents[0].id, datetime(2026, 10, 11, 15)): 3})
+        compact_buckets(now)
+
+        self.assertEqual(trending_content_ids(now), [self.contents[0].id])
+        self.assertEqual(trending_content_ids(datetime(2026, 10, 19, 1)), [])
+
+    def test_large_batches(self):
+        now = bucket_start(datetime.now())
+        add_views({
+            (self.contents[0].id, now - timedelta(hours=hours)): 1 for hours in range(1200)
+        })
+        self.assertEqual(sum(TrendingBucket.objects.values_list('views', flat=True)), 1200)
+        compact_buckets(now)
+        self.assertEqual(trending_content_ids(now), [self.contents[0].id])
+
+
+class ContinueWatchingTests(StreamingTestCase):
+    def listing(self):
+        response = self.client.get('/api/streaming/history/continue_watching/')
+        self.assertEqual(response.status_code, 200)
+        return [(item['content'], item['watched_time']) for item in response.data]
+
+    def rebuilt(self):
+        ContinueWatching.objects.all().delete()
+        return self.listing()
+
+    def test_row_is_maintained_on_write(self):
+        self.send_heartbeat(self.contents[0], 10)
+        self.assertEqual(self.listing(), [(self.contents[0].id, 10)])
+
+        self.send_heartbeat(self.contents[1], 20)
+        self.send_heartbeat(self.contents[0], 30)
+        with self.assertNumQueries(1):
+            listing = self.listing()
+        self.assertEqual(listing, [(self.contents[0].id, 30), (self.contents[1].id, 20)])
+        self.assertEqual(listing, self.rebuilt())
+
+    def test_completed_and_deleted_titles_are_removed(self):
+        self.send_heartbeat(self.contents[0], 10)
+        self.send_heartbeat(self.contents[1], 20)
+        self.listing()
+
+        self.send_heartbeat(self.contents[0], 95)
+        self.assertEqual(self.listing(), [(self.contents[1].id, 20)])
+
+        history = WatchHistory.objects.get(content=self.contents[1])
+        self.client.delete(f'/api/streaming/history/{history.id}/')
+        self.assertEqual(self.listing(), [])
+
+    def test_truncated_row_is_rebuilt_after_removal(self):
+        with mock.patch.object(continue_watching, 'LIMIT', 2):
+            for watched_time, content in enumerate(self.contents, start=10):
+                self.send_heartbeat(content, watched_time)
+            self.assertEqual(len(self.listing()), 2)
+            self.assertTrue(ContinueWatching.objects.get().truncated)
+
+            # Al completar uno, vuelve a entrar el más antiguo, que no estaba en la fila
+            self.send_heartbeat(self.contents[2], 95)
+            self.assertFalse(ContinueWatching.objects.exists())
+            self.assertEqual(
+                self.listing(), [(self.contents[1].id, 11), (self.contents[0].id, 10)]
+            )
+
+    def test_catalogue_changes_invalidate_rows(self):
+        self.send_heartbeat(self.contents[0], 10)
+        self.listing()
+        other_user = User.objects.create_user(username='luis', password='secreto123', plan=self.plan)
+        ContinueWatching.objects.create(user=other_user, content_ids=f',{self.contents[1].id},')
+
+        self.contents[0].title = 'Nuevo título'
+        self.contents[0].save()
+
+        self.assertEqual(list(ContinueWatching.objects.values_list('user', flat=True)), [other_user.id])
+        response = self.client.get('/api/streaming/history/continue_watching/')
+        self.assertEqual(response.data[0]['content_details']['title'], 'Nuevo título')
+
+        # Una importación puede cambiar miles de títulos a la vez
+        continue_watching.invalidate_contents([*range(10000, 11200), self.contents[1].id])
+        self.assertEqual(list(ContinueWatching.objects.values_list('user', flat=True)), [self.user.id])
+
+        self.genre.name = 'Drama psicológico'
+        self.genre.save()
+        self.assertFalse(ContinueWatching.objects.exists())
+
+
+class WatchHistoryCreateTests(StreamingTestCase):
+    def test_duplicate_title_is_rejected(self):
+        data = {'content': self.contents[0].id, 'watched_time': 10}
+        self.assertEqual(self.client.post('/api/streaming/history/', data).status_code, 201)
+
+        response = self.client.post('/api/streaming/history/', data)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(WatchHistory.objects.count(), 1)
+
+    def test_update_cannot_collide_with_another_title(self):
+        first = self.client.post('/api/streaming/history/', {'content': self.contents[0].id}).data
+        second = self.client.post('/api/streaming/history/', {'content': self.contents[1].id}).data
+
+        self.assertEqual(self.client.patch(
+            f"/api/streaming/history/{second['id']}/", {'content': self.contents[0].id}
+        ).status_code, 400)
+        self.assertEqual(self.client.patch(
+            f"/api/streaming/history/{first['id']}/", {'watched_time': 50}
+        ).status_code, 200)
+
+
+class SeriesProgressTests(StreamingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.series = Content.objects.create(
+            title='Serie', description='...', release_year=2020, content_type='series',
+            thumbnail='http://example.com/t.jpg', video_file='http://example.com/v.mp4',
+            min_subscription_plan=cls.plan
+        )
+        cls.series.genres.add(cls.genre)
+        cls.episodes = [
+            Episode.objects.create(
+                series=cls.series, title=f'T{season}E{number}', season_number=season,
+                episode_number=number, video_file='http://example.com/e.mp4', duration=45
+            )
+            for season, number in [(1, 1), (1, 2), (2, 1)]
+        ]
+
+    def watch_episode(self, episode, watched_time):
+        return self.client.post('/api/streaming/history/update_progress/', {
+            'episode': episode.id, 'watched_time': watched_time, 'total_duration': 100
+        })
+
+    def next_episode(self):
+        response = self.client.get('/api/streaming/history/next_episode/', {'series': self.series.id})
+        self.assertEqual(response.status_code, 200)
+        episode = response.data['episode']
+        return episode and episode['id'], response.data['resume_at']
+
+    def test_episode_changes_invalidate_continue_watching(self):
+        self.watch_episode(self.episodes[0], 10)
+        self.client.get('/api/streaming/history/continue_watching/')
+
+        self.episodes[1].title = 'Otro episodio'
+        self.episodes[1].save()
+        self.assertTrue(ContinueWatching.objects.exists())
+
+        self.episodes[0].title = 'Piloto'
+        self.episodes[0].save()
+        self.assertFalse(ContinueWatching.objects.exists())
+        response = self.client.get('/api/streaming/history/continue_watching/')
+        self.assertEqual(response.data[0]['episode_details']['title'], 'Piloto')
+
+    def test_next_episode_follows_progress(self):
+        self.assertEqual(self.next_episode(), (self.episodes[0].id, 0))
+
+        self.watch_episode(self.episodes[0], 30)
+        self.assertEqual(self.next_episode(), (self.episodes[0].id, 30))
+
+        self.watch_episode(self.episodes[0], 95)
+        self.assertEqual(self.next_episode(), (self.episodes[1].id, 0))
+
+        # Saltar lo ya completado al volver a ver un episodio anterior
+        self.watch_episode(self.episodes[1], 95)
+        self.watch_episode(self.episodes[0], 95)
+        with self.assertNumQueries(3):  # serie del plan, progreso y episodios
+            self.assertEqual(self.next_episode(), (self.episodes[2].id, 0))
+
+        self.watch_episode(self.episodes[2], 95)
+        self.assertEqual(self.next_episode(), (None, 0))
+        self.assertEqual(SeriesProgress.objects.get().completed_count, 3)
+
+    def test_large_flushes(self):
+        users = User.objects.bulk_create([User(username=f'usuario-{index}') for index in range(1200)])
+        series.record_series_progress([
+            WatchHistory(
+                user=user, episode=self.episodes[0], watched_time=30, watched_percentage=30,
+                watched_date=datetime.now(),
+            )
+            for user in users
+        ])
+        self.assertEqual(SeriesProgress.objects.count(), 1200)
+
+    def test_next_episode_requires_an_entitled_series(self):
+        basic = SubscriptionPlan.objects.create(name='básico', price=5, max_screens=1, video_quality='SD')
+        basic_user = User.objects.create_user(username='luis', password='secreto123', plan=basic)
+        self.client.force_authenticate(basic_user)
+        url = '/api/streaming/history/next_episode/'
+
+        self.assertEqual(self.client.get(url, {'series': self.series.id}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'series': 999999}).status_code, 404)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url, {'series': self.contents[0].id}).status_code, 404)
+
+    def test_episodes_outside_bitmap_are_not_counted(self):
+        episode = Episode.objects.create(
+            series=self.series, title='Especial', season_number=1, episode_number=200,
+            video_file='http://example.com/e.mp4', duration=45
+        )
+        self.watch_episode(episode, 95)
+        self.watch_episode(episode, 97)
+
+        self.assertEqual(SeriesProgress.objects.get().completed_count, 0)
+
+    def test_next_episode_pages_past_completed_episodes(self):
+        self.watch_episode(self.episodes[0], 95)
+        self.watch_episode(self.episodes[1], 95)
+        self.watch_episode(self.episodes[0], 95)
+        # Con páginas de un episodio, el siguiente pendiente está en la tercera
+        with mock.patch('streaming.series.NEXT_EPISODE_SCAN', 1):
+            self.assertEqual(self.next_episode(), (self.episodes[2].id, 0))
+            self.watch_episode(self.episodes[2], 95)
+            self.watch_episode(self.episodes[0], 95)
+            self.assertEqual(self.next_episode(), (None, 0))
+
+    @override_settings(PROGRESS_BUFFER_ENABLED=True)
+    def test_buffer_flush_updates_progress(self):
+        self.watch_episode(self.episodes[0], 40)
+        self.assertFalse(SeriesProgress.objects.exists())
+
+        progress_buffer.flush()
+        self.assertEqual(self.next_episode(), (self.episodes[0].id, 40))
+
+    def test_next_episode_requires_series(self):
+        response = self.client.get('/api/streaming/history/next_episode/')
+        self.assertEqual(response.status_code, 400)
+
+    def recommended_ids(self):
+        response = self.client.get('/api/streaming/recommendations/')
+        return [item['id'] for item in response.data['results']]
+
+    def test_series_counts_once_for_trending_and_preferences(self):
+        self.assertIn(self.series.id, self.recommended_ids())
+        self.watch_episode(self.episodes[0], 30)
+        self.watch_episode(self.episodes[1], 30)
+
+        self.assertEqual(UserPreference.objects.get(user=self.user, genre=self.genre).score, 0.5)
+        self.assertEqual(trending_content_ids(), [self.series.id])
+        self.assertEqual(TrendingBucket.objects.get().views, 1)
+
+        self.watch_episode(self.episodes[1], 95)
+        self.assertEqual(UserPreference.objects.get(user=self.user, genre=self.genre).score, 2.0)
+
+        # Una serie empezada ya no se recomienda
+        self.assertNotIn(self.series.id, self.recommended_ids())
+
+
+@override_settings(PROGRESS_BUFFER_ENABLED=True)
+class ProgressBufferTests(StreamingTestCase):
+    def tearDown(self):
+        progress_buffer.flush()
+
+    def test_heartbeats_are_coalesced_until_flush(self):
+        self.send_heartbeat(self.contents[0], 10)
+        response = self.send_heartbeat(self.contents[0], 30)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(WatchHistory.objects.exists())
+
+        progress_buffer.flush()
+
+        history = WatchHistory.objects.get()
+        self.assertEqual(history.watched_time, 30)
+        self.assertEqual(history.watched_percentage, 30)
+
+    def test_flush_upserts_existing_rows(self):
+        self.send_heartbeat(self.contents[0], 10)
+        progress_buffer.flush()
+        self.send_heartbeat(self.contents[0], 60)
+        progress_buffer.flush()
+
+        self.assertEqual(WatchHistory.objects.count(), 1)
+        self.assertEqual(WatchHistory.objects.get().watched_time, 60)
+
+    def test_reads_see_unflushed_position(self):
+        self.send_heartbeat(self.contents[0], 10)
+        progress_buffer.flush()
+        self.send_heartbeat(self.contents[0], 40)
+        self.send_heartbeat(self.contents[1], 20)
+
+        response = self.client.get('/api/streaming/history/continue_watching/')
+        positions = {item['content']: item['watched_time'] for item in response.data}
+        self.assertEqual(positions, {self.contents[0].id: 40, self.contents[1].id: 20})
+
+        response = self.client.get('/api/streaming/history/recent/')
+        self.assertEqual(response.data[0]['content'], self.contents[1].id)
+
+    def test_flush_maintains_continue_watching(self):
+        self.send_heartbeat(self.contents[0], 10)
+        progress_buffer.flush()
+        self.client.get('/api/streaming/history/continue_watching/')
+        self.send_heartbeat(self.contents[1], 20)
+        self.send_heartbeat(self.contents[0], 95)
+        progress_buffer.flush()
+
+        items = ContinueWatching.objects.get().items
+        self.assertEqual([(item['content'], item['watched_time']) for item in items], [(self.contents[1].id, 20)])
+
+    def test_unflushed_titles_do_not_exceed_limit(self):
+        with mock.patch.object(continue_watching, 'LIMIT', 2):
+            self.send_heartbeat(self.contents[0], 10)
+            progress_buffer.flush()
+            self.client.get('/api/streaming/history/continue_watching/')
+            self.send_heartbeat(self.contents[1], 20)
+            self.send_heartbeat(self.contents[2], 30)
+
+            response = self.client.get('/api/streaming/history/continue_watching/')
+
+        self.assertEqual(
+            [item['content'] for item in response.data], [self.contents[2].id, self.contents[1].id]
+        )
+
+    def test_flush_applies_preference_crossings_once(self):
+        self.send_heartbeat(self.contents[0], 30)
+        progress_buffer.flush()
+        self.send_heartbeat(self.contents[0], 35)
+        progress_buffer.flush()
+
+        preference = UserPreference.objects.get(user=self.user, genre=self.genre)
+        self.assertEqual(preference.score, 0.5)
+
+
+class AsyncViewsTests(StreamingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.token = Token.objects.create(user=self.user)
+
+    async def async_get(self, view, path):
+        request = self.factory.get(path, headers={'Authorization': f'Token {self.token.key}'})
+        return await view(request)
+
+    def assertSameResponse(self, async_response, sync_path):
+        self.assertEqual(async_response.status_code, 200)
+        sync_response = self.client.get(sync_path)
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+
+    async def test_update_progress_requires_token(self):
+        request = self.factory.post('/api/streaming/history/update_progress/', {})
+        response = await async_views.update_progress(request)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_update_progress_records_history(self):
+        request = self.factory.post(
+            '/api/streaming/history/update_progress/',
+            {'content': self.contents[0].id, 'watched_time': 30, 'total_duration': 100},
+            content_type='application/json',
+            headers={'Authorization': f'Token {self.token.key}'}
+        )
+        response = await async_views.update_progress(request)
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['watched_percentage'], 30)
+        self.assertEqual(data['content_details']['genres'][0]['name'], 'Drama')
+        # Las señales (preferencias, trending) se ejecutan igual que en la vista síncrona
+        preference = await UserPreference.objects.aget(user=self.user, genre=self.genre)
+        self.assertEqual(preference.score, 0.5)
+
+    async def test_update_progress_validates_input(self):
+        request = self.factory.post(
+            '/api/streaming/history/update_progress/', {'watched_time': 30},
+            content_type='application/json', headers={'Authorization': f'Token {self.token.key}'}
+        )
+        response = await async_views.update_progress(request)
+        self.assertEqual(response.status_code, 400)
+
+    def test_listings_match_sync_views(self):
+        self.send_heartbeat(self.contents[0], 30)
+        self.send_heartbeat(self.contents[1], 95)
+
+        for view, path in [
+            (async_views.continue_watching, '/api/streaming/history/continue_watching/'),
+            (async_views.recent, '/api/streaming/history/recent/'),
+        ]:
+            response = async_to_sync(self.async_get)(view, path)
+            self.assertSameResponse(response, path)
+
+    def test_trending_matches_sync_view(self):
+        self.send_heartbeat(self.contents[1], 30)
+        response = async_to_sync(self.async_get)(async_views.trending, '/api/streaming/trending/')
+        cache.clear()
+        self.assertSameResponse(response, '/api/streaming/trending/')
+        self.assertEqual(json.loads(response.content)['results'][0]['id'], self.contents[1].id)
+
+
+@override_settings(PROGRESS_SOCKET_WRITE_INTERVAL=3600)
+class ProgressSocketTests(StreamingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        # Fuera de una petición, close_old_connections cerraría la conexión del test
+        patcher = mock.patch('streaming.sockets.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def connect(self, path='/ws/streaming/progress/', token=None):
+        from streamz_backend.asgi import application
+
+        token = self.token.key if token is None else token
+        socket = ApplicationCommunicator(application, {
+            'type': 'websocket', 'path': path, 'query_string': f'token={token}'.encode(),
+        })
+        await socket.send_input({'type': 'websocket.connect'})
+        return socket, await socket.receive_output()
+
+    async def send_position(self, socket, watched_time, event='progress', content=None):
+        await socket.send_input({'type': 'websocket.receive', 'text': json.dumps({
+            'content': (content or self.contents[0]).id, 'watched_time': watched_time,
+            'total_duration': 100, 'event': event,
+        })})
+
+    async def watched_time(self, content=None):
+        history = await WatchHistory.objects.aget(user=self.user, content=content or self.contents[0])
+        return history.watched_time
+
+    async def test_rejects_invalid_token_and_unknown_path(self):
+        _, output = await self.connect(token='invalido')
+        self.assertEqual(output['type'], 'websocket.close')
+        _, output = await self.connect(path='/ws/otro/')
+        self.assertEqual(output['type'], 'websocket.close')
+
+    async def test_positions_are_coalesced_until_pause_or_disconnect(self):
+        socket, output = await self.connect()
+        self.assertEqual(output['type'], 'websocket.accept')
+
+        # La primera posición se guarda; las siguientes solo se acumulan
+        await self.send_position(socket, 10)
+        saved = json.loads((await socket.receive_output())['text'])
+        self.assertEqual((saved['type'], saved['watched_percentage']), ('saved', 10))
+        for watched_time in (11, 12, 13):
+            await self.send_position(socket, watched_time)
+        self.assertTrue(await socket.receive_nothing())
+        self.assertEqual(await self.watched_time(), 10)
+
+        await self.send_position(socket, 25, event='pause')
+        await socket.receive_output()
+        self.assertEqual(await self.watched_time(), 25)
+        # El cruce del 20% actualiza las preferencias como update_progress
+        preference = await UserPreference.objects.aget(user=self.user, genre=self.genre)
+        self.assertEqual(preference.score, 0.5)
+
+        await self.send_position(socket, 30)
+        await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await socket.wait()
+        self.assertEqual(await self.watched_time(), 30)
+
+    async def test_changing_title_saves_previous_position(self):
+        socket, _ = await self.connect()
+        await self.send_position(socket, 10)
+        await socket.receive_output()
+        await self.send_position(socket, 40)
+        await self.send_position(socket, 5, content=self.contents[1])
+        await socket.receive_output()
+
+        self.assertEqual(await self.watched_time(), 40)
+        self.assertEqual(await self.watched_time(self.contents[1]), 5)
+
+    async def test_connection_holds_a_screen_until_disconnect(self):
+        basic = await SubscriptionPlan.objects.acreate(
+            name='básico', price=15, max_screens=1, video_quality='SD'
+        )
+        await User.objects.filter(pk=self.user.pk).aupdate(plan=basic)
+
+        first, _ = await self.connect()
+        await self.send_position(first, 10)
+        await first.receive_output()
+        second, _ = await self.connect()
+        await self.send_position(second, 20)
+        self.assertEqual(json.loads((await second.receive_output())['text'])['max_screens'], 1)
+
+        await first.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await first.wait()
+        await self.send_position(second, 20)
+        self.assertEqual(json.loads((await second.receive_output())['text'])['type'], 'saved')
+
+    async def test_invalid_messages_get_an_error(self):
+        socket, _ = await self.connect()
+        for message in ('no es json', json.dumps({'watched_time': 10}), json.dumps({'content': 1})):
+            await socket.send_input({'type': 'websocket.receive', 'text': message})
+            self.assertEqual(json.loads((await socket.receive_output())['text'])['type'], 'error')
+        self.assertFalse(await WatchHistory.objects.filter(user=self.user).aexists())
+
+
+    async def test_unsavable_positions_keep_the_connection_open(self):
+        socket, _ = await self.connect()
+        # json admite NaN, que no cabe en la base de datos
+        message = '{"content": %d, "watched_time": NaN}' % self.contents[0].id
+        await socket.send_input({'type': 'websocket.receive', 'text': message})
+        self.assertEqual(json.loads((await socket.receive_output())['text'])['type'], 'error')
+
+        with mock.patch('streaming.sockets.asave_progress', side_effect=IntegrityError):
+            await self.send_position(socket, 10, content=self.contents[1])
+            self.assertEqual(json.loads((await socket.receive_output())['text'])['type'], 'error')
+
+        await self.send_position(socket, 20)
+        self.assertEqual(json.loads((await socket.receive_output())['text'])['type'], 'saved')
+        await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await socket.wait()
+        self.assertFalse(await ScreenSession.objects.aexists())
+
+class ScreenLimitTests(StreamingTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        basic = SubscriptionPlan.objects.create(name='básico', price=15, max_screens=1, video_quality='SD')
+        cls.basic_user = User.objects.create_user(username='luis', password='secreto123', plan=basic)
+
+    def heartbeat(self, session=None, user=None, content=None):
+        self.client.force_authenticate(user or self.basic_user)
+        data = {'content': (content or self.contents[0]).id, 'watched_time': 30, 'total_duration': 100}
+        if session:
+            data['session'] = session
+        return self.client.post('/api/streaming/history/update_progress/', data)
+
+    def test_streams_beyond_max_screens_are_rejected(self):
+        self.assertEqual(self.heartbeat('tv').status_code, 200)
+        response = self.heartbeat('movil', content=self.contents[1])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['max_screens'], 1)
+        self.assertFalse(WatchHistory.objects.filter(content=self.contents[1]).exists())
+
+        # La misma sesión sigue reproduciendo; un cliente sin sesión ocupa otra pantalla
+        self.assertEqual(self.heartbeat('tv', content=self.contents[1]).status_code, 200)
+        self.assertEqual(self.heartbeat().status_code, 409)
+
+    def test_plan_screens_and_disabled_limit(self):
+        for session in ('a', 'b', 'c', 'd'):
+            self.assertEqual(self.heartbeat(session, user=self.user).status_code, 200)
+        self.assertEqual(self.heartbeat('e', user=self.user).status_code, 409)
+        with override_settings(SCREEN_LIMIT_ENABLED=False):
+            self.assertEqual(self.heartbeat('e', user=self.user).status_code, 200)
+
+    @override_settings(SCREEN_SESSION_TTL=60)
+    def test_sessions_expire_without_heartbeats(self):
+        now = time.time()
+        with mock.patch('streaming.screens.time.time', return_value=now):
+            self.heartbeat('tv')
+        with mock.patch('streaming.screens.time.time', return_value=now + 59):
+            self.assertEqual(self.heartbeat('movil').status_code, 409)
+        with mock.patch('streaming.screens.time.time', return_value=now + 61):
+            self.assertEqual(self.heartbeat('movil').status_code, 200)
+
+    @override_settings(SCREEN_SESSION_TTL=60)
+    def test_heartbeats_only_write_when_refreshing(self):
+        now = time.time()
+        self.assertEqual(screens.admit({'tv': now + 40}, 'tv', 1, now), (True, None))
+        self.assertEqual(screens.admit({'tv': now + 20}, 'tv', 1, now), (True, {'tv': now + 60}))
+        self.assertEqual(screens.admit({'tv': now + 40}, 'movil', 1, now), (False, None))
+        self.assertEqual(screens.admit({'tv': now - 1}, 'movil', 1, now), (True, {'movil': now + 60}))
+
+    def test_registry_is_shared_by_workers(self):
+        self.assertTrue(screens.touch(self.basic_user, 'tv'))
+        # Heartbeats de una sesión activa: sin consultas
+        with self.assertNumQueries(0):
+            self.assertTrue(screens.touch(self.basic_user, 'tv'))
+
+        # Otro worker con su propia caché en memoria ve la pantalla ocupada
+        cache.clear()
+        self.assertFalse(screens.touch(self.basic_user, 'movil'))
+        self.assertTrue(screens.touch(self.basic_user, 'tv'))
+
+        async_to_sync(screens.arelease)(self.basic_user.id, 'tv')
+        self.assertFalse(ScreenSession.objects.exists())
+        self.assertTrue(screens.touch(self.basic_user, 'movil'))
+
+    def test_async_view_enforces_limit(self):
+        token = Token.objects.create(user=self.basic_user)
+        factory = AsyncRequestFactory()
+
+        def post(session):
+            request = factory.post(
+                '/api/streaming/history/update_progress/',
+                {'content': self.contents[0].id, 'watched_time': 30, 'session': session},
+                content_type='application/json', headers={'Authorization': f'Token {token.key}'}
+            )
+            return async_to_sync(async_views.update_progress)(request)
+
+        self.assertEqual(post('tv').status_code, 200)
+        self.assertEqual(post('movil').status_code, 409)
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_dataset_is_consistent(self):
+        dataset = generate_dataset(users=5, titles=30, episodes=3, genres=4, events=60, seed=1)
+
+        self.assertEqual(len(dataset['tokens']), 5)
+        self.assertEqual(Content.objects.count(), 30)
+        self.assertEqual(
+            Episode.objects.count(), 3 * Content.objects.filter(content_type='series').count()
+        )
+        self.assertTrue(WatchHistory.objects.exists())
+        # Fechas repartidas por la última semana, no la del momento de generarlas
+        oldest = WatchHistory.objects.order_by('watched_date').first().watched_date
+        self.assertLess(oldest, datetime.now() - timedelta(hours=1))
+        # El historial que supera el 20% se refleja en preferencias y trending
+        counted = WatchHistory.objects.filter(preference_level__gt=0)
+        self.assertEqual(
+            sum(TrendingBucket.objects.values_list('views', flat=True)), counted.count()
+        )
+        self.assertEqual(
+            set(UserPreference.objects.values_list('user', flat=True)),
+            set(counted.values_list('user', flat=True))
+        )
+
+
+@skipUnless(collaborative.np is not None and collaborative.sparse is not None, "Requiere NumPy y SciPy")
+class ItemItemRecommenderTests(StreamingTestCase):
+    def setUp(self):
+        super().setUp()
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir)
+        settings_override = override_settings(RECOMMENDER_MODEL_DIR=model_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        others = [
+            User.objects.create_user(username=f'vecino{i}', password='secreto123') for i in range(2)
+        ]
+        # Quien ve el título 0 suele ver también el 1 y, menos, el 2
+        self.watch(others[0], [(0, 100), (1, 100)])
+        self.watch(others[1], [(0, 100), (1, 80), (2, 30)])
+        self.watch(self.user, [(0, 95)])
+
+    def watch(self, user, items):
+        for index, percentage in items:
+            WatchHistory.objects.create(
+                user=user, content=self.contents[index],
+                watched_time=percentage, watched_percentage=percentage
+            )
+
+    def recommend(self, algorithm='itemitem'):
+        return self.client.get('/api/streaming/recommendations/', {'algorithm': algorithm})
+
+    def test_falls_back_to_genres_without_model(self):
+        response = self.recommend()
+        self.assertEqual(response['X-Recommendations-Algorithm'], 'genres')
+
+    def test_ranks_similar_titles_and_skips_watched(self):
+        collaborative.train()
+        response = self.recommend()
+
+        self.assertEqual(response['X-Recommendations-Algorithm'], 'itemitem')
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.contents[1].id, self.contents[2].id]
+        )
+
+    def test_new_training_is_picked_up(self):
+        first = collaborative.train()['version']
+        self.assertEqual(collaborative.load_model().version, first)
+        second = collaborative.train()['version']
+        self.assertEqual(collaborative.load_model().version, second)
+
+    def test_unknown_algorithm(self):
+        self.assertEqual(self.recommend('magic').status_code, 400)
+
+
+class WatchHistoryExportTests(StreamingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user(username='admin', password='secreto123', is_staff=True)
+        self.client.force_authenticate(self.admin)
+        start = datetime(2026, 1, 1)
+        for i, content in enumerate(self.contents):
+            history = WatchHistory.objects.create(user=self.user, content=content, watched_percentage=10 * i)
+            WatchHistory.objects.filter(pk=history.pk).update(watched_date=start + timedelta(hours=i))
+
+    def download(self, **params):
+        response = self.client.get('/api/streaming/history-export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/streaming/history-export/').status_code, 403)
+
+    @override_settings(WATCH_HISTORY_EXPORT_LAG=0)
+    def test_jsonl_gzip_and_incremental_watermark(self):
+        response, body = self.download()
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([row['content_id'] for row in rows], [content.id for content in self.contents])
+        self.assertEqual(rows[0]['watched_date'], '2026-01-01T00:00:00')
+
+        # Un avance posterior a la marca de agua sale en la siguiente exportación
+        watermark = response['X-Export-Watermark']
+        self.send_heartbeat(self.contents[1], 80)
+        _, body = self.download(since=watermark)
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([(row['content_id'], row['watched_percentage']) for row in rows], [
+            (self.contents[1].id, 80.0)
+        ])
+
+    @override_settings(WATCH_HISTORY_EXPORT_LAG=60)
+    def test_watermark_lags_behind_recent_writes(self):
+        response, body = self.download(gzip='0')
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+        # Volcado tardío del buffer de heartbeats: la fila se guarda después de
+        # la exportación con la hora del heartbeat, anterior a ella
+        WatchHistory.objects.filter(content=self.contents[1]).update(
+            watched_percentage=80, watched_date=datetime.now() - timedelta(seconds=30)
+        )
+        later = datetime.now() + timedelta(seconds=60)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            _, body = self.download(gzip='0', since=response['X-Export-Watermark'])
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(row['content_id'], row['watched_percentage']) for row in rows], [
+            (self.contents[1].id, 80.0)
+        ])
+
+    def test_csv(self):
+        response, body = self.download(file_format='csv', gzip='0', since='2026-01-01T00:30:00')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0].split(','), export.COLUMNS)
+        self.assertEqual(len(lines), 3)
+
+    @skipUnless(export.pa, "pyarrow no está instalado")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        # Bloques de una fila: varios row groups en un mismo fichero
+        with override_settings(WATCH_HISTORY_EXPORT_CHUNK_SIZE=1):
+            _, body = self.download(file_format='parquet')
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.column('content_id').to_pylist(), [content.id for content in self.contents])
+        self.assertEqual(pq.ParquetFile(io.BytesIO(body)).num_row_groups, 3)
+
+    def test_invalid_parameters(self):
+        url = '/api/streaming/history-export/'
+        self.assertEqual(self.client.get(url, {'file_format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'since': 'ayer'}).status_code, 400)
+
+    def test_command_updates_watermark_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = os.path.join(directory, 'history.jsonl')
+        watermark_file = os.path.join(directory, 'watermark')
+        options = {'output': output, 'no_gzip': True, 'watermark_file': watermark_file, 'stderr': io.StringIO()}
+
+        call_command('export_watch_history', **options)
+        with open(output) as output_file:
+            self.assertEqual(len(output_file.readlines()), 3)
+
+        call_command('export_watch_history', **options)
+        with open(output) as output_file:
+            self.assertEqual(output_file.read(), '')
+
+    def test_async_iteration_in_thread(self):
+        async def collect():
+            blocks = (block for block in [b'a', b'b', b'c'])
+            return [block async for block in export.aiter_in_thread(blocks, queue_size=1)]
+        self.assertEqual(async_to_sync(collect)(), [b'a', b'b', b'c'])
+
+
+@mock.patch('streamz_backend.routers.replica_aliases', return_value=['replica0'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User(pk=1, username='ana')
+
+    def route(self, method, model, view=None, write=False):
+        """
+        Pasa una petición por el middleware y devuelve a qué base de datos
+        habría enviado el router una lectura de `model`.
+        """
+        router = ReplicaRouter()
+        routed = []
+
+        def get_response(request):
+            # Como la cadena de middlewares: process_view antes de la vista
+            middleware.process_view(request, view or (lambda request: None), (), {})
+            if write:
+                router.db_for_write(WatchHistory)
+            routed.append(router.db_for_read(model))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(self.factory, method)('/')
+        request.user = self.user
+        middleware(request)
+        return routed[0]
+
+    def test_catalogue_reads_go_to_replica(self, _):
+        self.assertEqual(self.route('get', Content), 'replica0')
+        # El resto de apps solo en las vistas marcadas
+        self.assertEqual(self.route('get', WatchHistory), 'default')
+        self.assertEqual(self.route('get', WatchHistory, view=WatchHistoryViewSet.as_view({'get': 'list'})), 'replica0')
+        self.assertEqual(self.route('get', WatchHistory, view=async_views.continue_watching), 'replica0')
+        # Los tokens y usuarios, siempre de default
+        self.assertEqual(self.route('get', Token, view=async_views.continue_watching), 'default')
+
+    def test_writes_and_unsafe_methods_use_primary(self, _):
+        self.assertEqual(self.route('post', Content), 'default')
+        self.assertEqual(self.route('get', Content, write=True), 'default')
+
+    def test_reads_pinned_after_write(self, _):
+        self.route('post', WatchHistory, write=True)
+        self.assertEqual(self.route('get', WatchHistory, view=async_views.continue_watching), 'default')
+        self.assertEqual(self.route('get', Content), 'default')
+
+        # Otros usuarios siguen leyendo de la réplica
+        self.user = User(pk=2, username='luis')
+        self.assertEqual(self.route('get', Content), 'replica0')
+
+    def test_outside_requests_use_primary(self, _):
+        self.assertEqual(ReplicaRouter().db_for_read(Content), 'default')
+
+    def test_catalogue_reads_pinned_after_bump(self, _):
+        bump_catalogue_version()
+        self.assertEqual(self.route('get', Content), 'default')
+        self.user = User(pk=2, username='luis')
+        self.assertEqual(self.route('get', Content), 'default')
+        # Las demás lecturas de las vistas de solo lectura siguen en la réplica
+        self.assertEqual(self.route('get', WatchHistory, view=async_views.continue_watching), 'replica0')
+
+        cache.delete(CATALOGUE_PIN_KEY)
+        self.assertEqual(self.route('get', Content), 'replica0')
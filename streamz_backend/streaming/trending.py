@@ -0,0 +1,124 @@
+# streaming/trending.py
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDay
+
+from .models import TrendingBucket
+
+TRENDING_WINDOW = timedelta(days=7)
+TRENDING_LIMIT = 20
+# Los buckets horarios más antiguos que esto se agrupan en buckets diarios
+HOURLY_RETENTION = timedelta(days=1)
+# Buckets por consulta al sumar vistas: SQLite no admite expresiones de más de
+# 1000 niveles y compactar agrupa un bucket por título y día
+UPSERT_BATCH_SIZE = 200
+
+
+def bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now):
+    """
+    Inicio de la ventana de trending. Empieza a medianoche para que los buckets
+    diarios de compact_buckets (con bucket_start a las 00:00) cuenten hasta que
+    todo su día ha salido de la ventana, como los horarios que agrupan.
+    """
+    return (now - TRENDING_WINDOW).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_views(content_ids, moment=None):
+    """
+    Suma una vista por cada content_id al bucket horario actual.
+    """
+    start = bucket_start(moment or datetime.now())
+    add_views(Counter((content_id, start) for content_id in content_ids))
+
+
+def add_views(counts):
+    """
+    Suma en bloque vistas a los buckets {(content_id, bucket_start): vistas},
+    creando los que falten.
+    """
+    counts = [(key, value) for key, value in counts.items() if value]
+    for start in range(0, len(counts), UPSERT_BATCH_SIZE):
+        add_views_batch(dict(counts[start:start + UPSERT_BATCH_SIZE]))
+
+
+def add_views_batch(counts):
+    TrendingBucket.objects.bulk_create(
+        [
+            TrendingBucket(content_id=content_id, bucket_start=start, views=0)
+            for content_id, start in counts
+        ],
+        ignore_conflicts=True
+    )
+
+    buckets = reduce(or_, (
+        Q(content_id=content_id, bucket_start=start) for content_id, start in counts
+    ))
+    increment = Case(
+        *[
+            When(content_id=content_id, bucket_start=start, then=Value(value))
+            for (content_id, start), value in counts.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    TrendingBucket.objects.filter(buckets).update(views=F('views') + increment)
+
+
+def trending_content_ids(now=None, limit=TRENDING_LIMIT):
+    """
+    Devuelve los ids del contenido con más vistas dentro de la ventana, sumando
+    solo los buckets de la ventana en lugar de recorrer WatchHistory.
+    """
+    return list(trending_queryset(now, limit))
+
+
+async def atrending_content_ids(now=None, limit=TRENDING_LIMIT):
+    """
+    Versión asíncrona de trending_content_ids().
+    """
+    return [content_id async for content_id in trending_queryset(now, limit)]
+
+
+def trending_queryset(now, limit):
+    return TrendingBucket.objects.filter(
+        bucket_start__gte=window_start(now or datetime.now())
+    ).values('content').annotate(
+        view_count=Sum('views')
+    ).order_by('-view_count').values_list('content', flat=True)[:limit]
+
+
+def compact_buckets(now=None):
+    """
+    Elimina los buckets que ya salieron de la ventana y agrupa en un bucket
+    diario los buckets horarios de más de HOURLY_RETENTION.
+    """
+    now = now or datetime.now()
+
+    with transaction.atomic():
+        expired, _ = TrendingBucket.objects.filter(
+            bucket_start__lt=window_start(now)
+        ).delete()
+
+        hourly = TrendingBucket.objects.filter(
+            bucket_start__lt=bucket_start(now - HOURLY_RETENTION)
+        ).exclude(bucket_start=TruncDay('bucket_start'))
+
+        daily_counts = {
+            (row['content'], row['day']): row['total']
+            for row in hourly.annotate(day=TruncDay('bucket_start')).values(
+                'content', 'day'
+            ).annotate(total=Sum('views'))
+        }
+        compacted, _ = hourly.delete()
+        add_views(daily_counts)
+
+    return expired, compacted
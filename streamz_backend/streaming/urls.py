@@ -1,12 +1,15 @@
 # streaming/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     WatchHistoryViewSet, 
     UserPreferenceViewSet, 
     RecommendationsView,
-    TrendingContentView
+    TrendingContentView,
+    WatchHistoryExportView,
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'history', WatchHistoryViewSet, basename='history')
@@ -16,4 +19,14 @@ urlpatterns = [
     path('', include(router.urls)),
     path('recommendations/', RecommendationsView.as_view(), name='recommendations'),
     path('trending/', TrendingContentView.as_view(), name='trending'),
-]
\ No newline at end of file
+    path('history-export/', WatchHistoryExportView.as_view(), name='history-export'),
+]
+
+if settings.ASYNC_STREAMING_VIEWS:
+    # Bajo ASGI, los endpoints más llamados se sirven con vistas asíncronas
+    urlpatterns = [
+        path('history/update_progress/', async_views.update_progress),
+        path('history/continue_watching/', async_views.continue_watching),
+        path('history/recent/', async_views.recent),
+        path('trending/', async_views.trending, name='trending'),
+    ] + urlpatterns
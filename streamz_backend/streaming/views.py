@@ -1,21 +1,36 @@
 # streaming/views.py
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from .models import WatchHistory
 from .serializers import WatchHistorySerializer, UserPreferenceSerializer
+from .buffer import progress_buffer, merge_pending, is_enabled as buffer_enabled
+from . import continue_watching, screens
+from .series import next_episode as find_next_episode
+from .recommendations import ALGORITHMS, select_recommendations
+from .trending import trending_content_ids
+from .pagination import WatchHistoryKeysetPagination
 from rest_framework import generics
-from django.db.models import Count, F, Q, Value, FloatField
-from django.db.models.functions import Coalesce
-from content.models import Content, Genre
-from content.serializers import ContentSerializer
+from content.entitlements import entitled_contents
+from content.models import Content
+from content.serializers import ContentSerializer, EpisodeSerializer
+from content.mixins import CompactListMixin, EagerLoadingMixin
+from content.compact import ContentCompactSerializer
 from .models import UserPreference
-from datetime import datetime, timedelta
-from django.db.models import Case, When
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_page
+from django.http import StreamingHttpResponse
+from rest_framework.views import APIView
+from .export import ExportError, WatchHistoryExport, aiter_in_thread, parse_watermark
 
-class WatchHistoryViewSet(viewsets.ModelViewSet):
+class WatchHistoryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = WatchHistorySerializer
+    # Las lecturas van a una réplica (streamz_backend/routers.py)
+    read_replica = True
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = WatchHistoryKeysetPagination
     
     def get_queryset(self):
         # Devuelve solo el historial del usuario actual
@@ -31,22 +46,35 @@ class WatchHistoryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def continue_watching(self, request):
-        # Obtener contenido que el usuario ha comenzado pero no terminado
-        continue_watching = self.get_queryset().filter(
-            watched_percentage__lt=90,  # No completado
-            watched_percentage__gt=0    # Comenzado
-        ).order_by('-watched_date')[:10]
-        
-        serializer = self.get_serializer(continue_watching, many=True)
-        return Response(serializer.data)
+        # Contenido comenzado pero no terminado, de la lista desnormalizada
+        # del usuario (streaming/continue_watching.py): una consulta por clave primaria
+        return Response(continue_watching.get_items(request.user))
         
     @action(detail=False, methods=['get'])
     def recent(self, request):
         # Obtener el historial reciente, independientemente del porcentaje visto
-        recent = self.get_queryset()[:20]
+        recent = merge_pending(self.get_queryset()[:20], request.user.id)[:20]
         serializer = self.get_serializer(recent, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def next_episode(self, request):
+        # Siguiente episodio de una serie, a partir del progreso agregado (streaming/series.py)
+        series_id = request.query_params.get('series')
+        if not series_id or not series_id.isdigit():
+            return Response({"error": "Se requiere series"}, status=400)
+        # Solo series del plan del usuario (en desarrollo, todas, como ContentViewSet)
+        series = Content.objects.all() if settings.DEBUG else entitled_contents(request.user)
+        if not series.filter(pk=int(series_id), content_type='series').exists():
+            return Response({"error": "Serie no encontrada"}, status=404)
+        
+        episode, resume_at = find_next_episode(request.user, int(series_id))
+        return Response({
+            'series': int(series_id),
+            'episode': EpisodeSerializer(episode).data if episode else None,
+            'resume_at': resume_at,
+        })
+    
     # Añade esto a streaming/views.py dentro de WatchHistoryViewSet
     @action(detail=False, methods=['post'])
     def update_progress(self, request):
@@ -66,11 +94,36 @@ class WatchHistoryViewSet(viewsets.ModelViewSet):
         if total_duration and float(total_duration) > 0:
             watched_percentage = (float(watched_time) / float(total_duration)) * 100
     
+        content_id = int(content_id) if content_id else None
+        episode_id = int(episode_id) if episode_id else None
+    
+        # Limitar las reproducciones simultáneas a las pantallas del plan
+        if not screens.touch(request.user, request.data.get('session')):
+            return Response(screens.limit_error(request.user), status=409)
+    
+        # En modo buffer, el progreso se acumula en memoria y se vuelca por lotes
+        if buffer_enabled():
+            history = progress_buffer.add(
+                request.user.id,
+                content_id,
+                episode_id,
+                watched_time,
+                watched_percentage
+            )
+            return Response({
+                'content': history.content_id,
+                'episode': history.episode_id,
+                'watched_time': history.watched_time,
+                'watched_percentage': history.watched_percentage,
+                'watched_date': history.watched_date,
+            }, status=202)
+    
         # Buscar un registro existente o crear uno nuevo
-        history, created = WatchHistory.objects.get_or_create(
+        # La lectura indica además si el usuario tiene lista "seguir viendo" que mantener
+        history, created = continue_watching.with_row_flag(WatchHistory.objects).get_or_create(
             user=request.user,
-            content_id=content_id if content_id else None,
-            episode_id=episode_id if episode_id else None,
+            content_id=content_id,
+            episode_id=episode_id,
             defaults={
                 'watched_time': watched_time,
                 'watched_percentage': watched_percentage
@@ -81,84 +134,36 @@ class WatchHistoryViewSet(viewsets.ModelViewSet):
         if not created:
             history.watched_time = watched_time
             history.watched_percentage = watched_percentage
-            history.save()
+            history.save(update_fields=['watched_time', 'watched_percentage', 'watched_date'])
     
         serializer = self.get_serializer(history)
         return Response(serializer.data)
 
 
-class RecommendationsView(generics.ListAPIView):
+class RecommendationsView(CompactListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ContentSerializer
+    compact_serializer_class = ContentCompactSerializer
+    read_replica = True
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        
-        # 1. Obtener todos los contenidos que el usuario ha visto
-        watched_content_ids = WatchHistory.objects.filter(
-            user=user
-        ).values_list('content', flat=True).distinct()
-        
-        # 2. Obtener los géneros preferidos del usuario basado en su historial
-        genre_preferences = {}
-        
-        # 2.1 Géneros de contenido completamente visto (alta preferencia)
-        completed_content_genres = WatchHistory.objects.filter(
-            user=user, 
-            watched_percentage__gte=90
-        ).values_list('content__genres', flat=True)
-        
-        for genre_id in completed_content_genres:
-            if genre_id:
-                genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + 3
-        
-        # 2.2 Géneros de contenido parcialmente visto
-        partial_content_genres = WatchHistory.objects.filter(
-            user=user, 
-            watched_percentage__lt=90,
-            watched_percentage__gt=20
-        ).values_list('content__genres', flat=True)
+        algorithm = self.request.query_params.get('algorithm')
+        if algorithm and algorithm not in ALGORITHMS:
+            raise ValidationError({'algorithm': f"Debe ser uno de: {', '.join(ALGORITHMS)}"})
         
-        for genre_id in partial_content_genres:
-            if genre_id:
-                genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + 1
-        
-        # 2.3 También usar preferencias guardadas si existen
-        saved_preferences = UserPreference.objects.filter(
-            user=user
-        ).values_list('genre_id', 'score')
-        
-        for genre_id, score in saved_preferences:
-            genre_preferences[genre_id] = genre_preferences.get(genre_id, 0) + score
-        
-        # 3. Ordenar los géneros por preferencia
-        sorted_genres = sorted(
-            genre_preferences.items(), 
-            key=lambda x: x[1], 
-            reverse=True
+        # Lista de ids y puntuaciones (en caché o del modelo item-item)
+        self.algorithm, recommendations = select_recommendations(self.request.user, algorithm)
+        return self.in_bulk_ordered(
+            Content.objects, [content_id for content_id, _ in recommendations]
         )
-        
-        top_genre_ids = [genre_id for genre_id, _ in sorted_genres[:5]]
-        
-        # 4. Recomendar contenido basado en géneros preferidos que no haya visto
-        if top_genre_ids:
-            recommendations = Content.objects.filter(
-                genres__in=top_genre_ids
-            ).exclude(
-                id__in=watched_content_ids
-            ).annotate(
-                genre_match_count=Count('genres', filter=Q(genres__in=top_genre_ids))
-            ).order_by('-genre_match_count', '-release_year')[:20]
-            
-            return recommendations
-        
-        # Si no hay suficientes datos, recomendar contenido popular
-        return Content.objects.exclude(
-            id__in=watched_content_ids
-        ).order_by('-release_year')[:20]
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response['X-Recommendations-Algorithm'] = self.algorithm
+        return response
         
 
-class UserPreferenceViewSet(viewsets.ModelViewSet):
+class UserPreferenceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     serializer_class = UserPreferenceSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -204,20 +209,48 @@ class UserPreferenceViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'success', 'preference': UserPreferenceSerializer(preference).data})
     
-class TrendingContentView(generics.ListAPIView):
+@method_decorator(cache_page(settings.TRENDING_CACHE_TIMEOUT), name='dispatch')
+class TrendingContentView(CompactListMixin, EagerLoadingMixin, generics.ListAPIView):
     serializer_class = ContentSerializer
+    compact_serializer_class = ContentCompactSerializer
+    read_replica = True
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
-        # Contenido con más vistas en la última semana
-        one_week_ago = datetime.now() - timedelta(days=7)
-        
-        trending_ids = WatchHistory.objects.filter(
-            watched_date__gte=one_week_ago
-        ).values('content').annotate(
-            view_count=Count('content')
-        ).order_by('-view_count').values_list('content', flat=True)[:20]
+        # Contenido con más vistas en la última semana, según los buckets de vistas
+        trending_ids = trending_content_ids()
         
         # Preservar el orden de trending_ids
-        preserved = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(trending_ids)])
-        return Content.objects.filter(id__in=trending_ids).order_by(preserved)
\ No newline at end of file
+        return self.in_bulk_ordered(Content.objects, trending_ids)
+
+
+class WatchHistoryExportView(APIView):
+    """
+    Exporta todo el historial de visualización para analítica, en streaming.
+
+    Parámetros: file_format (jsonl, csv o parquet), gzip (1/0, solo jsonl y
+    csv) y since (marca de agua ISO 8601 de una exportación anterior). La marca
+    para la siguiente exportación se devuelve en la cabecera X-Export-Watermark.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            export = WatchHistoryExport(
+                format=params.get('file_format', 'jsonl'),
+                compress=params.get('gzip', '1') not in ('0', 'false'),
+                since=parse_watermark(params['since']) if params.get('since') else None,
+                chunk_size=settings.WATCH_HISTORY_EXPORT_CHUNK_SIZE,
+            )
+        except ExportError as exc:
+            raise ValidationError({'detail': str(exc)})
+
+        blocks = export.blocks()
+        if settings.ASYNC_STREAMING_VIEWS:
+            # Bajo ASGI Django cargaría entero un iterador síncrono antes de enviarlo
+            blocks = aiter_in_thread(blocks)
+        response = StreamingHttpResponse(blocks, content_type=export.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        response['X-Export-Watermark'] = export.until.isoformat()
+        return response
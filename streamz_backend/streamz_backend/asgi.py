@@ -13,4 +13,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'streamz_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa una vez configurado Django
+from streaming.sockets import progress_socket  # noqa: E402
+
+# Canales WebSocket por ruta; el resto de peticiones las atiende Django
+WEBSOCKET_ROUTES = {
+    '/ws/streaming/progress/': progress_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        socket = WEBSOCKET_ROUTES.get(scope['path'])
+        if socket is None:
+            await send({'type': 'websocket.close'})
+            return
+        return await socket(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,211 @@
+"""
+Utilidades compartidas por los comandos de benchmark.
+
+Los benchmarks se ejecutan sobre una base de datos de pruebas desechable
+(la misma que usa ``manage.py test``), nunca sobre la base de datos real.
+"""
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from authentication.models import SubscriptionPlan, User
+from content.entitlements import refresh_entitlement_tiers
+from content.models import Content, Episode, Genre
+from streaming.models import WatchHistory
+from streaming.preferences import apply_preference_increments
+from streaming.progress import LEVEL_SCORES, progress_level
+from streaming.trending import add_views, bucket_start
+
+# Sílabas con las que se forman las palabras del catálogo sintético
+SYLLABLES = [consonant + vowel for consonant in 'bcdfglmnprstv' for vowel in 'aeiou']
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """
+    Crea y migra una base de datos de pruebas y la destruye al salir.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def measure(func, repeat):
+    """
+    Ejecuta func() repeat veces y devuelve estadísticas de latencia (ms),
+    throughput (operaciones/s) y consultas SQL por ejecución.
+    """
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(context.captured_queries))
+
+    timings.sort()
+    total_seconds = sum(timings) / 1000
+    return {
+        'runs': repeat,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(timings[-1], 3),
+        'ops_per_s': round(repeat / total_seconds, 1) if total_seconds else None,
+        'queries': round(statistics.fmean(queries), 2),
+    }
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def synthetic_vocabulary(rng, size=30000):
+    """
+    Palabras inventadas, suficientemente variadas para que las búsquedas sean
+    selectivas como en un catálogo real.
+    """
+    return sorted({
+        ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(size)
+    })
+
+
+def create_titles(rng, vocabulary, count, plans=(None,), batch_size=5000):
+    """
+    Crea count títulos sintéticos y devuelve sus ids.
+    """
+    ids = []
+    for start in range(0, count, batch_size):
+        created = Content.objects.bulk_create([
+            Content(
+                title=' '.join(rng.choices(vocabulary, k=rng.randint(1, 4))).capitalize(),
+                description=' '.join(rng.choices(vocabulary, k=20)),
+                release_year=rng.randint(1950, 2025),
+                content_type=rng.choice(['movie', 'series', 'documentary']),
+                thumbnail='https://example.com/thumbnail.jpg',
+                video_file='https://example.com/video.mp4',
+                min_subscription_plan=rng.choice(plans),
+            )
+            for _ in range(min(batch_size, count - start))
+        ])
+        ids.extend(content.id for content in created)
+    return ids
+
+
+def generate_dataset(users=200, titles=5000, episodes=10, genres=20, events=20000,
+                     seed=42, batch_size=5000):
+    """
+    Llena la base de datos (normalmente la desechable de throwaway_database)
+    con un conjunto de datos sintético y reproducible: planes, géneros,
+    títulos, episodios por serie, usuarios con token e historial de
+    visualización, junto con las preferencias y los buckets de trending que
+    ese historial habría generado.
+
+    Devuelve un diccionario con lo necesario para construir las peticiones.
+    """
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(rng)
+
+    plans = SubscriptionPlan.objects.bulk_create([
+        SubscriptionPlan(name='básico', price=8, max_screens=1, video_quality='SD'),
+        SubscriptionPlan(name='estándar', price=12, max_screens=2, video_quality='HD'),
+        SubscriptionPlan(name='premium', price=15, max_screens=4, video_quality='4K'),
+    ])
+    genre_ids = [
+        genre.id for genre in Genre.objects.bulk_create([
+            Genre(name=f'Género {index}') for index in range(genres)
+        ])
+    ]
+
+    content_ids = create_titles(rng, vocabulary, titles, plans, batch_size)
+    # bulk_create no envía señales: calcular aquí el nivel de acceso de los títulos
+    refresh_entitlement_tiers()
+    Through = Content.genres.through
+    Through.objects.bulk_create([
+        Through(content_id=content_id, genre_id=genre_id)
+        for content_id in content_ids
+        for genre_id in rng.sample(genre_ids, min(len(genre_ids), rng.randint(1, 3)))
+    ], batch_size=batch_size)
+
+    series_ids = list(
+        Content.objects.filter(id__in=content_ids, content_type='series').values_list('id', flat=True)
+    )
+    Episode.objects.bulk_create([
+        Episode(
+            series_id=series_id, title=f'Episodio {number}',
+            episode_number=number % 10 + 1, season_number=number // 10 + 1,
+            video_file='https://example.com/video.mp4', duration=rng.randint(20, 60),
+        )
+        for series_id in series_ids
+        for number in range(episodes)
+    ], batch_size=batch_size)
+
+    created_users = User.objects.bulk_create([
+        # Sin contraseña utilizable: las peticiones se autentican por token
+        User(username=f'usuario-{index:06d}', password='!', plan=rng.choice(plans))
+        for index in range(users)
+    ], batch_size=batch_size)
+    user_ids = [user.id for user in created_users]
+    tokens = Token.objects.bulk_create([
+        Token(key=Token.generate_key(), user=user) for user in created_users
+    ], batch_size=batch_size)
+
+    # Historial: una fila por (usuario, título), con fechas dentro de la última semana
+    now = datetime.now()
+    watched = {}
+    for _ in range(events):
+        key = (rng.choice(user_ids), rng.choice(content_ids))
+        watched[key] = (rng.uniform(0, 100), now - timedelta(seconds=rng.randint(0, 7 * 24 * 3600)))
+    histories = WatchHistory.objects.bulk_create([
+        WatchHistory(
+            user_id=user_id, content_id=content_id, watched_time=int(percentage * 60),
+            watched_percentage=percentage,
+            playback_key=WatchHistory.make_playback_key(content_id, None),
+            preference_level=progress_level(percentage),
+            # La vista del día ya se suma a trending más abajo
+            trending_day=watched_date.date() if progress_level(percentage) else None,
+        )
+        for (user_id, content_id), (percentage, watched_date) in watched.items()
+    ], batch_size=batch_size)
+    # bulk_create pone la fecha actual en watched_date (auto_now); bulk_update
+    # no, así que las fechas generadas se escriben después
+    for history, (_, watched_date) in zip(histories, watched.values()):
+        history.watched_date = watched_date
+    WatchHistory.objects.bulk_update(histories, ['watched_date'], batch_size=batch_size)
+
+    # Preferencias y vistas de trending coherentes con el historial
+    genres_by_content = defaultdict(list)
+    for content_id, genre_id in Through.objects.values_list('content_id', 'genre_id'):
+        genres_by_content[content_id].append(genre_id)
+    increments = Counter()
+    views = Counter()
+    for (user_id, content_id), (percentage, watched_date) in watched.items():
+        level = progress_level(percentage)
+        if not level:
+            continue
+        views[(content_id, bucket_start(watched_date))] += 1
+        for genre_id in genres_by_content[content_id]:
+            increments[(user_id, genre_id)] += LEVEL_SCORES[level]
+    apply_preference_increments(increments)
+    add_views(views)
+
+    return {
+        'tokens': [token.key for token in tokens],
+        'content_ids': content_ids,
+        'series_ids': series_ids,
+        'genre_ids': genre_ids,
+        'vocabulary': vocabulary,
+    }
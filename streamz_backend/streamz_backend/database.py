@@ -0,0 +1,55 @@
+"""
+Configuración de la base de datos a partir de DATABASE_URL.
+
+- SQLite (desarrollo, por defecto): modo WAL, synchronous=NORMAL, espera
+  ante bloqueos y transacciones IMMEDIATE, para que las escrituras
+  concurrentes (heartbeats de update_progress) esperen su turno en lugar de
+  fallar con "database is locked".
+- PostgreSQL (producción): conexiones persistentes (CONN_MAX_AGE) con
+  comprobación de salud o, con pool=True, el pool de conexiones de Django 5.1+
+  (requiere psycopg 3 con psycopg_pool).
+"""
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+POSTGRES_ENGINE = 'django.db.backends.postgresql'
+
+
+def database_config(url, conn_max_age=60, pool=False, pool_min_size=2, pool_max_size=10,
+                    pool_timeout=10, sqlite_tuning=True, sqlite_timeout=20):
+    """
+    Devuelve la entrada de DATABASES para la URL dada.
+    """
+    config = dj_database_url.parse(
+        url, conn_max_age=conn_max_age, conn_health_checks=conn_max_age > 0
+    )
+    options = config.setdefault('OPTIONS', {})
+
+    if config['ENGINE'] == SQLITE_ENGINE and sqlite_tuning:
+        # WAL: lectores y escritor no se bloquean entre sí; con WAL, NORMAL solo
+        # hace fsync en los checkpoints sin riesgo de corromper la base de datos
+        options['init_command'] = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+        # Segundos que se espera a que se libere el bloqueo de escritura
+        options['timeout'] = sqlite_timeout
+        # Tomar el bloqueo de escritura al empezar la transacción: promoverlo a
+        # mitad de transacción falla de inmediato sin respetar el timeout
+        options['transaction_mode'] = 'IMMEDIATE'
+
+    elif config['ENGINE'] == POSTGRES_ENGINE and pool:
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured(
+                "DATABASE_POOL requiere psycopg 3 con psycopg_pool (pip install 'psycopg[pool]')"
+            )
+        # El pool reutiliza las conexiones: Django no admite además conexiones persistentes
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = False
+        options['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }
+
+    return config
@@ -0,0 +1,313 @@
+"""
+Instrumentación por petición: número y tiempo de consultas SQL, tiempo de
+serialización y latencia total de cada vista.
+
+- InstrumentationMiddleware mide cada petición con un execute_wrapper en
+  todas las conexiones y devuelve las métricas a los administradores en la cabecera Server-Timing.
+  Desactivada por defecto (INSTRUMENTATION_ENABLED).
+- Las consultas que se repiten (mismo SQL con distintos parámetros, el patrón
+  típico de N+1) se señalan junto al campo del serializer que las disparó.
+- Las métricas se agregan en histogramas por vista, en memoria de cada
+  proceso, y se consultan en /api/instrumentation/ (solo administradores).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets de los histogramas
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100]
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Métricas de una petición. Hace también de execute_wrapper.
+    """
+
+    def __init__(self, duplicate_threshold):
+        self.duplicate_threshold = duplicate_threshold
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+        self.serializing = False
+        self.statements = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+            self.statements[sql] += 1
+            if self.statements[sql] == self.duplicate_threshold:
+                # Solo se recorre la pila para las consultas que ya se repiten
+                self.origins[sql] = serializer_field_origin()
+
+    def duplicates(self):
+        """
+        Consultas repetidas al menos duplicate_threshold veces:
+        [(origen, veces, sql)], de más a menos repetidas.
+        """
+        return sorted(
+            (
+                (self.origins.get(sql) or 'desconocido', count, sql)
+                for sql, count in self.statements.items() if count >= self.duplicate_threshold
+            ),
+            key=lambda duplicate: -duplicate[1]
+        )
+
+
+def serializer_field_origin():
+    """
+    Busca en la pila el campo de serializer que se estaba serializando
+    (Serializer.to_representation itera sobre los campos con la variable
+    `field`) y lo devuelve como "Serializer.campo".
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == 'to_representation':
+            serializer = frame.f_locals.get('self')
+            field = frame.f_locals.get('field')
+            if isinstance(serializer, serializers.Serializer) and field is not None:
+                return f'{type(serializer).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class TimedSerializerMixin:
+    """
+    Suma al tiempo de serialización de la petición el tiempo de la
+    serialización más externa (incluye las consultas que dispare).
+    """
+
+    def to_representation(self, instance):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialization_time += time.perf_counter() - start
+            metrics.serializing = False
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.total += value
+
+    def as_dict(self):
+        count = sum(self.counts)
+        labels = [f'<={bound}' for bound in self.bounds] + [f'>{self.bounds[-1]}']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'mean': round(self.total / count, 3) if count else None,
+        }
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.sql_count = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.serialization_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.duplicates = Counter()
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'sql_count': self.sql_count.as_dict(),
+            'sql_ms': self.sql_ms.as_dict(),
+            'serialization_ms': self.serialization_ms.as_dict(),
+            'total_ms': self.total_ms.as_dict(),
+            # Peticiones en las que cada origen generó consultas repetidas
+            'duplicate_queries': dict(self.duplicates.most_common()),
+        }
+
+
+class MetricsRegistry:
+    """
+    Histogramas por vista, en memoria del proceso.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self._views = defaultdict(ViewStats)
+        self._lock = threading.Lock()
+
+    def record(self, view_name, metrics, total_time):
+        with self._lock:
+            stats = self._views[view_name]
+            stats.requests += 1
+            stats.sql_count.add(metrics.sql_count)
+            stats.sql_ms.add(metrics.sql_time * 1000)
+            stats.serialization_ms.add(metrics.serialization_time * 1000)
+            stats.total_ms.add(total_time * 1000)
+            stats.duplicates.update(origin for origin, _, _ in metrics.duplicates())
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'since': self.started.isoformat(timespec='seconds'),
+                'views': {name: stats.as_dict() for name, stats in sorted(self._views.items())},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self.started = datetime.now()
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    execute_wrapper de todas las conexiones: mide la consulta en las métricas
+    de la petición en curso, que llegan por la ContextVar también a los hilos
+    de sync_to_async donde se ejecutan las consultas de las vistas async.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada petición y la registra en los histogramas. La cabecera
+    Server-Timing, que expone el número de consultas y el origen de las
+    repetidas, solo se envía a los administradores.
+
+    Admite peticiones síncronas y asíncronas, para no obligar a las vistas
+    async (streaming/async_views.py) a pasar por un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+        # Las conexiones que se abran a partir de ahora y las ya abiertas en este hilo
+        connection_created.connect(instrument_connection, dispatch_uid='instrumentation')
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics(self.duplicate_threshold)
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            # Renderizar aquí para medir también el JSON de las respuestas de DRF
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            _current_metrics.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - start, self.is_staff(request))
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(self.duplicate_threshold)
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        total_time = time.perf_counter() - start
+        user = getattr(request, 'user', None)
+        # El usuario de la sesión se carga de forma perezosa, con una consulta;
+        # las vistas async lo asignan ya autenticado
+        staff = await request.auser() if user is None or isinstance(user, SimpleLazyObject) else user
+        self.finish(request, response, metrics, total_time, bool(staff and staff.is_staff))
+        return response
+
+    @staticmethod
+    def is_staff(request):
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+
+    def finish(self, request, response, metrics, total_time, staff):
+        view_name = self.view_name(request)
+        if view_name is not None:
+            registry.record(view_name, metrics, total_time)
+        duplicates = metrics.duplicates()
+        for origin, count, sql in duplicates:
+            logger.warning(
+                "Consulta repetida %d veces en %s (origen: %s): %s", count, view_name, origin, sql
+            )
+
+        if staff:
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} consultas"',
+                f'serialize;dur={metrics.serialization_time * 1000:.1f}',
+                f'total;dur={total_time * 1000:.1f}',
+            ] + [
+                f'dup;desc="{origin} x{count}"' for origin, count, _ in duplicates
+            ])
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return match.view_name or match.route
+
+
+class InstrumentationView(APIView):
+    """
+    Histogramas agregados por vista del proceso que atiende la petición.
+    DELETE los reinicia.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(registry.snapshot())
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=204)
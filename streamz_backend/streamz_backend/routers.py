@@ -0,0 +1,169 @@
+"""
+Enrutado de lecturas a réplicas de la base de datos.
+
+- Las lecturas de la app content (catálogo y géneros) y las de las vistas de
+  solo lectura marcadas con `read_replica` (trending, recomendaciones,
+  historial...) van a una réplica elegida al azar.
+- Las escrituras, las peticiones con métodos no seguros y las lecturas
+  dentro de una transacción van siempre a `default`.
+- Después de escribir, las lecturas del usuario se fijan a `default` durante
+  DATABASE_REPLICA_PIN_SECONDS, para que vea sus propios cambios aunque la
+  réplica vaya con retraso (p. ej. continue_watching tras update_progress).
+- Después de un cambio en el catálogo (bump_catalogue_version), las lecturas
+  de content van a `default` durante DATABASE_REPLICA_PIN_SECONDS: si no, una
+  réplica con retraso llenaría la caché de respuestas con datos antiguos bajo
+  la versión nueva, y se servirían hasta que caducaran.
+
+Las réplicas se configuran con DATABASE_REPLICA_URLS (alias replica0,
+replica1...). Sin réplicas, el router no interviene.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+REPLICA_PREFIX = 'replica'
+PRIMARY = 'default'
+# Apps cuyas lecturas van a las réplicas en cualquier vista de solo lectura
+REPLICA_APPS = {'content'}
+# Apps que se leen siempre de default, también en las vistas de solo lectura:
+# un token recién creado en el login tiene que servir aunque la réplica vaya
+# con retraso (y la fijación por usuario aún no se conoce al autenticar)
+PRIMARY_APPS = {'auth', 'authentication', 'authtoken', 'contenttypes', 'sessions'}
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def read_replica(view):
+    """
+    Marca una vista basada en función (p. ej. las asíncronas) como de solo
+    lectura. En las vistas de clase basta con el atributo read_replica = True.
+    """
+    view.read_replica = True
+    return view
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+CATALOGUE_PIN_KEY = 'replica-pin:catalogue'
+
+
+def pin_catalogue_reads():
+    """
+    Envía las lecturas del catálogo a default durante un tiempo tras cambiarlo.
+    """
+    if replica_aliases():
+        cache.set(CATALOGUE_PIN_KEY, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+class RoutingState:
+    """
+    Estado del enrutado durante una petición.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        # Métodos no seguros: todo a default, también lo que se lee antes de escribir
+        self.primary = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        self.replica_view = False
+        self.wrote = False
+        self._pinned = None
+        self._catalogue_pinned = None
+
+    def pinned(self):
+        """
+        Si el usuario escribió hace poco. Se consulta al primer uso, cuando la
+        vista ya ha autenticado al usuario (DRF lo hace antes de leer nada).
+        """
+        if self._pinned is None:
+            user = getattr(self.request, 'user', None)
+            if user is None or not user.is_authenticated:
+                return False
+            self._pinned = bool(cache.get(pin_key(user.pk)))
+        return self._pinned
+
+    def catalogue_pinned(self):
+        """
+        Si el catálogo cambió hace poco (se consulta una vez por petición).
+        """
+        if self._catalogue_pinned is None:
+            self._catalogue_pinned = bool(cache.get(CATALOGUE_PIN_KEY))
+        return self._catalogue_pinned
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas:
+            return None
+        state = _state.get()
+        # Fuera de una petición (comandos, tareas) se lee de default
+        if state is None or state.primary or state.wrote:
+            return PRIMARY
+        app_label = model._meta.app_label
+        if app_label in PRIMARY_APPS or not (state.replica_view or app_label in REPLICA_APPS):
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block or state.pinned():
+            return PRIMARY
+        if app_label in REPLICA_APPS and state.catalogue_pinned():
+            return PRIMARY
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases de datos tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Las réplicas reciben el esquema por replicación (o sync_replica en local)
+        return False if db.startswith(REPLICA_PREFIX) else None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Prepara el estado del router para cada petición y, si la petición
+    escribió, fija las lecturas del usuario a default durante un tiempo.
+    """
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, self.pin_seconds)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None:
+            view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+            state.replica_view = bool(
+                getattr(view_func, 'read_replica', False) or getattr(view_class, 'read_replica', False)
+            )
@@ -17,10 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from django.urls import path, include
+from tasks.views import TaskQueueStatsView
+from .instrumentation import InstrumentationView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/content/', include('content.urls')),
     path('api/streaming/', include('streaming.urls')),
     path('api/auth/', include('authentication.urls')),
+    path('api/instrumentation/', InstrumentationView.as_view(), name='instrumentation'),
+    path('api/tasks/', TaskQueueStatsView.as_view(), name='task-queue'),
 ]
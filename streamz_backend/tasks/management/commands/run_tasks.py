@@ -0,0 +1,45 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks import queue
+
+# Segundos entre purgas de las tareas completadas
+PURGE_INTERVAL = 600
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de tareas (tasks/queue.py): procesa lotes de tareas "
+        "pendientes hasta que se detiene. Se pueden lanzar varios en paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Tareas por lote")
+        parser.add_argument(
+            '--sleep', type=float, default=1.0, help="Segundos de espera con la cola vacía"
+        )
+        parser.add_argument('--once', action='store_true', help="Vaciar la cola y terminar")
+        parser.add_argument('--stats', action='store_true', help="Mostrar el estado de la cola y terminar")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue.stats(), indent=2))
+            return
+
+        last_purge = 0
+        while True:
+            close_old_connections()
+            if time.monotonic() - last_purge > PURGE_INTERVAL:
+                queue.purge()
+                last_purge = time.monotonic()
+
+            done, failed = queue.run_batch(options['batch_size'])
+            if done or failed:
+                self.stderr.write(f"{done} tareas completadas, {failed} con error")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
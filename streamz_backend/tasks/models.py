@@ -0,0 +1,41 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Tarea pendiente de la cola (tasks/queue.py). Las completadas se conservan
+    TASK_RETENTION_HOURS para que su clave siga evitando duplicados.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pendiente'),
+        (RUNNING, 'En curso'),
+        (DONE, 'Completada'),
+        (FAILED, 'Fallida'),
+    ]
+
+    name = models.CharField(max_length=100)
+    # Clave de idempotencia: encolar otra tarea con la misma clave no hace nada
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    # No se ejecuta antes de esta fecha (reintentos con espera creciente)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Cuándo la tomó un worker; si se queda en curso más de TASK_LOCK_TIMEOUT se reintenta
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Siguiente lote de tareas listas, en orden de llegada
+            models.Index(fields=['status', 'run_after', 'id'], name='task_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,211 @@
+# tasks/queue.py
+"""
+Cola de tareas en la base de datos, sin broker externo.
+
+- Las apps registran manejadores con @task('nombre'). Un manejador recibe una
+  lista de payloads y los procesa de una vez, de modo que el worker aplica en
+  bloque lo que las peticiones han ido encolando.
+- enqueue() inserta las tareas con bulk_create; las que llevan una clave de
+  idempotencia ya encolada (o completada hace menos de TASK_RETENTION_HOURS)
+  se ignoran. Una tarea que agotó sus intentos no llegó a aplicarse, así que
+  volver a encolar su clave la sustituye.
+- El worker (manage.py run_tasks) toma lotes con SELECT ... FOR UPDATE SKIP
+  LOCKED en PostgreSQL (en SQLite las escrituras ya van de una en una), ejecuta
+  cada manejador dentro de una transacción y marca las tareas como completadas.
+  La transacción bloquea las tareas y solo aplica las que el worker sigue
+  teniendo tomadas, de modo que una tarea no se aplica dos veces aunque otro
+  worker la vuelva a tomar tras TASK_LOCK_TIMEOUT.
+  Si un lote falla, sus tareas se reintentan de una en una para aislar la
+  culpable, que se reprograma con espera creciente hasta TASK_MAX_ATTEMPTS.
+- Sin TASK_QUEUE_ENABLED, enqueue() ejecuta el manejador en el momento
+  (desarrollo y tests).
+"""
+import logging
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def task(name):
+    """
+    Registra un manejador de tareas: handler(payloads).
+    """
+    def decorator(handler):
+        HANDLERS[name] = handler
+        return handler
+    return decorator
+
+
+def is_enabled():
+    return getattr(settings, 'TASK_QUEUE_ENABLED', False)
+
+
+def enqueue(name, items):
+    """
+    Encola una tarea por cada (clave, payload) de items. La clave puede ser
+    None si la tarea no necesita idempotencia.
+    """
+    items = list(items)
+    if not items:
+        return
+    if name not in HANDLERS:
+        raise LookupError(f"No hay ningún manejador registrado para la tarea {name}")
+    if not is_enabled():
+        HANDLERS[name]([payload for _, payload in items])
+        return
+    keys = [key for key, _ in items if key is not None]
+    with transaction.atomic():
+        if keys:
+            Task.objects.filter(key__in=keys, status=Task.FAILED).delete()
+        Task.objects.bulk_create(
+            [Task(name=name, key=key, payload=payload) for key, payload in items],
+            ignore_conflicts=True,
+        )
+
+
+def claim(batch_size, now=None):
+    """
+    Toma hasta batch_size tareas listas (o en curso desde hace más de
+    TASK_LOCK_TIMEOUT, de un worker que murió) y las marca en curso.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            Task.objects.filter(
+                Q(status=Task.PENDING, run_after__lte=now)
+                | Q(status=Task.RUNNING, locked_at__lt=stale)
+            ).order_by('id').select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        )
+    return list(Task.objects.filter(id__in=ids).order_by('id'))
+
+
+def run_batch(batch_size=500):
+    """
+    Procesa un lote. Devuelve (completadas, fallidas).
+    """
+    tasks = claim(batch_size)
+    by_name = defaultdict(list)
+    for claimed in tasks:
+        by_name[claimed.name].append(claimed)
+
+    done = failed = 0
+    for name, group in by_name.items():
+        try:
+            done += len(execute(name, group))
+        except Exception:
+            if len(group) == 1:
+                failed += fail(group[0])
+                continue
+            logger.warning("Falló el lote de %s tareas %s; se reintentan de una en una", len(group), name)
+            for single in group:
+                try:
+                    done += len(execute(name, [single]))
+                except Exception:
+                    failed += fail(single)
+    return done, failed
+
+
+def owned(tasks):
+    """
+    Filtro de las tareas que siguen tomadas por este worker: en curso y con el
+    locked_at con el que las tomó (otro worker lo cambia al volver a tomarlas).
+    """
+    ids_by_lock = defaultdict(list)
+    for claimed in tasks:
+        ids_by_lock[claimed.locked_at].append(claimed.id)
+    return Q(status=Task.RUNNING) & reduce(or_, (
+        Q(locked_at=locked_at, id__in=ids) for locked_at, ids in ids_by_lock.items()
+    ))
+
+
+def execute(name, tasks):
+    """
+    Ejecuta el manejador sobre las tareas que este worker sigue teniendo
+    tomadas y las marca como completadas. Devuelve las ejecutadas.
+    """
+    handler = HANDLERS.get(name)
+    if handler is None:
+        raise LookupError(f"No hay ningún manejador registrado para la tarea {name}")
+    with transaction.atomic():
+        # Las filas quedan bloqueadas hasta el final de la transacción: claim()
+        # no las vuelve a tomar aunque el manejador pase de TASK_LOCK_TIMEOUT, y
+        # las que otro worker ya tomó (por creer muerto a este) no se aplican dos
+        # veces. En SQLite las transacciones IMMEDIATE ya van de una en una
+        ids = set(Task.objects.select_for_update().filter(owned(tasks)).values_list('id', flat=True))
+        if len(ids) < len(tasks):
+            logger.warning("%s tareas %s las tomó otro worker", len(tasks) - len(ids), name)
+            tasks = [claimed for claimed in tasks if claimed.id in ids]
+        if not tasks:
+            return []
+        handler([claimed.payload for claimed in tasks])
+        Task.objects.filter(id__in=ids).update(status=Task.DONE, locked_at=None, last_error='')
+    return tasks
+
+
+def fail(claimed):
+    """
+    Reprograma una tarea fallida con espera exponencial o la da por fallida
+    tras TASK_MAX_ATTEMPTS intentos. Devuelve 0 si otro worker la tomó entretanto.
+    """
+    logger.exception("Error en la tarea %s (%s), intento %s", claimed.name, claimed.id, claimed.attempts)
+    error = traceback.format_exc(limit=5)
+    mine = Task.objects.filter(owned([claimed]))
+    if claimed.attempts >= settings.TASK_MAX_ATTEMPTS:
+        return mine.update(status=Task.FAILED, locked_at=None, last_error=error)
+    delay = settings.TASK_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+    return mine.update(
+        status=Task.PENDING, locked_at=None, last_error=error,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def purge(now=None):
+    """
+    Borra las tareas completadas hace más de TASK_RETENTION_HOURS.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=settings.TASK_RETENTION_HOURS)
+    deleted, _ = Task.objects.filter(status=Task.DONE, created_at__lt=cutoff).delete()
+    return deleted
+
+
+def stats(now=None):
+    """
+    Profundidad de la cola por estado y tarea, y retraso (segundos) de la
+    tarea lista más antigua.
+    """
+    now = now or timezone.now()
+    by_status = defaultdict(int)
+    by_name = defaultdict(lambda: defaultdict(int))
+    for row in Task.objects.values('name', 'status').annotate(count=Count('id')).order_by():
+        by_status[row['status']] += row['count']
+        by_name[row['name']][row['status']] += row['count']
+
+    oldest = Task.objects.filter(status=Task.PENDING, run_after__lte=now).aggregate(
+        oldest=Min('created_at')
+    )['oldest']
+    return {
+        'depth': by_status[Task.PENDING] + by_status[Task.RUNNING],
+        'lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0,
+        'statuses': {status: by_status[status] for status, _ in Task.STATUSES},
+        'tasks': {name: dict(counts) for name, counts in sorted(by_name.items())},
+    }
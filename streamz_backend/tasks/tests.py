@@ -0,0 +1,194 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from content.models import Genre
+from streaming.models import UserPreference
+from streaming.progress import defer_crossings
+from streaming.tests import StreamingTestCase
+from . import queue
+from .models import Task
+
+processed = []
+
+
+@queue.task('tests.record')
+def record(payloads):
+    processed.extend(payload['value'] for payload in payloads)
+
+
+@queue.task('tests.fail')
+def fail(payloads):
+    if any(payload.get('fail') for payload in payloads):
+        raise ValueError('fallo')
+    processed.extend(payload['value'] for payload in payloads)
+
+
+@override_settings(TASK_QUEUE_ENABLED=True, TASK_MAX_ATTEMPTS=3, TASK_RETRY_DELAY=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        processed.clear()
+
+    def test_disabled_queue_runs_inline(self):
+        with override_settings(TASK_QUEUE_ENABLED=False):
+            queue.enqueue('tests.record', [('a', {'value': 1})])
+
+        self.assertEqual(processed, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_same_key_is_enqueued_once(self):
+        queue.enqueue('tests.record', [('a', {'value': 1}), ('b', {'value': 2})])
+        queue.enqueue('tests.record', [('a', {'value': 1})])
+        queue.run_batch()
+        queue.enqueue('tests.record', [('b', {'value': 2}), (None, {'value': 3})])
+        queue.run_batch()
+
+        self.assertEqual(processed, [1, 2, 3])
+
+    def test_failed_key_can_be_enqueued_again(self):
+        queue.enqueue('tests.record', [('a', {'value': 1})])
+        Task.objects.update(status=Task.FAILED, attempts=3)
+        queue.enqueue('tests.record', [('a', {'value': 2})])
+        queue.run_batch()
+
+        self.assertEqual(processed, [2])
+        self.assertEqual(Task.objects.get(key='a').status, Task.DONE)
+
+    def test_batch_is_processed_in_one_call(self):
+        queue.enqueue('tests.record', [(None, {'value': value}) for value in range(5)])
+
+        self.assertEqual(queue.run_batch(), (5, 0))
+        self.assertEqual(processed, [0, 1, 2, 3, 4])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 5)
+        self.assertEqual(queue.run_batch(), (0, 0))
+
+    def test_failing_task_is_isolated_and_retried_with_backoff(self):
+        queue.enqueue('tests.fail', [
+            ('ok', {'value': 1}), ('bad', {'value': 2, 'fail': True}),
+        ])
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(queue.run_batch(), (1, 1))
+        self.assertEqual(processed, [1])
+        bad = Task.objects.get(key='bad')
+        self.assertEqual((bad.status, bad.attempts), (Task.PENDING, 1))
+        self.assertIn('ValueError', bad.last_error)
+        delay = (bad.run_after - timezone.now()).total_seconds()
+        self.assertTrue(5 < delay <= 10)
+
+        # No se reintenta antes de tiempo; después, la espera se duplica
+        self.assertEqual(queue.run_batch(), (0, 0))
+        Task.objects.filter(pk=bad.pk).update(run_after=timezone.now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            queue.run_batch()
+        bad.refresh_from_db()
+        self.assertTrue(15 < (bad.run_after - timezone.now()).total_seconds() <= 20)
+
+        Task.objects.filter(pk=bad.pk).update(run_after=timezone.now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            queue.run_batch()
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), (Task.FAILED, 3))
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_abandoned_task_is_reclaimed(self):
+        queue.enqueue('tests.record', [('a', {'value': 1})])
+        self.assertEqual(len(queue.claim(10)), 1)
+        # Otro worker no la toma mientras está en curso...
+        self.assertEqual(queue.claim(10), [])
+
+        # ...salvo que el que la tomó lleve más de TASK_LOCK_TIMEOUT sin terminar
+        Task.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(queue.run_batch(), (1, 0))
+        self.assertEqual(Task.objects.get().attempts, 2)
+
+    @override_settings(TASK_LOCK_TIMEOUT=60)
+    def test_reclaimed_task_is_applied_once(self):
+        queue.enqueue('tests.record', [('a', {'value': 1}), ('b', {'value': 2})])
+        slow = queue.claim(10)
+
+        # Un segundo worker cree muerto al primero y toma sus tareas
+        Task.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(queue.run_batch(), (2, 0))
+
+        # El primero termina después: ya no son suyas
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertEqual(queue.execute('tests.record', slow), [])
+        self.assertEqual(processed, [1, 2])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+
+    @override_settings(TASK_RETENTION_HOURS=1)
+    def test_purge_keeps_recent_and_unfinished_tasks(self):
+        queue.enqueue('tests.record', [('a', {'value': 1}), ('b', {'value': 2})])
+        queue.run_batch()
+        queue.enqueue('tests.record', [('c', {'value': 3})])
+        Task.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        Task.objects.filter(key='b').update(created_at=timezone.now())
+
+        self.assertEqual(queue.purge(), 1)
+        self.assertEqual(set(Task.objects.values_list('key', flat=True)), {'b', 'c'})
+
+    def test_stats_report_depth_and_lag(self):
+        queue.enqueue('tests.record', [('a', {'value': 1}), ('b', {'value': 2})])
+        Task.objects.filter(key='a').update(created_at=timezone.now() - timedelta(seconds=30))
+        queue.enqueue('tests.fail', [('c', {'value': 3})])
+        queue.claim(1)
+
+        stats = queue.stats()
+
+        self.assertEqual(stats['depth'], 3)
+        self.assertEqual(stats['statuses'], {'pending': 2, 'running': 1, 'done': 0, 'failed': 0})
+        self.assertEqual(stats['tasks']['tests.record'], {'pending': 1, 'running': 1})
+        self.assertGreaterEqual(stats['lag_seconds'], 0)
+        self.assertLess(stats['lag_seconds'], 30)
+
+    def test_stats_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='ana', password='secreto123'))
+        self.assertEqual(client.get('/api/tasks/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_superuser(username='admin', password='secreto123'))
+        response = client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['depth'], 0)
+
+
+class DeferredCrossingsTests(StreamingTestCase):
+    def score(self):
+        preference = UserPreference.objects.filter(user=self.user, genre=self.genre).first()
+        return preference.score if preference else 0
+
+    @override_settings(TASK_QUEUE_ENABLED=True)
+    def test_crossings_are_applied_by_the_worker(self):
+        self.send_heartbeat(self.contents[0], 25)
+        self.send_heartbeat(self.contents[0], 60)
+        self.send_heartbeat(self.contents[0], 62)
+
+        self.assertEqual(self.score(), 0)
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 2)
+
+        # close_old_connections cerraría la conexión de la transacción del test
+        with mock.patch('tasks.management.commands.run_tasks.close_old_connections'):
+            call_command('run_tasks', once=True, stderr=io.StringIO())
+
+        self.assertEqual(self.score(), 1.0)
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+    @override_settings(TASK_QUEUE_ENABLED=True)
+    def test_full_batch_of_crossings_is_applied_at_once(self):
+        for name in ('Comedia', 'Terror'):
+            self.contents[0].genres.add(Genre.objects.create(name=name))
+        users = User.objects.bulk_create([User(username=f'usuario-{index}') for index in range(500)])
+        defer_crossings([
+            (f'history:{index}:20', (user.id, self.contents[0].id, 0, 20, True))
+            for index, user in enumerate(users)
+        ])
+
+        self.assertEqual(queue.run_batch(batch_size=500), (500, 0))
+        self.assertEqual(UserPreference.objects.count(), 1500)
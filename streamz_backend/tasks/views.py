@@ -0,0 +1,15 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .queue import stats
+
+
+class TaskQueueStatsView(APIView):
+    """
+    Profundidad y retraso de la cola de tareas.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(stats())